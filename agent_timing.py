@@ -0,0 +1,69 @@
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from metrics import METRICS
+
+
+def _llm_token_usage(response):
+    # (prompt, output) tokens from an LLMResult: the message's usage_metadata
+    # for chat models, llm_output['token_usage'] for the rest
+    prompt_tokens = output_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, 'message', None), 'usage_metadata', None) or {}
+            prompt_tokens += usage.get('input_tokens', 0)
+            output_tokens += usage.get('output_tokens', 0)
+    if not (prompt_tokens or output_tokens):
+        usage = (response.llm_output or {}).get('token_usage') or {}
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        output_tokens = usage.get('completion_tokens', 0)
+    return prompt_tokens, output_tokens
+
+
+class AgentTimingHandler(BaseCallbackHandler):
+    """Records a span for every LLM call and tool run of one agent invocation.
+
+    Spans are named agent.llm and agent.tool.<tool name> and carry the ReAct
+    step they belong to; LLM token usage goes to the llm_tokens counter.
+    """
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = metrics
+        self.step = 0
+        # run_id -> (span name, start time)
+        self._started = {}
+
+    def _start(self, run_id, name):
+        self._started[run_id] = (name, time.perf_counter())
+
+    def _finish(self, run_id, error=False):
+        name, start = self._started.pop(run_id, (None, None))
+        if name is not None:
+            self.metrics.record(name, time.perf_counter() - start, error=error, parent='agent.invoke', step=self.step)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self.step += 1
+        self._start(run_id, 'agent.llm')
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self.step += 1
+        self._start(run_id, 'agent.llm')
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id)
+        prompt_tokens, output_tokens = _llm_token_usage(response)
+        self.metrics.count('llm_tokens', prompt_tokens, kind='prompt', model='agent')
+        self.metrics.count('llm_tokens', output_tokens, kind='output', model='agent')
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, f"agent.tool.{(serialized or {}).get('name') or 'tool'}")
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=True)
@@ -0,0 +1,278 @@
+"""Monthly utilization per employee, rolled up by department, location or designation.
+
+Each allocation spreads its % over the days it covers. For every employee and
+calendar month they are allocated in, `Utilization` keeps the allocated
+%-days (their average utilization that month) and the peak % on any one day.
+These cells are computed with a sweep over each employee's start/end events
+in numpy, and when allocations or employees are added only the cells of the
+employees involved are recomputed.
+
+Rollups count an employee in a month once they have joined (or if they are
+allocated anyway), as on the bench when they have no allocation on any day
+of it, and as over-allocated when some day of it is above 100%.
+"""
+import numpy as np
+import pandas as pd
+
+from bulk_import import parse_dates, to_days
+
+# Rollup dimension -> display name
+DIMENSIONS = {'department': 'Department', 'location': 'Location', 'designation': 'Designation'}
+# Rollup measure -> display name
+MEASURES = {
+    'utilization': 'Average utilization (%)',
+    'bench': 'On the bench',
+    'over_allocated': 'Over-allocated',
+    'headcount': 'Headcount',
+}
+UNKNOWN = 'Unknown'
+# Below this a running total is rounding noise from adding and removing %s
+LEVEL_EPSILON = 1e-6
+
+_EPOCH_DAY = 719163  # date(1970, 1, 1).toordinal()
+_EPOCH_MONTH = 1970 * 12
+
+
+def _days(values):
+    # Stored date strings -> day ordinals (float, NaN where missing or unparsed).
+    # Dates repeat a lot, so each distinct string is parsed once; missing
+    # ones get code -1, which picks the NaN appended at the end.
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object).astype('str'))
+    days = to_days(parse_dates(pd.Series(uniques, dtype=object))).to_numpy()
+    return np.append(days, np.nan)[codes]
+
+
+def _month(days):
+    # Day ordinals -> year * 12 + month - 1 (float, NaN kept)
+    dates = (np.nan_to_num(days, nan=_EPOCH_DAY) - _EPOCH_DAY).astype('int64').astype('datetime64[D]')
+    months = dates.astype('datetime64[M]').astype('int64').astype('float64') + _EPOCH_MONTH
+    months[np.isnan(days)] = np.nan
+    return months
+
+
+def _month_starts(first, last):
+    # Day ordinals of the first day of months first..last+1
+    months = np.arange(first - _EPOCH_MONTH, last - _EPOCH_MONTH + 2).astype('datetime64[M]')
+    return months.astype('datetime64[D]').astype('int64') + _EPOCH_DAY
+
+
+def employee_months(rows, starts, ends, values, bounds):
+    """(rows, months, allocated %-days, peak %) for each employee and month with an allocation.
+
+    `rows` are the allocations' employee rows, `starts` / `ends` inclusive
+    day ordinals with NaN for open-ended, and `bounds` the first days of the
+    months plus the day after the last one; months are positions in it.
+    """
+    first, stop = bounds[0], bounds[-1]
+    starts = np.where(np.isnan(starts), first, np.maximum(starts, first)).astype('int64')
+    ends = np.where(np.isnan(ends), stop - 1, np.minimum(ends, stop - 1)).astype('int64')
+    kept = (starts <= ends) & (values != 0)
+    rows, starts, ends, values = rows[kept], starts[kept], ends[kept], values[kept]
+
+    # +% on the start day and -% the day after the end; the running total
+    # between consecutive events of an employee is their allocation there.
+    # Every employee's events sum to zero, so one cumsum serves them all.
+    event_rows = np.concatenate([rows, rows])
+    event_days = np.concatenate([starts, ends + 1])
+    order = np.lexsort((event_days, event_rows))
+    event_rows, event_days = event_rows[order], event_days[order]
+    levels = np.cumsum(np.concatenate([values, -values])[order])
+    segment = (event_rows[:-1] == event_rows[1:]) & (event_days[1:] > event_days[:-1]) & (np.abs(levels[:-1]) > LEVEL_EPSILON)
+    segment_start, segment_end = event_days[:-1][segment], event_days[1:][segment]
+    segment_rows, segment_levels = event_rows[:-1][segment], levels[:-1][segment]
+
+    # Split segments at month boundaries, then combine them per employee and month
+    first_month = np.searchsorted(bounds, segment_start, side='right') - 1
+    spans = np.searchsorted(bounds, segment_end - 1, side='right') - first_month
+    piece = np.repeat(np.arange(len(spans)), spans)
+    month = first_month[piece] + np.arange(len(piece)) - np.repeat(np.cumsum(spans) - spans, spans)
+    piece_days = np.minimum(segment_end[piece], bounds[month + 1]) - np.maximum(segment_start[piece], bounds[month])
+    cells, cell = np.unique(segment_rows[piece] * (len(bounds) - 1) + month, return_inverse=True)
+    load = np.bincount(cell, weights=segment_levels[piece] * piece_days, minlength=len(cells))
+    peak = np.full(len(cells), -np.inf)
+    np.maximum.at(peak, cell, segment_levels[piece])
+    return cells // (len(bounds) - 1), cells % (len(bounds) - 1), load, peak
+
+
+class Utilization:
+    """Materialized monthly utilization for a list of employees and allocations.
+
+    The months run from the earliest dated allocation to the latest (open-
+    ended allocations are cut off there), and widen as allocations dated
+    outside them are added. ``rollup`` results are cached until the next
+    change, so treat them as read-only.
+    """
+
+    def __init__(self, employees, allocations):
+        self._rows = {}
+        self._join_months = np.empty(0)
+        self._attributes = {dimension: [] for dimension in DIMENSIONS}
+        self._alloc_ids = np.empty(0, dtype=object)
+        self._alloc_rows = np.empty(0, dtype='int64')
+        self._starts = np.empty(0)
+        self._ends = np.empty(0)
+        self._values = np.empty(0)
+        self._dated = (np.inf, -np.inf)
+        self._rollups = {}
+        self._group_codes = {}
+        self._add_employee_rows(employees)
+        self._add_allocation_arrays(allocations)
+        self._compute_all()
+
+    @staticmethod
+    def _month_label(month):
+        return f"{month // 12:04d}-{month % 12 + 1:02d}"
+
+    @property
+    def months(self):
+        """Months covered, as YYYY-MM strings."""
+        return [self._month_label(month) for month in range(self._first_month, self._last_month + 1)]
+
+    def _add_employee_rows(self, employees):
+        # First record of an ID wins, like DataStore.get_employee
+        new = {}
+        for employee in employees:
+            employee_id = employee.get('employee_id')
+            if employee_id not in self._rows and employee_id not in new:
+                new[employee_id] = employee
+        for employee_id in new:
+            self._rows[employee_id] = len(self._rows)
+        records = list(new.values())
+        self._join_months = np.concatenate([self._join_months, _month(_days([employee.get('date_of_joining') for employee in records]))])
+        for dimension, names in self._attributes.items():
+            names.extend(employee.get(dimension) or UNKNOWN for employee in records)
+        return list(new)
+
+    def _add_allocation_arrays(self, allocations):
+        ids = np.array([alloc.get('employee_id') for alloc in allocations], dtype=object)
+        starts = _days([alloc.get('start_date') for alloc in allocations])
+        ends = _days([alloc.get('end_date') for alloc in allocations])
+        values = pd.to_numeric(pd.Series([alloc.get('allocation') for alloc in allocations], dtype=object), errors='coerce')
+        self._alloc_ids = np.concatenate([self._alloc_ids, ids])
+        self._alloc_rows = np.concatenate([self._alloc_rows, self._row_numbers(ids)])
+        self._starts = np.concatenate([self._starts, starts])
+        self._ends = np.concatenate([self._ends, ends])
+        self._values = np.concatenate([self._values, values.fillna(0).to_numpy(dtype='float64')])
+        dated = np.concatenate([starts, ends])
+        dated = dated[~np.isnan(dated)]
+        if len(dated):
+            self._dated = (min(self._dated[0], dated.min()), max(self._dated[1], dated.max()))
+
+    def _row_numbers(self, ids):
+        # -1 for allocations whose employee is unknown (deleted, or not added yet)
+        return np.fromiter((self._rows.get(employee_id, -1) for employee_id in ids), dtype='int64', count=len(ids))
+
+    def _window(self):
+        if not np.isfinite(self._dated[0]):
+            today = int(np.datetime64('today', 'M').astype('int64')) + _EPOCH_MONTH
+            return today, today
+        months = _month(np.array(self._dated))
+        return int(months[0]), int(months[1])
+
+    def _set_window(self, first, last):
+        self._first_month, self._last_month = first, last
+        self._bounds = _month_starts(first, last)
+        self._month_days = np.diff(self._bounds)
+
+    def _compute_all(self):
+        self._set_window(*self._window())
+        known = self._alloc_rows >= 0
+        self._cells = employee_months(self._alloc_rows[known], self._starts[known], self._ends[known], self._values[known], self._bounds)
+        self._rollups = {}
+
+    def _recompute_rows(self, rows):
+        rows = np.unique(rows[rows >= 0])
+        if not len(rows):
+            return
+        selected = np.isin(self._alloc_rows, rows)
+        new = employee_months(self._alloc_rows[selected], self._starts[selected], self._ends[selected], self._values[selected], self._bounds)
+        kept = ~np.isin(self._cells[0], rows)
+        self._cells = tuple(np.concatenate([old[kept], added]) for old, added in zip(self._cells, new))
+        self._rollups = {}
+
+    def add_employees(self, employees):
+        added = self._add_employee_rows(employees)
+        self._group_codes = {}
+        # Allocations saved before their employee existed
+        waiting = (self._alloc_rows < 0) & np.isin(self._alloc_ids, added)
+        if waiting.any():
+            self._alloc_rows[waiting] = self._row_numbers(self._alloc_ids[waiting])
+            self._recompute_rows(self._alloc_rows[waiting])
+        self._rollups = {}
+
+    def add_allocations(self, allocations):
+        count = len(self._alloc_rows)
+        undated = not np.isfinite(self._dated[0])
+        self._add_allocation_arrays(allocations)
+        if undated and np.isfinite(self._dated[0]):
+            # The range was only a placeholder for the current month; take it from the data now
+            self._compute_all()
+            return
+        rows = self._alloc_rows[count:]
+        first, last = self._window()
+        first, last = min(first, self._first_month), max(last, self._last_month)
+        if (first, last) != (self._first_month, self._last_month):
+            # The range only grows. Existing cells keep their months (shifted
+            # if it starts earlier); only open-ended allocations reach into
+            # the new months.
+            cell_rows, cell_months, load, peak = self._cells
+            self._cells = (cell_rows, cell_months + (self._first_month - first), load, peak)
+            self._set_window(first, last)
+            open_ended = np.isnan(self._starts[:count]) | np.isnan(self._ends[:count])
+            rows = np.concatenate([rows, self._alloc_rows[:count][open_ended]])
+        self._recompute_rows(rows)
+
+    def _codes(self, dimension):
+        # (group code per employee row, group names), kept until employees are added
+        found = self._group_codes.get(dimension)
+        if found is None:
+            if dimension is None:
+                found = np.zeros(len(self._rows), dtype='int64'), ['All']
+            else:
+                found = pd.factorize(pd.Series(self._attributes[dimension], dtype=object), sort=True)
+            self._group_codes[dimension] = found
+        return found
+
+    def rollup(self, dimension=None):
+        """Per group (None: everyone) and month: headcount, average utilization %, bench and over-allocated counts.
+
+        A DataFrame with the `dimension` column (unless None), `month`
+        (YYYY-MM) and the MEASURES columns.
+        """
+        cached = self._rollups.get(dimension)
+        if cached is not None:
+            return cached
+        codes, names = self._codes(dimension)
+        groups, months = len(names), len(self._month_days)
+
+        def total(group_codes, month_positions, weights=None):
+            counts = np.bincount(group_codes * months + month_positions, weights=weights, minlength=groups * months)
+            return counts.reshape(groups, months)
+
+        # Joined from their joining month on (from the start if it is unknown)
+        joined_from = np.nan_to_num(self._join_months - self._first_month, nan=0)
+        joined_from = np.clip(joined_from, 0, months).astype('int64')
+        joined = np.bincount(codes * (months + 1) + joined_from, minlength=groups * (months + 1))
+        joined = joined.reshape(groups, months + 1)[:, :months].cumsum(axis=1)
+
+        cell_rows, cell_months, load, peak = self._cells
+        allocated = peak > LEVEL_EPSILON
+        cell_codes = codes[cell_rows]
+        not_joined = allocated & (np.nan_to_num(self._join_months[cell_rows] - self._first_month, nan=0) > cell_months)
+        allocated_count = total(cell_codes[allocated], cell_months[allocated])
+        headcount = joined + total(cell_codes[not_joined], cell_months[not_joined])
+        load = total(cell_codes, cell_months, load)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            utilization = np.where(headcount > 0, load / (headcount * self._month_days[None, :]), np.nan)
+        over = peak > 100 + LEVEL_EPSILON
+        frame = pd.DataFrame({
+            'month': np.tile(self.months, groups),
+            'headcount': headcount.ravel().astype('int64'),
+            'utilization': utilization.ravel(),
+            'bench': (headcount - allocated_count).ravel().astype('int64'),
+            'over_allocated': total(cell_codes[over], cell_months[over]).ravel().astype('int64'),
+        })
+        if dimension is not None:
+            frame.insert(0, dimension, np.repeat(np.asarray(names, dtype=object), months))
+        self._rollups[dimension] = frame
+        return frame
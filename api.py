@@ -0,0 +1,401 @@
+"""HTTP API over the same data store and rules as the Streamlit app.
+
+    python api.py --host 127.0.0.1 --port 8000
+
+Reads are answered from the store's in-memory indexes, and writes go
+through the same group commit and file lock as the app, so both can run
+against the same data at once. Every route but /health needs
+``Authorization: Bearer <API_TOKEN>``; without an API_TOKEN setting they are
+only served to loopback clients, and the server refuses to listen on other
+interfaces. Settings (STORAGE_MODE, SQLITE_PATH, GEMINI_API_KEY, ...) are
+read like the app's, from the environment or .streamlit/secrets.toml.
+"""
+import argparse
+import hmac
+import inspect
+import ipaddress
+import json
+import re
+from contextlib import asynccontextmanager
+from datetime import date
+from functools import wraps
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from analytics import DIMENSIONS
+from core import GEMINI_MODEL, MAX_CANDIDATES, ROLE_SKILLS, IntentService, check_allocations, employee_errors, employee_record, get_setting, parse_date
+from data_store import DataStore, WriteConflict
+from intent_parser import IntentParser
+from llm_client import DEFAULT_BASE_URL, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, GeminiClient
+from metrics import LOG_FILE, METRICS, PROMETHEUS_FILE, span, timed
+from query_plan import PlanError, QueryPlanner, plan_json
+from response_cache import CACHE_FILE, DEFAULT_TTL, ResponseCache
+from snapshot import SNAPSHOT_DIR
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+# Most requests one POST /allocations may carry
+MAX_BATCH = 1000
+MONTH_RE = re.compile(r'^\d{4}-\d{2}$')
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def requires_token(handler):
+    """Reject the request with 401 unless it carries the API token (or, with none set, comes from loopback)."""
+    @wraps(handler)
+    async def wrapper(request):
+        token = request.app.state.api_token
+        if token:
+            scheme, _, given = request.headers.get('authorization', '').partition(' ')
+            allowed = scheme.lower() == 'bearer' and hmac.compare_digest(given.strip().encode(), token.encode())
+        else:
+            allowed = request.client is not None and _is_loopback(request.client.host)
+        if not allowed:
+            return JSONResponse({'error': "A valid API token is required"}, status_code=401, headers={'WWW-Authenticate': 'Bearer'})
+        if inspect.iscoroutinefunction(handler):
+            return await handler(request)
+        # Plain handlers keep running on the thread pool, as Starlette would run them
+        return await run_in_threadpool(handler, request)
+    return wrapper
+
+
+class BadRequest(Exception):
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors
+
+
+def _int_param(request, name, default, low=0, high=None):
+    value = request.query_params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise BadRequest(f"{name} must be an integer")
+    if number < low or (high is not None and number > high):
+        raise BadRequest(f"{name} must be between {low} and {high}" if high is not None else f"{name} must be at least {low}")
+    return number
+
+
+def _date_param(request, name, default=None):
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    day = parse_date(value)
+    if day is None:
+        raise BadRequest(f"{name} must be a date in YYYY-MM-DD format")
+    return day
+
+
+def _page_params(request, filter_fields):
+    filters = {field: request.query_params[field] for field in filter_fields if request.query_params.get(field)}
+    return {
+        'search': request.query_params.get('search', ''),
+        'filters': filters,
+        'sort_by': request.query_params.get('sort') or None,
+        'descending': request.query_params.get('desc', '').lower() in ('1', 'true', 'yes'),
+        'offset': _int_param(request, 'offset', 0),
+        'limit': _int_param(request, 'limit', DEFAULT_PAGE_SIZE, 1, MAX_PAGE_SIZE),
+    }
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except ValueError:
+        raise BadRequest("Request body must be JSON")
+
+
+def _page_response(rows, total, params):
+    return JSONResponse({'total': total, 'offset': params['offset'], 'limit': params['limit'], 'items': rows})
+
+
+# --- Endpoints ---
+# Plain functions run on Starlette's thread pool, so a reload after another
+# process writes, or a commit waiting on the file lock, never blocks the loop.
+
+def health(request):
+    store = request.app.state.store
+    return JSONResponse({'status': 'ok', 'version': store.refresh()})
+
+
+@requires_token
+@timed("api.list_employees")
+def list_employees(request):
+    params = _page_params(request, ('department', 'designation', 'location'))
+    rows, total = request.app.state.store.employee_page(**params)
+    return _page_response(rows, total, params)
+
+
+@requires_token
+@timed("api.get_employee")
+def get_employee(request):
+    store = request.app.state.store
+    employee_id = request.path_params['employee_id']
+    employee = store.get_employee(employee_id)
+    if employee is None:
+        return JSONResponse({'error': f"Employee {employee_id} not found"}, status_code=404)
+    return JSONResponse({
+        'employee': employee,
+        'allocations': store.allocations_for_employee(employee_id),
+        'current_allocation': store.peak_allocation(employee_id, date.today(), date.today()),
+    })
+
+
+@requires_token
+async def create_employee(request):
+    employee_data = await _json_body(request)
+    if not isinstance(employee_data, dict):
+        raise BadRequest("Request body must be a JSON object")
+    return await run_in_threadpool(_create_employee, request.app.state.store, employee_data)
+
+
+@timed("api.create_employee")
+def _create_employee(store, employee_data):
+    errors = employee_errors(employee_data, store)
+    if errors:
+        return JSONResponse({'error': "Employee data is invalid", 'errors': errors}, status_code=400)
+    record = employee_record(employee_data)
+    try:
+        store.add_employee(record)
+    except WriteConflict as e:
+        return JSONResponse({'error': str(e), 'errors': e.errors}, status_code=409)
+    return JSONResponse(record, status_code=201)
+
+
+@requires_token
+@timed("api.list_allocations")
+def list_allocations(request):
+    params = _page_params(request, ('employee_id', 'project_name', 'department', 'designation'))
+    rows, total = request.app.state.store.allocation_page(**params)
+    return _page_response(rows, total, params)
+
+
+@requires_token
+async def create_allocations(request):
+    """One allocation object, or {"allocations": [...], "expected_version": n}.
+
+    Saved all or nothing: any invalid request rejects the batch with its
+    row errors. expected_version is the data version the client checked
+    capacity against; if others have written since, capacity is rechecked.
+    """
+    body = await _json_body(request)
+    if isinstance(body, dict) and 'allocations' in body:
+        requests, expected_version = body['allocations'], body.get('expected_version')
+    else:
+        requests, expected_version = [body], None
+    if not isinstance(requests, list) or not requests or not all(isinstance(item, dict) for item in requests):
+        raise BadRequest("allocations must be a non-empty list of objects")
+    if len(requests) > MAX_BATCH:
+        raise BadRequest(f"At most {MAX_BATCH} allocations per request")
+    if expected_version is not None and not isinstance(expected_version, int):
+        raise BadRequest("expected_version must be an integer")
+    return await run_in_threadpool(_create_allocations, request.app.state.store, requests, expected_version)
+
+
+@timed("api.create_allocations")
+def _create_allocations(store, requests, expected_version):
+    version = store.refresh() if expected_version is None else expected_version
+    accepted, rejected = check_allocations(store, requests)
+    if rejected:
+        errors = [{'index': index, 'errors': errors} for index, errors in rejected]
+        return JSONResponse({'error': "Some allocations are invalid; nothing was saved", 'errors': errors}, status_code=400)
+    try:
+        store.add_allocations(accepted, expected_version=version)
+    except WriteConflict as e:
+        return JSONResponse({'error': str(e), 'errors': e.errors}, status_code=409)
+    return JSONResponse({'saved': len(accepted), 'allocations': accepted}, status_code=201)
+
+
+@requires_token
+@timed("api.capacity")
+def capacity(request):
+    store = request.app.state.store
+    employee_id = request.path_params['employee_id']
+    if not store.has_employee(employee_id):
+        return JSONResponse({'error': f"Employee {employee_id} not found"}, status_code=404)
+    start = _date_param(request, 'start', date.today())
+    end = _date_param(request, 'end')
+    if end is not None and end < start:
+        raise BadRequest("end cannot be before start")
+    peak = store.peak_allocation(employee_id, start, end)
+    return JSONResponse({
+        'employee_id': employee_id,
+        'start': start.isoformat(),
+        'end': end.isoformat() if end else None,
+        'peak_allocation': peak,
+        'available': max(0, 100 - peak),
+    })
+
+
+@requires_token
+@timed("api.candidates")
+def candidates(request):
+    designation = request.query_params.get('designation')
+    if not designation:
+        raise BadRequest("designation is required")
+    skills = [skill.strip() for skill in request.query_params.get('skills', '').split(',') if skill.strip()]
+    allocation = _int_param(request, 'allocation', 0, 0, 100)
+    k = _int_param(request, 'k', MAX_CANDIDATES, 1, MAX_PAGE_SIZE)
+    matches, total = request.app.state.store.search_candidates(designation, skills, allocation, k=k)
+    return JSONResponse({
+        'total': total,
+        'items': [{'employee': match.employee, 'score': match.score, 'available': float(match.available)} for match in matches],
+    })
+
+
+@requires_token
+@timed("api.utilization")
+def utilization(request):
+    """Monthly utilization rows, for everyone or per ?by=department|location|designation, optionally ?start=YYYY-MM&end=YYYY-MM."""
+    by = request.query_params.get('by') or None
+    if by is not None and by not in DIMENSIONS:
+        raise BadRequest(f"by must be one of: {', '.join(DIMENSIONS)}")
+    bounds = {name: request.query_params.get(name) for name in ('start', 'end')}
+    for name, value in bounds.items():
+        if value and not MONTH_RE.match(value):
+            raise BadRequest(f"{name} must be a month as YYYY-MM")
+    frame = request.app.state.store.utilization(by)
+    if bounds['start']:
+        frame = frame[frame['month'] >= bounds['start']]
+    if bounds['end']:
+        frame = frame[frame['month'] <= bounds['end']]
+    rows = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    return JSONResponse({'by': by, 'items': rows})
+
+
+@requires_token
+async def intent(request):
+    """Intent JSON for {"query": ...}: parsed locally when possible, else from the cache or the model."""
+    body = await _json_body(request)
+    query = body.get('query') if isinstance(body, dict) else None
+    if not isinstance(query, str) or not query.strip():
+        raise BadRequest("query is required")
+    intents = request.app.state.intents
+    with span("api.intent"):
+        name_index = await run_in_threadpool(request.app.state.store.name_index)
+        response_json = intents.parse_local(query, name_index)
+        if response_json is not None:
+            return JSONResponse({'source': 'local', 'result': response_json})
+        response_json, error = await intents.ask_async(query)
+    if error is not None:
+        return JSONResponse({'error': f"Could not get an answer from the AI model: {error}"}, status_code=502)
+    return JSONResponse({'source': 'model', 'result': response_json})
+
+
+@requires_token
+async def query(request):
+    """Rows answering {"question": ...}, via a query plan from one model call (see query_plan.py)."""
+    body = await _json_body(request)
+    question = body.get('question') if isinstance(body, dict) else None
+    if not isinstance(question, str) or not question.strip():
+        raise BadRequest("question is required")
+    planner, store = request.app.state.planner, request.app.state.store
+    plan, error, cached = await run_in_threadpool(planner.plan, question)
+    if isinstance(error, PlanError):
+        return JSONResponse({'error': "The model's query plan could not be used", 'errors': error.errors}, status_code=502)
+    if error is not None:
+        return JSONResponse({'error': f"Could not get an answer from the AI model: {error}"}, status_code=502)
+    result = await run_in_threadpool(lambda: planner.run(plan, store.snapshot()))
+    rows = result.astype(object).where(result.notna(), None).to_dict('records')
+    return JSONResponse({'plan': json.loads(plan_json(plan)), 'cached_plan': cached, 'rows': rows})
+
+
+async def bad_request(request, exc):
+    content = {'error': str(exc)}
+    if exc.errors is not None:
+        content['errors'] = exc.errors
+    return JSONResponse(content, status_code=400)
+
+
+def default_store():
+    return DataStore(
+        storage_mode=get_setting("STORAGE_MODE", "json"),
+        database_path=get_setting("SQLITE_PATH", "talent_iq.db"),
+        role_skills=ROLE_SKILLS,
+        snapshot_dir=get_setting("SNAPSHOT_DIR", SNAPSHOT_DIR),
+    )
+
+
+def default_intents():
+    client = GeminiClient(
+        api_key=get_setting("GEMINI_API_KEY"),
+        model=GEMINI_MODEL,
+        base_url=get_setting("GEMINI_BASE_URL", DEFAULT_BASE_URL),
+        timeout=float(get_setting("LLM_TIMEOUT", DEFAULT_TIMEOUT)),
+        max_concurrency=int(get_setting("LLM_MAX_CONCURRENCY", DEFAULT_CONCURRENCY)),
+    )
+    cache = ResponseCache(path=get_setting("INTENT_CACHE_PATH", CACHE_FILE), ttl=float(get_setting("INTENT_CACHE_TTL", DEFAULT_TTL)))
+    return IntentService(IntentParser(ROLE_SKILLS), cache, client)
+
+
+def _warm_up(store):
+    # Load the data and build the search indexes before the first request
+    store.refresh()
+    store.name_index()
+    store.skill_index()
+    store.available_capacity()
+    store.utilization()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_in_threadpool(_warm_up, app.state.store)
+    yield
+
+
+def create_app(store=None, intents=None, planner=None, api_token=None):
+    """The Starlette app; store, intents, planner and api_token default to ones built from the settings."""
+    app = Starlette(
+        routes=[
+            Route('/health', health),
+            Route('/employees', list_employees),
+            Route('/employees', create_employee, methods=['POST']),
+            Route('/employees/{employee_id}', get_employee),
+            Route('/allocations', list_allocations),
+            Route('/allocations', create_allocations, methods=['POST']),
+            Route('/capacity/{employee_id}', capacity),
+            Route('/candidates', candidates),
+            Route('/utilization', utilization),
+            Route('/intent', intent, methods=['POST']),
+            Route('/query', query, methods=['POST']),
+        ],
+        exception_handlers={BadRequest: bad_request},
+        lifespan=lifespan,
+    )
+    app.state.store = store if store is not None else default_store()
+    app.state.intents = intents if intents is not None else default_intents()
+    # Shares the intent service's cache and model client
+    app.state.planner = planner if planner is not None else QueryPlanner(app.state.intents.cache, app.state.intents.client)
+    app.state.api_token = api_token if api_token is not None else get_setting("API_TOKEN", "")
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(argv)
+    if not get_setting("API_TOKEN") and not _is_loopback(args.host):
+        parser.error(f"set API_TOKEN before listening on {args.host}; without it the API only serves loopback")
+
+    import uvicorn
+
+    METRICS.configure(get_setting("METRICS_LOG", LOG_FILE), get_setting("METRICS_PROMETHEUS", PROMETHEUS_FILE))
+    uvicorn.run(create_app(), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,19 @@
 import streamlit as st
 import json
-import re
 from datetime import datetime, date
-import os
+from bisect import bisect_left
 import pandas as pd
-import plotly.express as px
-import google.generativeai as genai
-from langchain_experimental.agents.agent_toolkits.pandas.base import create_pandas_dataframe_agent
-from langchain.agents import AgentExecutor, AgentType
-from langchain_google_genai import ChatGoogleGenerativeAI
+
+from bulk_import import SKILL_SEPARATOR, read_allocation_csv, read_employee_file, validate_allocation_chunks, validate_employees
+from data_store import DataStore, WriteConflict
+from intent_parser import IntentParser
+from response_cache import CACHE_FILE, DEFAULT_TTL, ResponseCache
+from core import (
+    DEPARTMENTS, GEMINI_MODEL, LOCATIONS, MAX_CANDIDATES, ROLE_SKILLS, IntentService, check_allocation,
+    check_nl_allocation, employee_errors, employee_record,
+)
+import core
+from metrics import LOG_FILE, METRICS, PROMETHEUS_FILE, span, timed
 
 # --- Common Functions and Data ---
 
@@ -20,14 +25,6 @@ st.set_page_config(
     initial_sidebar_state="auto"
 )
 
-# Skills mapping based on job roles
-ROLE_SKILLS = {
-    "Backend Developer": ["JavaScript", "Node.js", "Python", "Java", "C#", "PHP", "Go", "Ruby", "Rust", "Scala", "Kotlin", "Express.js", "Django", "Flask", "FastAPI", "Spring Boot", "ASP.NET Core", "Laravel", "Gin", "Echo", "Nest.js", "PostgreSQL", "MySQL", "MongoDB", "Redis", "Elasticsearch", "Cassandra", "DynamoDB", "Oracle Database", "SQL Server", "Neo4j", "REST API Design", "GraphQL", "gRPC", "WebSocket", "Microservices Architecture", "API Gateway", "OAuth/JWT", "Swagger/OpenAPI", "Message Queues", "Event-Driven Architecture"],
-    "Frontend Developer": ["JavaScript (ES6+)", "TypeScript", "HTML5", "CSS3", "Sass/SCSS", "Less", "JSX", "WebAssembly", "React.js", "Vue.js", "Angular", "Next.js", "Nuxt.js", "Svelte/SvelteKit", "Ember.js", "Alpine.js", "Lit", "Stencil", "Material-UI (MUI)", "Ant Design", "Chakra UI", "Bootstrap", "Tailwind CSS", "Styled Components", "Emotion", "Framer Motion", "GSAP", "Three.js", "Redux/Redux Toolkit", "Vuex/Pinia", "MobX", "Zustand", "Recoil", "Context API", "Webpack", "Vite", "Parcel", "Jest", "Cypress", "Testing Library", "Storybook", "ESLint/Prettier"],
-    "AI/ML/Data Scientist": ["Python", "R", "SQL", "Scala", "Java", "Julia", "MATLAB", "C++", "TensorFlow", "PyTorch", "Keras", "Scikit-learn", "XGBoost", "LightGBM", "CatBoost", "Statsmodels", "MLflow", "Weights & Biases", "Convolutional Neural Networks (CNN)", "Recurrent Neural Networks (RNN/LSTM)", "Transformers", "BERT/GPT Models", "GANs", "Reinforcement Learning", "Transfer Learning", "Computer Vision", "Natural Language Processing", "Speech Recognition", "Pandas", "NumPy", "Matplotlib", "Seaborn", "Plotly", "Apache Spark", "Hadoop", "Kafka", "Apache Airflow", "Dask", "AWS SageMaker", "Google Cloud AI", "Azure Machine Learning", "Kubeflow", "Docker", "Kubernetes", "MLOps", "Model Deployment", "A/B Testing", "Feature Engineering", "LangChain", "Hugging Face", "OpenAI API"],
-    "DevOps Engineer": ["Amazon Web Services (AWS)", "Microsoft Azure", "Google Cloud Platform (GCP)", "DigitalOcean", "IBM Cloud", "Oracle Cloud", "Alibaba Cloud", "Multi-cloud Strategy", "Docker", "Kubernetes", "Docker Compose", "Helm", "OpenShift", "Rancher", "Istio", "Linkerd", "Terraform", "AWS CloudFormation", "Azure Resource Manager", "Google Cloud Deployment Manager", "Pulumi", "Ansible", "Chef", "Puppet", "SaltStack", "Jenkins", "GitLab CI/CD", "GitHub Actions", "Azure DevOps", "CircleCI", "Travis CI", "Bamboo", "TeamCity", "ArgoCD", "Spinnaker", "Prometheus", "Grafana", "ELK Stack", "Datadog", "New Relic", "Splunk", "Jaeger", "Zipkin"]
-}
-
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -39,98 +36,120 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def validate_employee_id(employee_id):
-    return bool(re.match(r'^TM\d{5}$', employee_id))
-
-def validate_email(email):
-    return email.endswith('@gmail.com') and '@' in email
-
-def validate_phone(phone):
-    return bool(re.match(r'^\d{10}$', phone))
+def get_setting(name, default=None):
+    return core.get_setting(name, default, secrets=st.secrets)
+
+@st.cache_resource
+def get_data_store():
+    # Shared across sessions; reloads from disk only when the files change.
+    # STORAGE_MODE=journal switches writes to the append-only journal,
+    # STORAGE_MODE=sqlite to the database at SQLITE_PATH.
+    from snapshot import SNAPSHOT_DIR
+
+    return DataStore(
+        storage_mode=get_setting("STORAGE_MODE", "json"),
+        database_path=get_setting("SQLITE_PATH", "talent_iq.db"),
+        role_skills=ROLE_SKILLS,
+        snapshot_dir=get_setting("SNAPSHOT_DIR", SNAPSHOT_DIR),
+    )
 
-def validate_date(selected_date):
-    return selected_date <= date.today()
+@st.cache_resource
+def get_metrics():
+    # Timing spans go to METRICS_LOG as JSON lines and METRICS_PROMETHEUS in
+    # Prometheus text format; an empty path turns that export off
+    METRICS.configure(
+        log_path=get_setting("METRICS_LOG", LOG_FILE),
+        prometheus_path=get_setting("METRICS_PROMETHEUS", PROMETHEUS_FILE),
+    )
+    return METRICS
 
 def load_existing_data():
-    if os.path.exists('employees_data.json'):
-        try:
-            with open('employees_data.json', 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    return get_data_store().employees()
 
 def save_employee_data(employee_data):
     try:
-        existing_data = load_existing_data()
-        existing_data.append(employee_data)
-        with open('employees_data.json', 'w') as f:
-            json.dump(existing_data, f, indent=4, default=str)
+        get_data_store().add_employee(employee_data)
         return True
+    except WriteConflict as e:
+        st.error(str(e))
+        return False
     except Exception as e:
         st.error(f"Error saving data: {str(e)}")
         return False
 
-def check_duplicate_employee_id(employee_id):
-    existing_data = load_existing_data()
-    return any(emp.get('employee_id') == employee_id for emp in existing_data)
-
-def load_project_allocations():
-    if os.path.exists('project_allocations.json'):
-        try:
-            with open('project_allocations.json', 'r') as f:
-                return json.load(f)
-        except:
-            return []
-    return []
-
-def save_project_allocation(allocation_data):
+def save_bulk_employee_data(employees):
     try:
-        existing_data = load_project_allocations()
-        existing_data.append(allocation_data)
-        with open('project_allocations.json', 'w') as f:
-            json.dump(existing_data, f, indent=4, default=str)
+        get_data_store().add_employees(employees)
         return True
+    except WriteConflict as e:
+        st.error(str(e))
+        return False
     except Exception as e:
-        st.error(f"Error saving allocation data: {str(e)}")
+        st.error(f"Error saving data: {str(e)}")
         return False
 
-def save_bulk_project_allocations(allocations_list):
+def load_project_allocations():
+    return get_data_store().allocations()
+
+def save_project_allocation(allocation_data, expected_version=None):
+    # expected_version: the data version capacity was checked against (see DataStore.add_allocations)
+    return save_bulk_project_allocations([allocation_data], expected_version)
+
+def save_bulk_project_allocations(allocations_list, expected_version=None):
     try:
-        existing_data = load_project_allocations()
-        existing_data.extend(allocations_list)
-        with open('project_allocations.json', 'w') as f:
-            json.dump(existing_data, f, indent=4, default=str)
+        get_data_store().add_allocations(allocations_list, expected_version)
         return True
+    except WriteConflict as e:
+        st.error(f"Allocations changed while this was being saved, so nothing was saved: {e}")
+        return False
     except Exception as e:
         st.error(f"Error saving bulk allocation data: {str(e)}")
         return False
 
 def get_employee_total_allocation(employee_id):
-    allocations = load_project_allocations()
-    total = 0
-    for alloc in allocations:
-        if alloc.get('employee_id') == employee_id:
-            total += alloc.get('allocation', 0)
-    return total
-
-def make_pandas_gemini_agent(
-    json_path: str,
-    gemini_model: str = "gemini-1.5-flash",
-    temperature: float = 0.0,
-    verbose: bool = True
-):
-    # 1. Load your JSON data into a DataFrame
-    df = pd.read_json(json_path)
-    # 2. Setup Gemini LLM
-    llm = ChatGoogleGenerativeAI(
+    return get_data_store().total_allocation(employee_id)
+
+def find_employee_by_name(employee_name_query):
+    # Ranked lookup by name or employee ID: (best employee or None, top matches, ambiguous)
+    return core.find_employee_by_name(get_data_store(), employee_name_query)
+
+def show_name_matches(matches):
+    store = get_data_store()
+    rows = []
+    for match in matches:
+        emp = store.get_employee(match.employee_id) or {}
+        rows.append({"Name": match.name, "ID": match.employee_id, "Designation": emp.get("designation", ""), "Department": emp.get("department", ""), "Match": f"{match.score:.0%}"})
+    st.dataframe(pd.DataFrame(rows), hide_index=True)
+
+def get_employee_peak_allocation(employee_id, start_date, end_date=None):
+    # Highest % allocated on any day in [start_date, end_date]; past projects don't count
+    return get_data_store().peak_allocation(employee_id, start_date, end_date)
+
+QUERY_MODES = ["Query plan (one model call)", "Agent (runs generated code)"]
+
+# The langchain stack takes seconds to import, so it is only loaded by the
+# Agentic Search page that uses it.
+
+@st.cache_resource
+def get_agent_llm(gemini_model: str = "gemini-1.5-flash", temperature: float = 0.0):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
         model=gemini_model,
-        google_api_key=st.secrets["GEMINI_API_KEY"],
+        google_api_key=get_setting("GEMINI_API_KEY"),
         temperature=temperature,
     )
-    # 3. Create pandas agent (no extra kwargs here!)
+
+@st.cache_resource(max_entries=2)
+def get_pandas_agent(data_version, verbose: bool = True):
+    from langchain.agents import AgentType
+    from langchain_experimental.agents.agent_toolkits.pandas.base import create_pandas_dataframe_agent
+
+    # Built once per data version: the df head is rendered into the prompt here.
+    # The frame sits on the memory-mapped snapshot, so sessions share its pages
+    df = get_data_store().snapshot().frame('allocations')
     pandas_agent = create_pandas_dataframe_agent(
-        llm=llm,
+        llm=get_agent_llm(),
         df=df,
         agent_type=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
         verbose=verbose,
@@ -138,10 +157,24 @@ def make_pandas_gemini_agent(
         number_of_head_rows=5,
         allow_dangerous_code=True,  # executes arbitrary code!
     )
-    # 4. Wrap in AgentExecutor so we can handle parsing errors
+    return pandas_agent, df
+
+@timed("app.make_pandas_gemini_agent")
+def make_pandas_gemini_agent(data_version, verbose: bool = True):
+    from langchain.agents import AgentExecutor
+
+    # 1. Cached agent and allocation DataFrame for this data version
+    pandas_agent, df = get_pandas_agent(data_version, verbose)
+    # 2. Each question gets its own interpreter state over a copy-on-write view
+    #    of the cached DataFrame, so code the agent runs cannot change it
+    tools = [
+        tool.model_copy(update={"locals": {"df": df.copy(deep=False)}}) if "df" in getattr(tool, "locals", {}) else tool
+        for tool in pandas_agent.tools
+    ]
+    # 3. Wrap in AgentExecutor so we can handle parsing errors
     agent_executor = AgentExecutor.from_agent_and_tools(
         agent=pandas_agent.agent,
-        tools=pandas_agent.tools,
+        tools=tools,
         verbose=verbose,
         handle_parsing_errors=True,  #
         max_iterations=10,
@@ -151,6 +184,7 @@ def make_pandas_gemini_agent(
 
 # --- Page Functions ---
 
+@timed("app.login_page")
 def login_page():
     st.title("Login")
     username = st.text_input("Username")
@@ -170,6 +204,7 @@ def login_page():
         else:
             st.error("Invalid username or password")
 
+@timed("app.employee_page")
 def employee_page():
     st.header("Add New Employee")
     with st.container():
@@ -185,7 +220,7 @@ def employee_page():
             date_of_joining = st.date_input("Date of Joining *", max_value=date.today(), help="Cannot be in the future", key="emp_date")
         with col2:
             designation = st.selectbox("Designation *", options=["", "Backend Developer", "Frontend Developer", "AI/ML/Data Scientist", "DevOps Engineer"], help="Select employee's technical role", key="emp_designation")
-            department = st.selectbox("Department *", options=["", "Software Engineering", "FinOps", "AI & Gen AI Solutions"], help="Select employee's department", key="emp_department")
+            department = st.selectbox("Department *", options=[""] + DEPARTMENTS, help="Select employee's department", key="emp_department")
             if designation and designation in ROLE_SKILLS:
                 available_skills = ROLE_SKILLS[designation]
                 selected_skills = st.multiselect(f"Skills * ({len(available_skills)} available)", options=available_skills, help=f"Select skills for {designation}", placeholder="Search and select skills...", key="emp_skills")
@@ -198,25 +233,11 @@ def employee_page():
                 else:
                     selected_skills = st.multiselect("Skills *", options=[], help="No skills available for this designation", placeholder="No skills available", disabled=True, key="emp_skills_error")
                     st.caption("❌ No skills for this designation")
-            location = st.selectbox("Location *", options=["", "Hyderabad", "Kolkata", "Hubli", "Gurgaon"], help="Select work location", key="emp_location")
+            location = st.selectbox("Location *", options=[""] + LOCATIONS, help="Select work location", key="emp_location")
             experience_years = st.number_input("Years of Experience *", min_value=0.0, max_value=50.0, step=0.5, help="Total years of professional experience", key="emp_experience")
         if st.button("💾 Save Employee Data", type="primary", use_container_width=True):
-            errors = []
-            if not employee_id: errors.append("Employee ID is required")
-            elif not validate_employee_id(employee_id): errors.append("Employee ID must be in format 'TM' followed by 5 digits (e.g., TM01418)")
-            elif check_duplicate_employee_id(employee_id): errors.append("Employee ID already exists")
-            if not name.strip(): errors.append("Name is required")
-            if not email: errors.append("Email is required")
-            elif not validate_email(email): errors.append("Email must end with @gmail.com")
-            if not phone: errors.append("Phone number is required")
-            elif not validate_phone(phone): errors.append("Phone number must be exactly 10 digits")
-            if not designation: errors.append("Designation is required")
-            if not department: errors.append("Department is required")
-            if not location: errors.append("Location is required")
-            if not validate_date(date_of_joining): errors.append("Date of joining cannot be in the future")
-            if experience_years <= 0: errors.append("Experience years must be greater than 0")
-            if not selected_skills or len(selected_skills) == 0: errors.append("At least one skill must be selected")
-            elif len(selected_skills) > 20: errors.append("Maximum 20 skills can be selected")
+            employee_data = { "employee_id": employee_id, "name": name, "email": email, "phone": phone, "designation": designation, "department": department, "date_of_joining": date_of_joining, "location": location, "experience_years": experience_years, "skills": selected_skills }
+            errors = employee_errors(employee_data, get_data_store())
             if errors:
                 st.markdown('<div class="error-message">', unsafe_allow_html=True)
                 st.error("❌ Please fix the following errors:")
@@ -224,7 +245,7 @@ def employee_page():
                     st.write(f"• {error}")
                 st.markdown('</div>', unsafe_allow_html=True)
             else:
-                employee_data = { "employee_id": employee_id, "name": name.strip(), "email": email.lower(), "phone": phone, "designation": designation, "department": department, "date_of_joining": date_of_joining.isoformat(), "location": location, "experience_years": experience_years, "skills": selected_skills, "skills_count": len(selected_skills), "created_at": datetime.now().isoformat() }
+                employee_data = employee_record(employee_data)
                 if save_employee_data(employee_data):
                     st.markdown('<div class="success-message">', unsafe_allow_html=True)
                     st.success(f"✅ Employee data for **{employee_data['name']}** (`{employee_id}`) saved successfully!")
@@ -233,16 +254,151 @@ def employee_page():
         st.markdown('</div>', unsafe_allow_html=True)
 
 
+PAGE_SIZES = [25, 50, 100, 250]
+
+def format_employee_rows(rows):
+    df_data = []
+    for emp in rows:
+        skills_display = ""
+        if emp.get("skills"):
+            skills_count = len(emp["skills"])
+            if skills_count <= 3:
+                skills_display = ", ".join(emp["skills"])
+            else:
+                skills_display = f"{', '.join(emp['skills'][:2])}... (+{skills_count-2} more)"
+        df_data.append({ "Employee ID": emp.get("employee_id", ""), "Name": emp.get("name", ""), "Designation": emp.get("designation", ""), "Department": emp.get("department", ""), "Location": emp.get("location", ""), "Experience": f"{emp.get('experience_years', 0)} years", "Skills": skills_display, "Skills Count": len(emp.get("skills", [])) })
+    return df_data
+
+def format_date(value, fmt="%d %b %Y"):
+    try:
+        return datetime.fromisoformat(str(value)).strftime(fmt)
+    except ValueError:
+        return str(value)
+
+def format_allocation_rows(rows):
+    return [{ "Project": alloc.get("project_name", ""), "Employee ID": alloc.get("employee_id", ""), "Name": alloc.get("name", ""), "Designation": alloc.get("designation", ""), "Allocation": f"{alloc.get('allocation', 0)}%", "Start Date": format_date(alloc.get("start_date", "")), "End Date": format_date(alloc["end_date"]) if alloc.get("end_date") else "Ongoing", "Allocated At": format_date(alloc.get("allocated_at", ""), "%d %b %Y %H:%M") } for alloc in rows]
+
+def show_table_page(key, fetch_page, sort_options, filter_field, format_rows):
+    # Search/filter/sort controls; only the visible page is fetched from the store and rendered
+    field, label, values = filter_field
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    search = col1.text_input("Search", key=f"{key}_search")
+    filter_value = col2.selectbox(f"Filter by {label}", [""] + values, key=f"{key}_filter")
+    sort_label = col3.selectbox("Sort by", list(sort_options), key=f"{key}_sort")
+    descending = col4.checkbox("Descending", key=f"{key}_descending")
+    col1, col2 = st.columns([1, 3])
+    page_size = col1.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_page_size")
+    page = col2.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_page")
+
+    query = dict(search=search, filters={field: filter_value}, sort_by=sort_options[sort_label], descending=descending)
+    rows, total = fetch_page(**query, offset=(page - 1) * page_size, limit=page_size)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        # Filters shrank the result; show the last page instead of an empty one
+        page = pages
+        rows, total = fetch_page(**query, offset=(page - 1) * page_size, limit=page_size)
+    if not rows:
+        st.info("No rows match the current filters.")
+        return
+    start = (page - 1) * page_size
+    st.caption(f"Showing {start + 1}–{start + len(rows)} of {total} (page {page} of {pages})")
+    st.dataframe(pd.DataFrame(format_rows(rows)), use_container_width=True, hide_index=True)
+
+def show_performance_panel():
+    metrics = get_metrics()
+    rows = metrics.summary()
+    if not rows:
+        st.info("No timings recorded yet.")
+    else:
+        st.dataframe(pd.DataFrame([{ "Span": row["span"], "Count": row["count"], "Errors": row["errors"], "p50 (ms)": round(row["p50_ms"], 2), "p95 (ms)": round(row["p95_ms"], 2), "Max (ms)": round(row["max_ms"], 2), "Last (ms)": round(row["last_ms"], 2) } for row in rows]), use_container_width=True, hide_index=True)
+    tokens = {}
+    for (_, labels), value in metrics.counters("llm_tokens").items():
+        labels = dict(labels)
+        tokens.setdefault(labels.get("model", ""), {"Model": labels.get("model", ""), "Prompt Tokens": 0, "Output Tokens": 0})
+        tokens[labels.get("model", "")]["Prompt Tokens" if labels.get("kind") == "prompt" else "Output Tokens"] += value
+    if tokens:
+        st.markdown("**LLM Token Usage**")
+        st.dataframe(pd.DataFrame(list(tokens.values())), hide_index=True)
+    st.caption(f"Percentiles over the last {metrics.samples} calls of each span. Spans are logged to {metrics.log_path or 'nowhere'}; Prometheus metrics are written to {metrics.prometheus_path or 'nowhere'}.")
+
+# Color scale for each utilization heatmap measure
+UTILIZATION_COLORS = {"utilization": "Blues", "bench": "Oranges", "over_allocated": "Reds", "headcount": "Greens"}
+
+@timed("app.utilization_panel")
+def show_utilization_panel():
+    # graph_objects rather than plotly.express: a fraction of the build time per figure
+    import plotly.graph_objects as go
+
+    from analytics import DIMENSIONS, MEASURES
+
+    store = get_data_store()
+    overall = store.utilization()
+    months = list(overall["month"])
+    first, last = months[0], months[-1]
+    if len(months) > 1:
+        # Defaults to the last 12 and next 6 months, where the data has them
+        current = min(bisect_left(months, date.today().strftime("%Y-%m")), len(months) - 1)
+        default = (months[max(0, current - 11)], months[min(len(months) - 1, current + 6)])
+        first, last = st.select_slider("Months", options=months, value=default, key="utilization_months")
+
+    def in_range(frame):
+        return frame[(frame["month"] >= first) & (frame["month"] <= last)]
+
+    trend = in_range(overall)
+    utilization_chart = go.Figure(go.Scatter(x=trend["month"], y=trend["utilization"], mode="lines+markers", name=MEASURES["utilization"]))
+    utilization_chart.update_layout(title="Average Utilization", xaxis_title="Month", yaxis_title=MEASURES["utilization"])
+    bench_chart = go.Figure([go.Scatter(x=trend["month"], y=trend[measure], mode="lines+markers", name=MEASURES[measure]) for measure in ("bench", "over_allocated")])
+    bench_chart.update_layout(title="Bench and Over-allocation", xaxis_title="Month", yaxis_title="Employees")
+    col1, col2 = st.columns(2)
+    col1.plotly_chart(utilization_chart, key="utilization_trend")
+    col2.plotly_chart(bench_chart, key="bench_trend")
+
+    col1, col2 = st.columns(2)
+    dimension = col1.selectbox("Group by", list(DIMENSIONS), format_func=DIMENSIONS.get, key="utilization_dimension")
+    measure = col2.selectbox("Show", list(MEASURES), format_func=MEASURES.get, key="utilization_measure")
+    grid = in_range(store.utilization(dimension)).pivot(index=dimension, columns="month", values=measure)
+    heatmap = go.Figure(go.Heatmap(z=grid.to_numpy(), x=list(grid.columns), y=list(grid.index), colorscale=UTILIZATION_COLORS[measure],
+                                   colorbar={"title": MEASURES[measure]}, hovertemplate="%{y}<br>%{x}: %{z}<extra></extra>"))
+    heatmap.update_layout(xaxis_title="Month", yaxis_title=DIMENSIONS[dimension], height=max(300, 28 * len(grid)))
+    st.plotly_chart(heatmap, key="utilization_heatmap")
+    st.caption("Utilization is the average allocation over each day of the month. An employee counts from the month they joined (or earlier if allocated), is on the bench in a month with no allocation on any day, and is over-allocated when some day is above 100%.")
+
+@timed("app.admin_page")
 def admin_page():
     st.header("Admin Dashboard")
     
-    existing_data = load_existing_data()
-    
-    if not existing_data:
+    summary = get_data_store().summary()
+    if not summary['employees']:
         st.info("No employee data to display yet.")
         return
 
-    df = pd.DataFrame(existing_data)
+    existing_data = load_existing_data()
+
+    # --- Workforce Summary ---
+    with st.expander("📈 Workforce Summary", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Employees", summary['employees'])
+        col2.metric("Projects", summary['projects'])
+        col3.metric("Allocations", summary['allocations'])
+        col4.metric("Total Allocation", f"{summary['total_allocation']:g}%")
+        col1, col2, col3 = st.columns(3)
+        for column, title, counts in ((col1, "Department", summary['departments']), (col2, "Designation", summary['designations']), (col3, "Location", summary['locations'])):
+            column.dataframe(pd.DataFrame(sorted(counts.items(), key=lambda item: -item[1]), columns=[title, "Employees"]), hide_index=True)
+        top_skills = sorted(summary['skills'].items(), key=lambda item: -item[1])[:15]
+        st.markdown("**Most Common Skills**")
+        st.dataframe(pd.DataFrame(top_skills, columns=["Skill", "Employees"]), hide_index=True)
+
+    # --- Utilization ---
+    utilization_expander = st.expander("📅 Utilization", expanded=False, key="utilization_expander", on_change="rerun")
+    if utilization_expander.open:
+        with utilization_expander:
+            show_utilization_panel()
+
+    # --- Performance ---
+    performance_expander = st.expander("⏱️ Performance", expanded=False, key="performance_expander", on_change="rerun")
+    if performance_expander.open:
+        with performance_expander:
+            show_performance_panel()
 
     # --- Project Allocation ---
     # st.subheader("Project Allocation")
@@ -264,28 +420,68 @@ def admin_page():
                 if not project_name.strip():
                     st.error("Project name is required")
                 else:
-                    current_allocation = get_employee_total_allocation(employee_id)
-                    if current_allocation + allocation > 100:
-                        st.error(f"Cannot allocate. Employee {employee_id} is already allocated {current_allocation}%. This allocation would exceed 100%.")
-                    else:
-                        employee_details = next((emp for emp in existing_data if emp['employee_id'] == employee_id), None)
-                        if employee_details:
-                            allocation_data = employee_details.copy()
-                            allocation_data.update({
-                                "project_name": project_name.strip(),
-                                "start_date": project_start_date.isoformat(),
-                                "end_date": project_end_date.isoformat(),
-                                "allocation": allocation,
-                                "allocated_at": datetime.now().isoformat()
-                            })
-                            if save_project_allocation(allocation_data):
-                                st.success(f"Project '{project_name}' allocated to {selected_employee_str}")
-                            else:
-                                st.error("Failed to save project allocation")
+                    # Rechecked on save if another admin allocates in the meantime
+                    data_version = get_data_store().refresh()
+                    employee_details = get_data_store().get_employee(employee_id)
+                    if employee_details:
+                        allocation_data, errors = check_allocation(
+                            get_data_store().capacity_overlay(), employee_details, project_name, project_start_date, project_end_date, allocation)
+                        if errors:
+                            for error in errors:
+                                st.error(error)
+                        elif save_project_allocation(allocation_data, data_version):
+                            st.success(f"Project '{project_name}' allocated to {selected_employee_str}")
                         else:
-                            st.error("Could not find employee details to save.")
+                            st.error("Failed to save project allocation")
+                    else:
+                        st.error("Could not find employee details to save.")
         st.markdown('</div>', unsafe_allow_html=True)
 
+    # --- Bulk Employee Import ---
+    st.subheader("Bulk Employee Import")
+    with st.container():
+        st.markdown("### Upload a CSV or JSON File of Employees")
+
+        template_df = pd.DataFrame({
+            'employee_id': ['TM00001'],
+            'name': ['John Doe'],
+            'email': ['john.doe@gmail.com'],
+            'phone': ['9876543210'],
+            'designation': ['Backend Developer'],
+            'department': [DEPARTMENTS[0]],
+            'date_of_joining': [date.today().isoformat()],
+            'location': [LOCATIONS[0]],
+            'experience_years': [3],
+            'skills': [SKILL_SEPARATOR.join(ROLE_SKILLS['Backend Developer'][:2])],
+        })
+        st.download_button("📥 Download Template CSV", template_df.to_csv(index=False), "employee_template.csv", "text/csv", key="employee_template")
+        st.caption(f"Separate skills with '{SKILL_SEPARATOR}' in a CSV; in a JSON list of employees, give them as a list.")
+
+        uploaded_employees = st.file_uploader("Choose a CSV or JSON file", type=["csv", "json"], key="employee_upload")
+        # Reruns keep the upload around; import each file only once
+        if uploaded_employees is not None and st.session_state.get("employee_upload_saved") != uploaded_employees.file_id:
+            try:
+                # All rows are checked at once against the in-memory ID index, then saved in one write
+                first_row = 1 if uploaded_employees.name.lower().endswith('.json') else 2
+                new_employees, errors = validate_employees(
+                    read_employee_file(uploaded_employees, uploaded_employees.name), get_data_store().employee_ids(), first_row)
+
+                if not errors.empty:
+                    st.error(f"Errors found in the uploaded file ({errors['Row'].nunique()} rows rejected):")
+                    st.dataframe(errors, use_container_width=True, hide_index=True)
+
+                if new_employees:
+                    if save_bulk_employee_data(new_employees):
+                        st.session_state["employee_upload_saved"] = uploaded_employees.file_id
+                        st.success(f"Successfully added {len(new_employees)} employees.")
+                    else:
+                        st.error("Failed to save the employees.")
+
+            except ValueError as e:
+                st.error(str(e))
+            except Exception as e:
+                st.error(f"An error occurred while processing the file: {e}")
+
     # --- Bulk Project Allocation ---
     st.subheader("Bulk Project Allocation")
     with st.container():
@@ -302,91 +498,64 @@ def admin_page():
         template_csv = template_df.to_csv(index=False)
         st.download_button("📥 Download Template CSV", template_csv, "allocation_template.csv", "text/csv")
 
-        uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
-        if uploaded_file is not None:
+        uploaded_file = st.file_uploader("Choose a CSV file", type="csv", key="allocation_upload")
+        # Reruns keep the upload around; save each file only once
+        if uploaded_file is not None and st.session_state.get("allocation_upload_saved") != uploaded_file.file_id:
             try:
-                upload_df = pd.read_csv(uploaded_file)
-                required_columns = ['project_name', 'start_date', 'end_date', 'allocation', 'employee_id']
-                if not all(col in upload_df.columns for col in required_columns):
-                    st.error(f"CSV must contain the following columns: {required_columns}")
-                else:
-                    new_allocations = []
-                    errors = []
-                    # Keep track of allocations within the uploaded file to handle multiple entries for the same employee
-                    in_file_allocations = {}
-
-                    for index, row in upload_df.iterrows():
-                        employee_id = row['employee_id']
-                        allocation_value = row['allocation']
-
-                        # Get allocation already in the file for this employee
-                        in_file_total = in_file_allocations.get(employee_id, 0)
-                        # Get allocation from the saved data
-                        existing_total = get_employee_total_allocation(employee_id)
-
-                        if existing_total + in_file_total + allocation_value > 100:
-                            errors.append(f"Row {index+2}: Cannot allocate {allocation_value}% to employee {employee_id}. Total allocation would exceed 100%.")
-                            continue
-
-                        employee_details = next((emp for emp in existing_data if emp['employee_id'] == employee_id), None)
-                        if employee_details:
-                            allocation_data = employee_details.copy()
-                            allocation_data.update({
-                                "project_name": row['project_name'],
-                                "start_date": row['start_date'],
-                                "end_date": row['end_date'],
-                                "allocation": allocation_value,
-                                "allocated_at": datetime.now().isoformat()
-                            })
-                            new_allocations.append(allocation_data)
-                            # Update the in-file allocation total for this employee
-                            in_file_allocations[employee_id] = in_file_total + allocation_value
-                        else:
-                            errors.append(f"Row {index+2}: Employee with ID '{employee_id}' not found.")
-                    
-                    if errors:
-                        st.error("Errors found in the uploaded file:")
-                        for error in errors:
-                            st.write(error)
-                    
-                    if new_allocations:
-                        if save_bulk_project_allocations(new_allocations):
-                            st.success(f"Successfully allocated {len(new_allocations)} projects.")
-                        else:
-                            st.error("Failed to save bulk allocations.")
+                # Validated chunk by chunk against the in-memory employee index and totals
+                store = get_data_store()
+                data_version = store.refresh()
+                new_allocations, errors = validate_allocation_chunks(
+                    read_allocation_csv(uploaded_file), store.employee_ids(), store.allocation_totals(), store.capacity_overlay())
+
+                if not errors.empty:
+                    st.error(f"Errors found in the uploaded file ({len(errors)} rows rejected):")
+                    st.dataframe(errors, use_container_width=True, hide_index=True)
+
+                if new_allocations:
+                    if save_bulk_project_allocations(new_allocations, data_version):
+                        st.session_state["allocation_upload_saved"] = uploaded_file.file_id
+                        st.success(f"Successfully allocated {len(new_allocations)} projects.")
+                    else:
+                        st.error("Failed to save bulk allocations.")
 
+            except ValueError as e:
+                st.error(str(e))
             except Exception as e:
                 st.error(f"An error occurred while processing the file: {e}")
         st.markdown('</div>', unsafe_allow_html=True)
 
     # --- View Project Allocations ---
-    with st.expander("📂 View Project Allocations", expanded=False):
-        project_allocations = load_project_allocations()
-        if not project_allocations:
-            st.info("No project allocations to display yet.")
-        else:
-            st.markdown(f"**Total Allocations: {len(project_allocations)}**")
-            allocations_df = pd.DataFrame(project_allocations)
-            st.dataframe(allocations_df, use_container_width=True)
+    # Expanders rerun when toggled so their tables are only built while open
+    store = get_data_store()
+    allocations_expander = st.expander("📂 View Project Allocations", expanded=False, key="allocations_expander", on_change="rerun")
+    if allocations_expander.open:
+        with allocations_expander:
+            if not summary['allocations']:
+                st.info("No project allocations to display yet.")
+            else:
+                st.markdown(f"**Total Allocations: {summary['allocations']}**")
+                show_table_page(
+                    "allocations", store.allocation_page,
+                    sort_options={"Allocated At": "allocated_at", "Project": "project_name", "Employee": "name", "Start Date": "start_date", "End Date": "end_date", "Allocation": "allocation"},
+                    filter_field=("project_name", "Project", sorted(summary['project_allocations'], key=str)),
+                    format_rows=format_allocation_rows,
+                )
+                st.download_button(label="📥 Download Allocations (CSV)", data=lambda: store.allocation_frame().to_csv(index=False), file_name=f"project_allocations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", mime="text/csv")
 
     # --- Employee Data Table ---
-    with st.expander("📊 View All Employees", expanded=False):
-        st.markdown(f"**Total Employees: {len(existing_data)}**")
-        df_data = []
-        for emp in existing_data:
-            skills_display = ""
-            if emp.get("skills"):
-                skills_count = len(emp["skills"])
-                if skills_count <= 3:
-                    skills_display = ", ".join(emp["skills"])
-                else:
-                    skills_display = f"{', '.join(emp['skills'][:2])}... (+{skills_count-2} more)"
-            df_data.append({ "Employee ID": emp.get("employee_id", ""), "Name": emp.get("name", ""), "Designation": emp.get("designation", ""), "Department": emp.get("department", ""), "Location": emp.get("location", ""), "Experience": f"{emp.get('experience_years', 0)} years", "Skills": skills_display, "Skills Count": len(emp.get("skills", [])) })
-        if df_data:
-            df_display = pd.DataFrame(df_data)
-            st.dataframe(df_display, use_container_width=True)
-            json_str = json.dumps(existing_data, indent=2, default=str)
-            st.download_button(label="📥 Download Employee Data (JSON)", data=json_str, file_name=f"employees_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", mime="application/json")
+    employees_expander = st.expander("📊 View All Employees", expanded=False, key="employees_expander", on_change="rerun")
+    if employees_expander.open:
+        with employees_expander:
+            st.markdown(f"**Total Employees: {summary['employees']}**")
+            show_table_page(
+                "employees", store.employee_page,
+                sort_options={"Employee ID": "employee_id", "Name": "name", "Designation": "designation", "Department": "department", "Location": "location", "Experience": "experience_years", "Skills Count": "skills_count"},
+                filter_field=("department", "Department", sorted(summary['departments'], key=str)),
+                format_rows=format_employee_rows,
+            )
+            # Serialized only when the button is clicked
+            st.download_button(label="📥 Download Employee Data (JSON)", data=lambda: json.dumps(store.employees(), indent=2, default=str), file_name=f"employees_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json", mime="application/json")
 
     st.markdown("---")
 
@@ -405,7 +574,7 @@ def admin_page():
                 return
 
             with st.spinner('Processing natural language allocation...'):
-                response_json = get_gemini_response(nl_allocation_query)
+                response_json, parsed_locally = parse_query(nl_allocation_query)
 
                 if not response_json:
                     return
@@ -416,67 +585,18 @@ def admin_page():
                 st.subheader("Allocation Result")
 
                 if intent == "allocate_project":
-                    employee_name_query = entities.get("employee_name")
-                    project_name = entities.get("project_name")
-                    start_date_str = entities.get("start_date")
-                    end_date_str = entities.get("end_date")
-                    allocation_val = entities.get("allocation")
-
-                    errors = []
-                    if not employee_name_query: errors.append("Employee name is missing.")
-                    if not project_name: errors.append("Project name is missing.")
-                    if not start_date_str: errors.append("Start date is missing.")
-                    if not end_date_str: errors.append("End date is missing.")
-                    if allocation_val is None: errors.append("Allocation percentage is missing.")
-
-                    found_employee = None
-                    if employee_name_query:
-                        all_employees = load_existing_data()
-                        for emp in all_employees:
-                            if emp['name'].lower() in employee_name_query.lower() or employee_name_query.lower() in emp['name'].lower():
-                                found_employee = emp
-                                break
-                        if not found_employee:
-                            errors.append(f"Employee matching '{employee_name_query}' not found.")
-
-                    try:
-                        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-                    except (ValueError, TypeError):
-                        errors.append("Start date format is invalid. Please use YYYY-MM-DD.")
-                        start_date = None
-                    
-                    try:
-                        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-                    except (ValueError, TypeError):
-                        errors.append("End date format is invalid. Please use YYYY-MM-DD.")
-                        end_date = None
-
-                    if start_date and end_date and start_date > end_date:
-                        errors.append("Start date cannot be after end date.")
-                    
-                    if allocation_val is not None and (not isinstance(allocation_val, (int, float)) or not (1 <= allocation_val <= 100)):
-                        errors.append("Allocation percentage must be a number between 1 and 100.")
-                    
-                    if not errors and found_employee:
-                        current_allocation = get_employee_total_allocation(found_employee['employee_id'])
-                        if current_allocation + allocation_val > 100:
-                            errors.append(f"Cannot allocate. {found_employee['name']} is already allocated {current_allocation}%. This allocation would exceed 100%.")
+                    data_version = get_data_store().refresh()
+                    allocation_data, found_employee, errors, name_matches = check_nl_allocation(get_data_store(), entities, get_data_store().capacity_overlay())
 
                     if errors:
                         st.error("Could not allocate project due to the following issues:")
                         for err in errors:
                             st.write(f"- {err}")
+                        if len(name_matches) > 1:
+                            show_name_matches(name_matches)
                     else:
-                        allocation_data = found_employee.copy()
-                        allocation_data.update({
-                            "project_name": project_name,
-                            "start_date": start_date.isoformat(),
-                            "end_date": end_date.isoformat(),
-                            "allocation": allocation_val,
-                            "allocated_at": datetime.now().isoformat()
-                        })
-                        if save_project_allocation(allocation_data):
-                            st.success(f"Successfully allocated **{project_name}** to **{found_employee['name']}** with **{allocation_val}%** allocation.")
+                        if save_project_allocation(allocation_data, data_version):
+                            st.success(f"Successfully allocated **{allocation_data['project_name']}** to **{found_employee['name']}** with **{allocation_data['allocation']}%** allocation.")
                         else:
                             st.error("Failed to save project allocation.")
                 elif intent == "other":
@@ -487,98 +607,142 @@ def admin_page():
                 # --- Display LLM Interpretation for Transparency ---
                 with st.expander("Show LLM Interpretation"): 
                     st.write(f"**Recognized Intent:** `{intent}`")
+                    show_parser_stats(parsed_locally)
                     st.write("**Raw LLM Response:**")
                     st.json(response_json)
         st.markdown('</div>', unsafe_allow_html=True)
 
-def get_gemini_response(query):
-    try:
-        # It's recommended to use st.secrets for API keys
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        meta_prompt = f"""You are an expert query-parsing assistant for an employee management system. Your task is to analyze the user's prompt and convert it into a structured JSON object.
-
-Your response MUST be only the JSON object and nothing else.
-
-Here are the possible user intents and the entities you must extract for each:
-
-1.  **Intent: `search_candidate`**
-    *   Triggered when the user is looking for an employee to hire or allocate. Examples: "Find me a developer", "I need a devops engineer with AWS for 50%"
-    *   **Entities to extract:** `designation` (string, must be one of ["Backend Developer", "Frontend Developer", "AI/ML/Data Scientist", "DevOps Engineer"]), `skills` (array of strings), `allocation_needed` (integer).
-
-2.  **Intent: `find_employee_projects`**
-    *   Triggered when the user wants to know which projects an employee is on. Examples: "what projects is X working on?", "show me X's projects"
-    *   **Entities to extract:** `employee_name` (string).
-
-3.  **Intent: `get_employee_allocation`**
-    *   Triggered when the user asks for the total allocation of an employee. Examples: "what is X's allocation?", "how much is X allocated?"
-    *   **Entities to extract:** `employee_name` (string).
-
-4.  **Intent: `get_employee_skills`**
-    *   Triggered when the user asks for an employee's skills. Examples: "what are X's skills?", "show me the skills for X"
-    *   **Entities to extract:** `employee_name` (string).
-
-5.  **Intent: `get_employee_phone`**
-    *   Triggered when the user asks for an employee's phone number. Examples: "what is X's phone number?", "find the phone for X"
-    *   **Entities to extract:** `employee_name` (string).
-
-6.  **Intent: `get_employee_department`**
-    *   Triggered when the user asks for an employee's department. Examples: "which department is X in?", "what is X's department?"
-    *   **Entities to extract:** `employee_name` (string).
-
-7.  **Intent: `get_employee_designation`**
-    *   Triggered when the user asks for an employee's designation. Examples: "what is X's designation?", "what is X's role?"
-    *   **Entities to extract:** `employee_name` (string).
-
-8.  **Intent: `get_employee_id`**
-    *   Triggered when the user asks for an employee's ID. Examples: "what is X's employee ID?", "employee id for X"
-    *   **Entities to extract:** `employee_name` (string).
-
-9.  **Intent: `get_employee_experience`**
-    *   Triggered when the user asks for an employee's experience. Examples: "how much experience does X have?", "what is X's experience?"
-    *   **Entities to extract:** `employee_name` (string).
+    # --- Batch Natural Language Project Allocation ---
+    with st.container():
+        st.markdown("### Batch Allocation using Natural Language")
+        st.info("Paste one allocation request per line, or upload a .txt file with one request per line.")
+
+        batch_text = st.text_area("Allocation requests:", key="nl_batch_requests", height=150)
+        batch_file = st.file_uploader("Or choose a text file", type="txt", key="nl_batch_file")
+
+        if st.button("Allocate All (NLP)", key="nl_batch_button"):
+            lines = batch_text.splitlines()
+            if batch_file is not None:
+                lines += batch_file.getvalue().decode("utf-8", errors="replace").splitlines()
+            requests = [(number, line.strip()) for number, line in enumerate(lines, start=1) if line.strip() and not line.strip().startswith("#")]
+            if not requests:
+                st.warning("Please enter at least one allocation request.")
+                return
 
-10. **Intent: `get_employee_email`**
-    *   Triggered when the user asks for an employee's email. Examples: "what is the email for X?", "email address of X", "find X's email"
-    *   **Entities to extract:** `employee_name` (string).
+            with st.spinner(f'Processing {len(requests)} allocation requests...'):
+                parsed = parse_queries([line for _, line in requests])
+
+                # Every line is checked against the same scratch capacity view, so
+                # lines earlier in the batch count towards the ones after them
+                data_version = get_data_store().refresh()
+                capacity = get_data_store().capacity_overlay()
+                accepted = []
+                result_rows = []
+                for (number, line), (response_json, parse_error) in zip(requests, parsed):
+                    row = {"Line": number, "Request": line, "Employee": "", "Project": "", "Start": "", "End": "", "Allocation": "", "Status": "Rejected", "Reason": ""}
+                    if parse_error:
+                        row["Reason"] = parse_error
+                    elif not response_json or response_json.get("intent") != "allocate_project":
+                        row["Reason"] = "Not recognized as an allocation request."
+                    else:
+                        entities = response_json.get("entities") or {}
+                        allocation_data, found_employee, errors, _ = check_nl_allocation(get_data_store(), entities, capacity)
+                        row.update({
+                            "Employee": found_employee['name'] if found_employee else entities.get("employee_name") or "",
+                            "Project": entities.get("project_name") or "",
+                            "Start": entities.get("start_date") or "",
+                            "End": entities.get("end_date") or "",
+                            "Allocation": f"{entities.get('allocation')}%" if entities.get("allocation") is not None else "",
+                        })
+                        if errors:
+                            row["Reason"] = " ".join(errors)
+                        else:
+                            accepted.append(allocation_data)
+                            row["Status"] = "Allocated"
+                    result_rows.append(row)
+
+                # One write for the whole batch
+                if accepted and not save_bulk_project_allocations(accepted, data_version):
+                    for row in result_rows:
+                        if row["Status"] == "Allocated":
+                            row["Status"], row["Reason"] = "Rejected", "Failed to save project allocation."
+                    accepted = []
+
+            if accepted:
+                st.success(f"Successfully allocated {len(accepted)} of {len(requests)} requests.")
+            if len(accepted) < len(requests):
+                st.error(f"{len(requests) - len(accepted)} requests could not be allocated.")
+            st.dataframe(pd.DataFrame(result_rows), use_container_width=True, hide_index=True)
+
+@st.cache_resource
+def get_response_cache():
+    # Parsed intents survive restarts in INTENT_CACHE_PATH; an empty path keeps them in memory only
+    return ResponseCache(
+        path=get_setting("INTENT_CACHE_PATH", CACHE_FILE),
+        ttl=float(get_setting("INTENT_CACHE_TTL", DEFAULT_TTL)),
+    )
 
-11. **Intent: `get_employee_doj`**
-    *   Triggered when the user asks for an employee's date of joining. Examples: "when did X join?", "what is the joining date for X?"
-    *   **Entities to extract:** `employee_name` (string).
+@st.cache_resource
+def get_llm_client():
+    # One pooled client per process; GEMINI_BASE_URL can point at a local stub
+    # (python llm_client.py stub-server)
+    from llm_client import DEFAULT_BASE_URL, DEFAULT_CONCURRENCY, DEFAULT_TIMEOUT, GeminiClient
+
+    return GeminiClient(
+        api_key=get_setting("GEMINI_API_KEY"),
+        model=GEMINI_MODEL,
+        base_url=get_setting("GEMINI_BASE_URL", DEFAULT_BASE_URL),
+        timeout=float(get_setting("LLM_TIMEOUT", DEFAULT_TIMEOUT)),
+        max_concurrency=int(get_setting("LLM_MAX_CONCURRENCY", DEFAULT_CONCURRENCY)),
+    )
 
-12. **Intent: `get_employee_location`**
-    *   Triggered when the user asks for an employee's location. Examples: "where is X located?", "X's location", "location of X"
-    *   **Entities to extract:** `employee_name` (string).
+@st.cache_resource
+def get_intent_parser():
+    return IntentParser(ROLE_SKILLS)
 
-13. **Intent: `allocate_project`**
-    *   Triggered when the user wants to allocate an employee to a project. Examples: "allocate X to Project Alpha from YYYY-MM-DD to YYYY-MM-DD with Z% allocation", "assign X to project Beta, start 2025-01-01 end 2025-06-30, 50%"
-    *   **Entities to extract:** `employee_name` (string), `project_name` (string), `start_date` (string, YYYY-MM-DD format), `end_date` (string, YYYY-MM-DD format), `allocation` (integer).
+@st.cache_resource
+def get_intent_service():
+    return IntentService(get_intent_parser(), get_response_cache(), get_llm_client())
 
-14. **Intent: `get_employee_details`**
-    *   Triggered when the user asks for all details of an employee. Examples: "give me the details of X", "information about X", "show me everything for X"
-    *   **Entities to extract:** `employee_name` (string).
+@st.cache_resource
+def get_query_planner():
+    # Plans share the intent cache (keyed by their own prompt); results are cached per data snapshot
+    from query_plan import QueryPlanner
 
-15. **Intent: `other`**
-    *   Triggered when the user's query does not match any of the other intents. Examples: "hello", "how are you", "what is the weather today?"
-    *   **Entities to extract:** None.
+    return QueryPlanner(get_response_cache(), get_llm_client())
 
----
-**User's Prompt:** "{query}"
----
+def parse_query(query):
+    # Common phrasings are parsed locally in well under a millisecond; Gemini
+    # only sees what the rules are unsure about. Returns (response, parsed_locally).
+    response_json = get_intent_service().parse_local(query, get_data_store().name_index())
+    if response_json is not None:
+        return response_json, True
+    return get_gemini_response(query), False
 
-**Your JSON Response:**"""
+def show_parser_stats(parsed_locally):
+    parser_stats = get_intent_parser().stats()
+    cache_stats = get_response_cache().stats()
+    st.caption(f"Parsed {'locally' if parsed_locally else 'by Gemini'}. Local parser: {parser_stats['served_locally']} of {parser_stats['served_locally'] + parser_stats['sent_to_llm']} queries ({parser_stats['local_rate']:.0%}).")
+    st.caption(f"Intent cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits, {cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)")
 
-        response = model.generate_content(meta_prompt)
-        # Clean up the response to get a valid JSON string
-        json_response_str = response.text.strip().replace('```json', '').replace('```', '')
-        return json.loads(json_response_str)
+def parse_queries(queries):
+    # parse_query for many queries at once: (response or None, error or None) per query
+    return get_intent_service().parse_many(queries, get_data_store().name_index())
 
-    except Exception as e:
-        st.error(f"An error occurred while contacting the AI model: {e}")
+@timed("app.get_gemini_response")
+def get_gemini_response(query):
+    # Answered from the intent cache when the same question was asked before
+    from llm_client import LLMTimeout
+
+    response_json, error = get_intent_service().ask(query)
+    if isinstance(error, LLMTimeout):
+        st.error(f"{error}. Please try again in a moment.")
+    elif error is not None:
+        st.error(f"An error occurred while contacting the AI model: {error}")
         st.info("Please ensure your Gemini API key is configured correctly in .streamlit/secrets.toml")
-        return None
+    return response_json
 
+@timed("app.intent_based_search_page")
 def intent_based_search_page():
     st.header("Intent-Based Search")
     st.info("Ask questions like: 'Find a DevOps engineer with AWS and 50% allocation' or 'What projects is Jane Doe working on?'")
@@ -591,7 +755,7 @@ def intent_based_search_page():
             return
 
         with st.spinner('Searching and processing...'):
-            response_json = get_gemini_response(query)
+            response_json, parsed_locally = parse_query(query)
 
             if not response_json:
                 return
@@ -615,25 +779,23 @@ def intent_based_search_page():
                     st.error("Could not identify an employee name in your query for this type of question.")
                     return
 
-                all_employees = load_existing_data()
-                found_employee = None
-                for emp in all_employees:
-                    if emp['name'].lower() in employee_name_query.lower() or employee_name_query.lower() in emp['name'].lower():
-                        found_employee = emp
-                        break
-                
+                found_employee, name_matches, ambiguous = find_employee_by_name(employee_name_query)
+
                 if not found_employee:
                     st.error(f"Employee matching '{employee_name_query}' not found.")
                     return
+                if ambiguous:
+                    st.warning(f"Several employees match '{employee_name_query}'. Please ask again with the full name or employee ID.")
+                    show_name_matches(name_matches)
+                    return
 
                 # --- Execute the specific lookup intent ---
                 if intent == "get_employee_allocation":
-                    total_allocation = get_employee_total_allocation(found_employee['employee_id'])
-                    st.success(f"**{found_employee['name']}** has a total allocation of **{total_allocation}%**.")
+                    total_allocation = get_employee_peak_allocation(found_employee['employee_id'], date.today(), date.today())
+                    st.success(f"**{found_employee['name']}** has a current allocation of **{total_allocation}%**.")
 
                 elif intent == "find_employee_projects":
-                    project_allocations = load_project_allocations()
-                    employee_projects = [alloc for alloc in project_allocations if alloc['employee_id'] == found_employee['employee_id']]
+                    employee_projects = get_data_store().allocations_for_employee(found_employee['employee_id'])
                     if not employee_projects:
                         st.success(f"**{found_employee['name']}** is not currently allocated to any projects.")
                     else:
@@ -684,8 +846,7 @@ def intent_based_search_page():
                     st.dataframe(employee_df)
 
                     # Display project allocations
-                    project_allocations = load_project_allocations()
-                    employee_projects = [alloc for alloc in project_allocations if alloc['employee_id'] == found_employee['employee_id']]
+                    employee_projects = get_data_store().allocations_for_employee(found_employee['employee_id'])
                     
                     if not employee_projects:
                         st.info(f"**{found_employee['name']}** is not currently allocated to any projects.")
@@ -696,47 +857,42 @@ def intent_based_search_page():
             elif intent == "search_candidate":
                 designation = entities.get("designation")
                 required_skills = set(entities.get("skills", []))
-                allocation_needed = entities.get("allocation_needed", 0)
+                allocation_needed = entities.get("allocation_needed", 0) or 0
 
                 if not designation:
                     st.error("Please specify a designation for the candidate search.")
                     return
 
-                all_employees = load_existing_data()
-                candidates = [emp for emp in all_employees if emp['designation'] == designation]
-
-                if not candidates:
+                store = get_data_store()
+                if not store.skill_index().designation_count(designation):
                     st.warning(f"No employees found with the designation: {designation}")
                     return
 
-                ranked_candidates = []
-                for cand in candidates:
-                    available_allocation = 100 - get_employee_total_allocation(cand['employee_id'])
-                    if available_allocation >= allocation_needed:
-                        skill_match_score = len(set(cand.get('skills', [])) & required_skills)
-                        if not required_skills or skill_match_score > 0:
-                            ranked_candidates.append({
-                                "Name": cand['name'],
-                                "ID": cand['employee_id'],
-                                "Skill Match": f"{skill_match_score} / {len(required_skills)}",
-                                "Available Allocation": f"{available_allocation}%",
-                                "score": skill_match_score
-                            })
-                
-                if not ranked_candidates:
+                # Capacity from today onwards; projects that have ended free it up
+                matches, total_matches = store.search_candidates(designation, required_skills, allocation_needed, k=MAX_CANDIDATES)
+
+                if not matches:
                     st.info("No candidates found matching all criteria (designation, skills, and required allocation).")
                     return
 
-                sorted_candidates = sorted(ranked_candidates, key=lambda x: x['score'], reverse=True)
-                
-                for cand in sorted_candidates:
-                    del cand['score']
+                ranked_candidates = [
+                    {
+                        "Name": match.employee['name'],
+                        "ID": match.employee['employee_id'],
+                        "Skill Match": f"{match.score} / {len(required_skills)}",
+                        "Available Allocation": f"{match.available:g}%",
+                    }
+                    for match in matches
+                ]
+                if total_matches > len(matches):
+                    st.caption(f"Showing the top {len(matches)} of {total_matches} matching candidates.")
 
-                st.dataframe(pd.DataFrame(sorted_candidates))
+                st.dataframe(pd.DataFrame(ranked_candidates))
 
             # --- Display LLM Interpretation for Transparency ---
             with st.expander("Show LLM Interpretation"): # Moved outside the else block
                 st.write(f"**Recognized Intent:** `{intent}`")
+                show_parser_stats(parsed_locally)
                 st.write("**Raw LLM Response:**")
                 st.json(response_json)
 
@@ -746,10 +902,14 @@ def intent_based_search_page():
                 # st.info("Here is the raw response from the AI model for debugging:")
                 # st.json(response_json)
 
+@timed("app.agentic_search_page")
 def agentic_search_page():
     st.header("Agentic Search")
     st.info("Ask questions about your data. For example: 'what is the total allocation for the wellora?'")
-    st.warning("**Warning:** This feature uses an agent that can execute arbitrary code. Use with caution.")
+    mode = st.radio("Mode", QUERY_MODES, horizontal=True, key="agentic_mode",
+                    help="Query plan: one model call turns the question into a query that runs locally. Agent: a ReAct agent that writes and runs pandas code, in several model calls.")
+    if mode == QUERY_MODES[1]:
+        st.warning("**Warning:** This mode uses an agent that can execute arbitrary code. Use with caution.")
 
     query = st.text_input("Your question:", key="agentic_query")
 
@@ -759,19 +919,65 @@ def agentic_search_page():
             return
 
         with st.spinner('Searching and processing...'):
+            if mode == QUERY_MODES[0]:
+                show_query_plan_answer(query)
+                return
             try:
-                agent = make_pandas_gemini_agent("project_allocations.json")
-                result = agent.invoke({"input": query})
+                from agent_timing import AgentTimingHandler
+
+                # Rebuilt only when allocations or employees have changed
+                agent = make_pandas_gemini_agent(get_data_store().refresh())
+                with span("agent.invoke"):
+                    # One span per LLM call and tool run of the ReAct loop
+                    result = agent.invoke({"input": query}, config={"callbacks": [AgentTimingHandler()]})
                 st.write(result.get("output"))
                 with st.expander("Show Agentic Response"):
                     st.write(result.get("intermediate_steps"))
             except Exception as e:
                 st.error(f"An error occurred: {e}")
 
+@timed("app.show_query_plan_answer")
+def show_query_plan_answer(query):
+    from llm_client import LLMTimeout
+    from query_plan import PlanError, plan_json
+
+    planner = get_query_planner()
+    plan, error, cached = planner.plan(query)
+    if isinstance(error, PlanError):
+        st.error("The AI model's query plan could not be used:")
+        for message in error.errors:
+            st.write(f"• {message}")
+        return
+    if isinstance(error, LLMTimeout):
+        st.error(f"{error}. Please try again in a moment.")
+        return
+    if error is not None:
+        st.error(f"An error occurred while contacting the AI model: {error}")
+        return
+    try:
+        result = planner.run(plan, get_data_store().snapshot())
+    except Exception as e:
+        st.error(f"The query could not be run: {e}")
+        return
+    if result.shape == (1, 1):
+        # A single number (a total, a count) is shown on its own
+        value = result.iat[0, 0]
+        if isinstance(value, float):
+            value = int(value) if value.is_integer() else round(value, 2)
+        st.metric(result.columns[0].replace('_', ' ').title(), value)
+    elif result.empty:
+        st.info("No matching records found.")
+    else:
+        st.dataframe(result, hide_index=True, use_container_width=True)
+    st.caption(f"Query plan {'from the cache' if cached else 'from one model call'}; {len(result)} row(s), limit {plan['limit']}.")
+    with st.expander("Show Query Plan"):
+        st.code(json.dumps(json.loads(plan_json(plan)), indent=2), language="json")
+
 
 # --- Main App Logic ---
 
 def main():
+    get_metrics()
     if "logged_in" not in st.session_state:
         st.session_state.logged_in = False
         st.session_state.role = None
@@ -785,14 +991,13 @@ def main():
             page = st.sidebar.radio("Go to", ["Employee", "Admin", "Intent-Based Search", "Agentic Search"])
 
             # Display Key Metrics in the sidebar
-            sidebar_data = load_existing_data()
-            if sidebar_data:
-                sidebar_df = pd.DataFrame(sidebar_data)
+            summary = get_data_store().summary()
+            if summary['employees']:
                 st.sidebar.markdown("---")
                 st.sidebar.subheader("Key Metrics")
-                st.sidebar.metric("Total Employees", len(sidebar_df))
-                st.sidebar.metric("Number of Departments", sidebar_df['department'].nunique())
-                st.sidebar.metric("Number of Designations", sidebar_df['designation'].nunique())
+                st.sidebar.metric("Total Employees", summary['employees'])
+                st.sidebar.metric("Number of Departments", len(summary['departments']))
+                st.sidebar.metric("Number of Designations", len(summary['designations']))
 
             if page == "Employee":
                 employee_page()
@@ -0,0 +1,157 @@
+"""pytest-benchmark suite for the data layer, run on synthetic data.
+
+Needs pytest-benchmark (pip install pytest-benchmark). The data set size is
+BENCH_SIZE (1k, 10k, 100k or 1m; default 10k). Record a baseline once, then
+compare later runs against it and fail on a regression:
+
+    BENCH_SIZE=100k pytest benchmarks/bench_data_layer.py --benchmark-autosave
+    BENCH_SIZE=100k pytest benchmarks/bench_data_layer.py --benchmark-compare --benchmark-compare-fail=mean:25%
+
+Baselines are saved per machine under .benchmarks/, so only compare runs
+from the same machine and size. The file is named bench_* so the plain
+`pytest` run does not collect it.
+"""
+import io
+import itertools
+import os
+import random
+import shutil
+import sys
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generate_data import MAX_EMPLOYEES, generate_allocations, generate_employees, parse_size, write_dataset  # noqa: E402
+from bulk_import import ALLOCATION_COLUMNS, SKILL_SEPARATOR, read_employee_file, validate_employees  # noqa: E402  (repo root is on sys.path via generate_data)
+
+BENCH_SIZE = os.getenv('BENCH_SIZE', '10k')
+# Rows in the uploaded CSV for the bulk validation benchmark
+BULK_ROWS = 10_000
+
+
+@pytest.fixture(scope='module')
+def dataset(tmp_path_factory):
+    size = parse_size(BENCH_SIZE)
+    path = tmp_path_factory.mktemp(f"data_{BENCH_SIZE}")
+    employees, _ = write_dataset(str(path), min(size, MAX_EMPLOYEES), size)
+    return path, employees
+
+
+def _use_data_dir(path):
+    # The app reads employees_data.json / project_allocations.json from the working directory
+    os.chdir(path)
+    import app
+    app.get_data_store.clear()
+    return app
+
+
+@pytest.fixture
+def app(dataset):
+    cwd = os.getcwd()
+    module = _use_data_dir(dataset[0])
+    module.get_data_store()
+    yield module
+    os.chdir(cwd)
+
+
+@pytest.fixture
+def writable_app(dataset, tmp_path):
+    cwd = os.getcwd()
+    for name in ('employees_data.json', 'project_allocations.json'):
+        shutil.copy(dataset[0] / name, tmp_path / name)
+    module = _use_data_dir(tmp_path)
+    module.get_data_store()
+    yield module
+    module.get_data_store.clear()
+    os.chdir(cwd)
+
+
+def _queries(employees, make_query, count=200, seed=1):
+    rng = random.Random(seed)
+    return itertools.cycle([make_query(rng.choice(employees), rng) for _ in range(count)])
+
+
+def test_load_existing_data(benchmark, app):
+    # Cold load: a fresh store reading both files
+    employees = benchmark.pedantic(app.load_existing_data, setup=app.get_data_store.clear, rounds=5)
+    assert employees
+
+
+def test_save_project_allocation(benchmark, writable_app, dataset):
+    # Far-future single-day allocations, so every save passes the capacity rules
+    employees = itertools.cycle(dataset[1])
+    days = itertools.count(1)
+
+    def next_allocation():
+        day = (date.today() + timedelta(days=3650 + next(days))).isoformat()
+        allocation = {'employee_id': next(employees)['employee_id'], 'project_name': 'Benchmark', 'start_date': day, 'end_date': day, 'allocation': 10}
+        return (allocation,), {}
+
+    assert benchmark.pedantic(writable_app.save_project_allocation, setup=next_allocation, rounds=20)
+
+
+def test_get_employee_total_allocation(benchmark, app, dataset):
+    employee_ids = _queries(dataset[1], lambda emp, rng: emp['employee_id'])
+    benchmark(lambda: app.get_employee_total_allocation(next(employee_ids)))
+
+
+def test_bulk_csv_validation(benchmark, app, dataset):
+    rows = generate_allocations(BULK_ROWS, dataset[1], random.Random(2))
+    csv = pd.DataFrame(rows)[ALLOCATION_COLUMNS].to_csv(index=False).encode()
+    store = app.get_data_store()
+
+    def validate():
+        return app.validate_allocation_chunks(
+            app.read_allocation_csv(io.BytesIO(csv)), store.employee_ids(), store.allocation_totals(), store.capacity_overlay())
+
+    accepted, errors = benchmark(validate)
+    assert len(accepted) + len(errors) == BULK_ROWS
+
+
+def test_bulk_employee_validation(benchmark, app):
+    # Drawn from the same ID space as the data set, so some are duplicates
+    rows = generate_employees(BULK_ROWS, random.Random(3))
+    csv = pd.DataFrame(rows).assign(skills=lambda frame: frame['skills'].str.join(SKILL_SEPARATOR)).to_csv(index=False)
+    store = app.get_data_store()
+
+    def validate():
+        return validate_employees(read_employee_file(io.StringIO(csv)), store.employee_ids())
+
+    accepted, errors = benchmark(validate)
+    assert len(accepted) + errors['Row'].nunique() == BULK_ROWS
+
+
+def _name_query(emp, rng):
+    # Exact, lower-cased, first name only, or with a typo in the surname
+    first, last = emp['name'].split(' ', 1)
+    typo = last[:-2] + last[-1] + last[-2]
+    return rng.choice([emp['name'], emp['name'].lower(), first, f"{first} {typo}"])
+
+
+def test_name_resolution(benchmark, app, dataset):
+    queries = _queries(dataset[1], _name_query)
+    benchmark(lambda: app.find_employee_by_name(next(queries)))
+
+
+def test_search_candidate_ranking(benchmark, app, dataset):
+    store = app.get_data_store()
+    store.skill_index()
+    queries = _queries(dataset[1], lambda emp, rng: (emp['designation'], rng.sample(app.ROLE_SKILLS[emp['designation']], 3), rng.choice([0, 50])))
+    benchmark(lambda: store.search_candidates(*next(queries), k=app.MAX_CANDIDATES))
+
+
+def test_utilization_rollup(benchmark, writable_app, dataset):
+    # A write before each round, so the rollup is recomputed rather than served from its cache
+    store = writable_app.get_data_store()
+    store.utilization()
+    employees = itertools.cycle(dataset[1])
+    start = date.today()
+
+    def write():
+        store.add_allocations([{'employee_id': next(employees)['employee_id'], 'project_name': 'Benchmark', 'start_date': start.isoformat(), 'end_date': (start + timedelta(days=30)).isoformat(), 'allocation': 1}])
+
+    frame = benchmark.pedantic(store.utilization, args=('department',), setup=write, rounds=20)
+    assert len(frame)
@@ -0,0 +1,83 @@
+"""Cold-start import budget for app.py.
+
+Imports app in fresh interpreters under ``python -X importtime`` and fails
+(exit code 1) when the fastest run exceeds the budget, or when any module
+that should only load on demand is imported at startup:
+
+    python benchmarks/check_import_time.py
+    python benchmarks/check_import_time.py --budget-ms 1500 --runs 5
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds for `import app`, including module-level code. The baseline
+# was about 1.4 s with streamlit and pandas as the only heavy imports.
+DEFAULT_BUDGET_MS = 2000
+
+# Only the pages that need them may import these. (Streamlit itself loads
+# the plotly package lazily, so plotly.express is what marks eager use.
+# pyarrow is left out because pandas 3 imports it for its string dtype;
+# snapshot and query_plan are the modules that use it directly.)
+LAZY_MODULES = (
+    'langchain', 'langchain_core', 'langchain_experimental', 'langchain_google_genai', 'langchain_community', 'google.generativeai',
+    'plotly.express', 'httpx', 'llm_client', 'snapshot', 'query_plan', 'analytics',
+)
+
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+
+def measure(module='app'):
+    """(cumulative microseconds for `module`, {imported module: cumulative us})."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    imported = {}
+    total = None
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        imported[name] = int(match.group(2))
+        if name == module and not match.group(3):
+            total = int(match.group(2))
+    return total, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    timings = []
+    for _ in range(args.runs):
+        total, imported = measure()
+        timings.append(total / 1000)
+    best = min(timings)
+
+    eager = sorted(name for name in imported if any(name == lazy or name.startswith(lazy + '.') for lazy in LAZY_MODULES))
+    slowest = sorted(((us, name) for name, us in imported.items() if name.count('.') == 0 and name != 'app'), reverse=True)[:5]
+
+    print(f"import app: best {best:.0f} ms of {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("slowest top-level imports: " + ", ".join(f"{name} {us / 1000:.0f} ms" for us, name in slowest))
+    failed = False
+    if eager:
+        print(f"FAIL: modules that should load on demand were imported at startup: {', '.join(eager[:10])}")
+        failed = True
+    if best > args.budget_ms:
+        print(f"FAIL: cold import took {best:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Synthetic employees_data.json / project_allocations.json for scaling tests.
+
+Writes both files into --out, in the same layout the app saves:
+
+    python benchmarks/generate_data.py 100k --out /tmp/talent_100k
+    python benchmarks/generate_data.py 1m --out /tmp/talent_1m --seed 7
+
+Employees get designations and skills from ROLE_SKILLS and the app's
+departments and locations. Dates are written in all of the formats the app
+accepts, mostly ISO. Each employee's allocations follow one another without
+overlapping, so the saved data never puts anyone over 100%.
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from core import DEPARTMENTS, LOCATIONS, ROLE_SKILLS  # noqa: E402
+from capacity import DATE_FORMATS  # noqa: E402
+from storage import write_json_list  # noqa: E402
+
+SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+# Employee IDs are TM + 5 digits, so larger sizes only add allocations
+MAX_EMPLOYEES = 99_999
+
+# ISO most of the time, the other accepted formats for the rest
+DATE_FORMAT_WEIGHTS = [70] + [10] * (len(DATE_FORMATS) - 1)
+
+FIRST_NAMES = [
+    'Aarav', 'Abhinandan', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Divya', 'Farhan', 'Gaurav', 'Harini',
+    'Ishaan', 'Kavya', 'Kiran', 'Lakshmi', 'Manish', 'Meera', 'Neeraj', 'Nikhil', 'Pooja', 'Priya',
+    'Rahul', 'Ravi', 'Rohan', 'Sai', 'Sameer', 'Sneha', 'Sunil', 'Tanvi', 'Varun', 'Vikram',
+]
+LAST_NAMES = [
+    'Agarwal', 'Banerjee', 'Bhat', 'Chatterjee', 'Das', 'Desai', 'Ghosh', 'Gupta', 'Iyer', 'Joshi',
+    'Kapoor', 'Kulkarni', 'Kumar', 'Menon', 'Mishra', 'Nair', 'Patel', 'Pokala', 'Rao', 'Reddy',
+    'Sharma', 'Singh', 'Verma', 'Yadav',
+]
+PROJECT_WORDS = [
+    'Apollo', 'Atlas', 'Beacon', 'Cobalt', 'Helix', 'Horizon', 'Lumen', 'Nimbus', 'Orion', 'Pulse',
+    'Quartz', 'Sentinel', 'Summit', 'Vertex', 'Wellora', 'Zephyr',
+]
+ALLOCATION_STEPS = [10, 20, 25, 30, 40, 50, 60, 75, 100]
+
+
+def format_date(day, rng):
+    return day.strftime(rng.choices(DATE_FORMATS, DATE_FORMAT_WEIGHTS)[0])
+
+
+def generate_employees(count, rng):
+    if count > MAX_EMPLOYEES:
+        raise ValueError(f"At most {MAX_EMPLOYEES} employees fit the TM00000 ID format")
+    today = date.today()
+    designations = list(ROLE_SKILLS)
+    employees = []
+    for number in sorted(rng.sample(range(1, MAX_EMPLOYEES + 1), count)):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        designation = rng.choice(designations)
+        skills = rng.sample(ROLE_SKILLS[designation], rng.randint(1, 8))
+        joined = today - timedelta(days=rng.randint(0, 8 * 365))
+        employees.append({
+            'employee_id': f"TM{number:05d}",
+            'name': f"{first} {last}",
+            'email': f"{first}.{last}{number}@gmail.com".lower(),
+            'phone': f"{rng.randint(6, 9)}{rng.randint(0, 10 ** 9 - 1):09d}",
+            'designation': designation,
+            'department': rng.choice(DEPARTMENTS),
+            'date_of_joining': format_date(joined, rng),
+            'location': rng.choice(LOCATIONS),
+            'experience_years': rng.randint(1, 40) / 2,
+            'skills': skills,
+            'skills_count': len(skills),
+            'created_at': datetime.combine(joined, datetime.min.time()).isoformat(),
+        })
+    return employees
+
+
+def generate_allocations(count, employees, rng):
+    # Each employee's next allocation starts after the previous one ends
+    today = date.today()
+    projects = [f"{rng.choice(PROJECT_WORDS)} {n}" for n in range(max(1, count // 20))]
+    next_start = {}
+    allocations = []
+    for _ in range(count):
+        employee_id = rng.choice(employees)['employee_id']
+        start = next_start.get(employee_id) or today - timedelta(days=rng.randint(0, 2 * 365))
+        start += timedelta(days=rng.randint(0, 14))
+        end = start + timedelta(days=rng.randint(5, 90))
+        next_start[employee_id] = end + timedelta(days=1)
+        allocations.append({
+            'employee_id': employee_id,
+            'project_name': rng.choice(projects),
+            'start_date': format_date(start, rng),
+            'end_date': format_date(end, rng),
+            'allocation': rng.choice(ALLOCATION_STEPS),
+            'allocated_at': datetime.combine(start - timedelta(days=rng.randint(0, 7)), datetime.min.time()).isoformat(),
+        })
+    return allocations
+
+
+def write_dataset(out_dir, employee_count, allocation_count, seed=42):
+    """Write both JSON files into out_dir; returns (employees, allocations)."""
+    rng = random.Random(seed)
+    employees = generate_employees(employee_count, rng)
+    allocations = generate_allocations(allocation_count, employees, rng)
+    os.makedirs(out_dir, exist_ok=True)
+    write_json_list(os.path.join(out_dir, 'employees_data.json'), employees)
+    write_json_list(os.path.join(out_dir, 'project_allocations.json'), allocations)
+    return employees, allocations
+
+
+def parse_size(value):
+    if value.lower() in SIZES:
+        return SIZES[value.lower()]
+    return int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('size', type=parse_size, help=f"records to generate: {', '.join(SIZES)} or a number")
+    parser.add_argument('--out', default='.', help="directory to write the JSON files to")
+    parser.add_argument('--employees', type=int, help=f"employee count (default: size, at most {MAX_EMPLOYEES})")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    employee_count = args.employees or min(args.size, MAX_EMPLOYEES)
+    employees, allocations = write_dataset(args.out, employee_count, args.size, args.seed)
+    print(f"Wrote {len(employees)} employees and {len(allocations)} allocations to {os.path.abspath(args.out)}")
+
+
+if __name__ == '__main__':
+    main()
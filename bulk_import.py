@@ -0,0 +1,297 @@
+import json
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from capacity import DATE_FORMATS
+from core import DEPARTMENTS, LOCATIONS, MAX_SKILLS, ROLE_SKILLS
+
+ALLOCATION_COLUMNS = ['project_name', 'start_date', 'end_date', 'allocation', 'employee_id']
+EMPLOYEE_COLUMNS = ['employee_id', 'name', 'email', 'phone', 'designation', 'department', 'date_of_joining', 'location', 'experience_years', 'skills']
+# Skills in a CSV cell are separated by this
+SKILL_SEPARATOR = ';'
+
+# Rows parsed per chunk when reading an uploaded CSV
+CHUNK_SIZE = 50000
+
+_EPOCH_DAY = date(1970, 1, 1).toordinal()
+
+
+def read_allocation_csv(source, chunksize=CHUNK_SIZE):
+    # Keep IDs and dates as text; allocation is parsed during validation
+    return pd.read_csv(
+        source,
+        chunksize=chunksize,
+        dtype={'employee_id': str, 'project_name': str, 'start_date': str, 'end_date': str},
+    )
+
+
+def parse_dates(values):
+    # Try each accepted format in turn on whatever is still unparsed. Second
+    # resolution holds any year a date can have; nanoseconds stop at 2262.
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[s]')
+    for fmt in DATE_FORMATS:
+        remaining = parsed.isna() & values.notna()
+        if not remaining.any():
+            break
+        parsed[remaining] = pd.to_datetime(values[remaining], format=fmt, errors='coerce')
+    return parsed
+
+
+def to_days(parsed):
+    # datetime64 Series -> day ordinals (float, NaN where unparsed)
+    days = parsed.to_numpy(dtype='datetime64[D]').astype('int64').astype('float64') + _EPOCH_DAY
+    days[parsed.isna().to_numpy()] = np.nan
+    return pd.Series(days, index=parsed.index)
+
+
+def _error_frame(rows, employee_ids, messages):
+    return pd.DataFrame({'Row': rows, 'Employee ID': employee_ids, 'Error': messages})
+
+
+def _integral(values):
+    return values.astype('int64') if (values % 1 == 0).all() else values
+
+
+def validate_allocation_chunks(chunks, employee_ids, allocation_totals, capacity):
+    """Validate an uploaded allocation CSV chunk by chunk.
+
+    `employee_ids` are the known employees, `allocation_totals` maps
+    employee_id -> % ever allocated and `capacity` is a CapacityOverlay of the
+    saved allocations. Rows are checked in file order: a row is accepted if the
+    employee exists, its dates are valid and the employee stays within 100% on
+    every day between start and end, counting earlier accepted rows.
+
+    Returns (accepted allocation records, errors DataFrame with Row / Employee ID / Error).
+    """
+    # Hash index over employee IDs, built once and probed per chunk
+    known_ids = pd.Index(employee_ids, dtype=object)
+    running_totals = pd.Series(allocation_totals, dtype='float64')
+    allocated_at = datetime.now().isoformat()
+    accepted_parts = []
+    error_parts = []
+
+    for chunk in chunks:
+        missing = [col for col in ALLOCATION_COLUMNS if col not in chunk.columns]
+        if missing:
+            raise ValueError(f"CSV must contain the following columns: {ALLOCATION_COLUMNS}")
+
+        # Spreadsheet row numbers: 1-based plus the header line
+        rows = chunk.index + 2
+        values = pd.to_numeric(chunk['allocation'], errors='coerce')
+        start_dates = parse_dates(chunk['start_date'])
+        end_dates = parse_dates(chunk['end_date'])
+        starts = to_days(start_dates)
+        ends = to_days(end_dates)
+
+        invalid_value = values.isna() | (values < 1) | (values > 100)
+        invalid_date = ~invalid_value & (starts.isna() | ends.isna() | (starts > ends))
+        unknown = pd.Series(known_ids.get_indexer(chunk['employee_id'].astype(object)) < 0, index=chunk.index)
+        unknown = unknown & ~invalid_value & ~invalid_date
+
+        if invalid_value.any():
+            bad = chunk[invalid_value]
+            error_parts.append(_error_frame(
+                rows[invalid_value], bad['employee_id'],
+                [f"Row {row}: Allocation '{value}' must be a number between 1 and 100." for row, value in zip(rows[invalid_value], bad['allocation'])],
+            ))
+        if invalid_date.any():
+            bad = chunk[invalid_date]
+            error_parts.append(_error_frame(
+                rows[invalid_date], bad['employee_id'],
+                [f"Row {row}: Dates '{start}' to '{end}' must be valid (YYYY-MM-DD or M/D/YYYY) with the start on or before the end." for row, start, end in zip(rows[invalid_date], bad['start_date'], bad['end_date'])],
+            ))
+        if unknown.any():
+            bad = chunk[unknown]
+            error_parts.append(_error_frame(
+                rows[unknown], bad['employee_id'],
+                [f"Row {row}: Employee with ID '{employee_id}' not found." for row, employee_id in zip(rows[unknown], bad['employee_id'])],
+            ))
+
+        valid = ~invalid_value & ~invalid_date & ~unknown
+        candidates = chunk[valid].assign(
+            allocation=values[valid],
+            start_date=start_dates[valid].dt.strftime('%Y-%m-%d'),
+            end_date=end_dates[valid].dt.strftime('%Y-%m-%d'),
+            start_day=starts[valid].astype('int64'),
+            end_day=ends[valid].astype('int64'),
+        )
+        if candidates.empty:
+            continue
+
+        # Everything ever allocated plus the in-file rows so far is an upper
+        # bound on the peak, so employees that stay within 100% on that basis
+        # are accepted without any date checks.
+        existing = candidates['employee_id'].map(running_totals).fillna(0)
+        cumulative = existing + candidates.groupby('employee_id', sort=False)['allocation'].cumsum()
+        fits = ~(cumulative > 100).groupby(candidates['employee_id'], sort=False).transform('any')
+        accepted = [candidates[fits]]
+
+        # The rest are checked in file order against the interval index,
+        # so a rejected row never counts towards the rows after it.
+        over = candidates[~fits]
+        if not over.empty:
+            keep = np.ones(len(over), dtype=bool)
+            columns = zip(over['employee_id'].tolist(), over['start_day'].tolist(), over['end_day'].tolist(), over['allocation'].tolist())
+            for position, (employee_id, start, end, value) in enumerate(columns):
+                if capacity.peak(employee_id, start, end) + value > 100:
+                    keep[position] = False
+                else:
+                    capacity.add(employee_id, start, end, value)
+            accepted.append(over[keep])
+            bad = over[~keep]
+            bad_rows = bad.index + 2
+            error_parts.append(_error_frame(
+                bad_rows, bad['employee_id'],
+                [
+                    f"Row {row}: Cannot allocate {value:g}% to employee {employee_id} from {start} to {end}. Total allocation would exceed 100%."
+                    for row, value, employee_id, start, end in zip(bad_rows, bad['allocation'], bad['employee_id'], bad['start_date'], bad['end_date'])
+                ],
+            ))
+
+        # Rows accepted without date checks still occupy capacity for later chunks
+        fitting = candidates[fits]
+        for employee_id, start, end, value in zip(fitting['employee_id'].tolist(), fitting['start_day'].tolist(), fitting['end_day'].tolist(), fitting['allocation'].tolist()):
+            capacity.add(employee_id, start, end, value)
+
+        accepted = pd.concat(accepted).sort_index()
+        running_totals = running_totals.add(accepted.groupby('employee_id')['allocation'].sum(), fill_value=0)
+        accepted_parts.append(accepted[ALLOCATION_COLUMNS])
+
+    if accepted_parts:
+        accepted = pd.concat(accepted_parts)
+        accepted['allocation'] = _integral(accepted['allocation'])
+        columns = ['employee_id', 'project_name', 'start_date', 'end_date', 'allocation']
+        # Plain column lists zip into dicts much faster than DataFrame.to_dict
+        records = [
+            dict(zip(columns, values), allocated_at=allocated_at)
+            for values in zip(*(accepted[col].tolist() for col in columns))
+        ]
+    else:
+        records = []
+    errors = pd.concat(error_parts).sort_values('Row', kind='stable').reset_index(drop=True) if error_parts else _error_frame([], [], [])
+    return records, errors
+
+
+def read_employee_file(source, file_name=''):
+    """Uploaded employees as a DataFrame of text columns.
+
+    A .json file holds a list of employee objects; anything else is read as
+    CSV with the skills of each employee separated by SKILL_SEPARATOR.
+    """
+    if str(file_name).lower().endswith('.json'):
+        records = json.load(source)
+        if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+            raise ValueError("JSON file must contain a list of employee objects")
+        return pd.DataFrame(records, columns=None if records else EMPLOYEE_COLUMNS)
+    return pd.read_csv(source, dtype=str, keep_default_na=False)
+
+
+def _text(values):
+    # Plain object strings: isin on Arrow-backed strings is far slower
+    return values.astype(object).fillna('').astype(str).str.strip().astype(object)
+
+
+def _skill_list(value):
+    # Skills from a list or a separated string, blanks and repeats dropped
+    if isinstance(value, (list, tuple)):
+        skills = (str(skill).strip() for skill in value)
+    elif value is None or value != value:
+        return []
+    else:
+        skills = (skill.strip() for skill in str(value).split(SKILL_SEPARATOR))
+    return list(dict.fromkeys(skill for skill in skills if skill))
+
+
+def validate_employees(frame, existing_ids, first_row=2):
+    """Check uploaded employees with the same rules as the employee form.
+
+    `existing_ids` are the saved employee IDs; an ID that is already taken,
+    or repeated further down the file, is rejected. `first_row` is the row
+    number reported for the first record (2 for a CSV with a header line).
+    Every broken rule of a row is reported.
+
+    Returns (employee records for the valid rows, errors DataFrame with Row / Employee ID / Error).
+    """
+    missing = [col for col in EMPLOYEE_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"File must contain the following columns: {EMPLOYEE_COLUMNS}")
+
+    frame = frame.reset_index(drop=True)
+    rows = frame.index + first_row
+    ids = _text(frame['employee_id'])
+    names = _text(frame['name'])
+    emails = _text(frame['email'])
+    phones = _text(frame['phone'])
+    designations = _text(frame['designation'])
+    departments = _text(frame['department'])
+    locations = _text(frame['location'])
+    joined = parse_dates(_text(frame['date_of_joining']))
+    experience = pd.to_numeric(frame['experience_years'], errors='coerce')
+
+    skill_lists = frame['skills'].map(_skill_list).astype(object)
+    skill_counts = skill_lists.str.len()
+    # One row per (employee, skill)
+    skills = skill_lists.explode().dropna()
+
+    valid_id = ids.str.fullmatch(r'TM\d{5}')
+    # Duplicates: a set join against the saved IDs, then repeats within the file
+    taken = valid_id & ids.isin(set(existing_ids))
+    repeated = valid_id & ~taken & ids.duplicated(keep='first')
+    known_designation = designations.isin(ROLE_SKILLS)
+    allowed = pd.MultiIndex.from_tuples([(designation, skill) for designation, role_skills in ROLE_SKILLS.items() for skill in role_skills])
+    unlisted = ~pd.MultiIndex.from_arrays([designations.loc[skills.index], skills]).isin(allowed)
+    unlisted_skills = skills[unlisted].groupby(level=0).agg(', '.join).reindex(frame.index)
+    check_skills = known_designation & (skill_counts > 0) & (skill_counts <= MAX_SKILLS) & unlisted_skills.notna()
+
+    rules = [
+        (ids == '', "Employee ID is required"),
+        ((ids != '') & ~valid_id, "Employee ID must be in format 'TM' followed by 5 digits (e.g., TM01418)"),
+        (taken, "Employee ID already exists"),
+        (repeated, "Employee ID appears more than once in the file"),
+        (names == '', "Name is required"),
+        (emails == '', "Email is required"),
+        ((emails != '') & ~emails.str.endswith('@gmail.com'), "Email must end with @gmail.com"),
+        (phones == '', "Phone number is required"),
+        ((phones != '') & ~phones.str.fullmatch(r'\d{10}'), "Phone number must be exactly 10 digits"),
+        (designations == '', "Designation is required"),
+        ((designations != '') & ~known_designation, f"Designation must be one of: {', '.join(ROLE_SKILLS)}"),
+        (departments == '', "Department is required"),
+        ((departments != '') & ~departments.isin(DEPARTMENTS), f"Department must be one of: {', '.join(DEPARTMENTS)}"),
+        (locations == '', "Location is required"),
+        ((locations != '') & ~locations.isin(LOCATIONS), f"Location must be one of: {', '.join(LOCATIONS)}"),
+        (joined.isna(), "Date of joining must be a valid date (YYYY-MM-DD or M/D/YYYY)"),
+        (joined > pd.Timestamp(date.today()), "Date of joining cannot be in the future"),
+        (experience.isna() | (experience <= 0), "Experience years must be greater than 0"),
+        (skill_counts == 0, "At least one skill must be selected"),
+        (skill_counts > MAX_SKILLS, f"Maximum {MAX_SKILLS} skills can be selected"),
+    ]
+    invalid = pd.Series(False, index=frame.index)
+    error_parts = []
+    for mask, message in rules:
+        mask = mask.fillna(False).astype(bool)
+        if mask.any():
+            invalid |= mask
+            error_parts.append(_error_frame(rows[mask], ids[mask], [f"Row {row}: {message}" for row in rows[mask]]))
+    if check_skills.any():
+        invalid |= check_skills
+        error_parts.append(_error_frame(
+            rows[check_skills], ids[check_skills],
+            [f"Row {row}: Skills not listed for {designation}: {unlisted}" for row, designation, unlisted in zip(rows[check_skills], designations[check_skills], unlisted_skills[check_skills])],
+        ))
+
+    valid = ~invalid
+    created_at = datetime.now().isoformat()
+    columns = {
+        'employee_id': ids[valid], 'name': names[valid], 'email': emails[valid].str.lower(), 'phone': phones[valid],
+        'designation': designations[valid], 'department': departments[valid],
+        'date_of_joining': joined[valid].dt.strftime('%Y-%m-%d'), 'location': locations[valid],
+        'experience_years': experience[valid].astype('float64'),
+    }
+    records = [
+        dict(zip(columns, values), skills=skill_list, skills_count=len(skill_list), created_at=created_at)
+        for *values, skill_list in zip(*(column.tolist() for column in columns.values()), skill_lists[valid].tolist())
+    ]
+    errors = pd.concat(error_parts).sort_values('Row', kind='stable').reset_index(drop=True) if error_parts else _error_frame([], [], [])
+    return records, errors
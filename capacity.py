@@ -0,0 +1,232 @@
+from bisect import bisect_right
+from datetime import date, datetime
+from math import isqrt
+
+# Day numbers are proleptic Gregorian ordinals (date.toordinal()). Allocations
+# without a usable date are treated as open-ended on that side.
+MIN_DAY = date.min.toordinal()
+MAX_DAY = date.max.toordinal()
+
+# Below this many intervals a bisect + scan beats building the tree
+LINEAR_SCAN_LIMIT = 32
+
+DATE_FORMATS = ('%Y-%m-%d', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d')
+
+
+def to_day(value):
+    """Day number for a date, datetime or date string (ISO or M/D/YYYY), else None."""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    if not isinstance(value, str) or not value.strip():
+        return None
+    text = value.strip()
+    # ISO timestamps such as 2025-09-17T19:33:04
+    if len(text) > 10 and text[4:5] == '-' and text[10:11] in ('T', ' '):
+        text = text[:10]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().toordinal()
+        except ValueError:
+            continue
+    return None
+
+
+def iso_date(value):
+    # Normalized YYYY-MM-DD form of a stored date, or the value unchanged
+    day = to_day(value)
+    return date.fromordinal(day).isoformat() if day is not None else value
+
+
+def allocation_days(alloc):
+    start = to_day(alloc.get('start_date'))
+    end = to_day(alloc.get('end_date'))
+    return (MIN_DAY if start is None else start), (MAX_DAY if end is None else end)
+
+
+class _SortedIntervals:
+    # Intervals sorted by start with their max-end tree; never changed once built
+
+    __slots__ = ('starts', 'ends', 'values', 'max_end')
+
+    def __init__(self, items):
+        items = sorted(items, key=lambda item: item[0])
+        self.starts = [item[0] for item in items]
+        self.ends = [item[1] for item in items]
+        self.values = [item[2] for item in items]
+        self.max_end = None
+        if len(items) > LINEAR_SCAN_LIMIT:
+            self.max_end = [0] * len(items)
+            self._build(0, len(items))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def items(self):
+        return zip(self.starts, self.ends, self.values)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return MIN_DAY - 1
+        mid = (lo + hi) // 2
+        best = max(self.ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        self.max_end[mid] = best
+        return best
+
+    def overlapping(self, start, end):
+        if self.max_end is None:
+            last = bisect_right(self.starts, end)
+            return [i for i in range(last) if self.ends[i] >= start]
+        found = []
+        stack = [(0, len(self.starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            # Nothing in this subtree ends on or after `start`
+            if self.max_end[mid] < start:
+                continue
+            stack.append((lo, mid))
+            if self.starts[mid] <= end:
+                if self.ends[mid] >= start:
+                    found.append(mid)
+                # Right subtree starts are >= starts[mid]; only worth visiting
+                # while they can still begin inside the window
+                stack.append((mid + 1, hi))
+        return found
+
+
+_EMPTY = _SortedIntervals(())
+
+
+class AllocationIntervals:
+    """One employee's allocations as [start, end] day intervals with a %.
+
+    Intervals are kept sorted by start with a max-end augmentation laid out as
+    an implicit balanced tree over the sorted array, so finding the k
+    intervals that overlap a window costs O(log n + k). New intervals collect
+    in a short unsorted tail that is scanned directly and merged into the
+    tree once it grows past about sqrt(n), so an add costs O(sqrt n) amortized
+    rather than a copy and rebuild of everything.
+
+    The (sorted, tail) pair is replaced in one assignment and never modified
+    in place, so readers without the store lock always see a consistent
+    state, and copies share it until one of them is added to.
+    """
+
+    __slots__ = ('_state',)
+
+    def __init__(self, items=()):
+        self._state = (_SortedIntervals(items) if items else _EMPTY, ())
+
+    def __len__(self):
+        indexed, recent = self._state
+        return len(indexed) + len(recent)
+
+    def copy(self):
+        copied = AllocationIntervals()
+        copied._state = self._state
+        return copied
+
+    def add(self, start, end, value):
+        indexed, recent = self._state
+        recent = recent + ((start, end, value),)
+        if len(recent) > max(LINEAR_SCAN_LIMIT, isqrt(len(indexed))):
+            self._state = (_SortedIntervals([*indexed.items(), *recent]), ())
+        else:
+            self._state = (indexed, recent)
+
+    def extend(self, items):
+        # Many at once (bulk loads): one merge instead of an add each
+        indexed, recent = self._state
+        self._state = (_SortedIntervals([*indexed.items(), *recent, *items]), ())
+
+    def overlapping(self, start, end):
+        """(start, end, value) of the intervals that intersect [start, end]."""
+        indexed, recent = self._state
+        found = [(indexed.starts[i], indexed.ends[i], indexed.values[i]) for i in indexed.overlapping(start, end)]
+        found.extend(item for item in recent if item[0] <= end and item[1] >= start)
+        return found
+
+    def peak(self, start, end):
+        """Highest total % allocated on any single day in [start, end]."""
+        events = []
+        for interval_start, interval_end, value in self.overlapping(start, end):
+            events.append((max(interval_start, start), value))
+            events.append((min(interval_end, end) + 1, -value))
+        # Ends sort before starts on the same day, so back-to-back
+        # allocations do not count as overlapping
+        events.sort(key=lambda event: (event[0], event[1]))
+        peak = current = 0
+        for _, delta in events:
+            current += delta
+            peak = max(peak, current)
+        return peak
+
+
+class CapacityIndex:
+    """employee_id -> AllocationIntervals for date-aware capacity checks."""
+
+    def __init__(self):
+        self._intervals = {}
+
+    def add(self, employee_id, start, end, value):
+        # In place (writers hold the store lock); see AllocationIntervals for
+        # why readers and overlays are unaffected
+        intervals = self._intervals.get(employee_id)
+        if intervals is None:
+            intervals = self._intervals[employee_id] = AllocationIntervals()
+        intervals.add(start, end, value)
+
+    def add_many(self, items):
+        # Bulk load from (employee_id, start, end, value) tuples, sorted and
+        # indexed once per employee
+        grouped = {}
+        for employee_id, start, end, value in items:
+            grouped.setdefault(employee_id, []).append((start, end, value))
+        for employee_id, intervals in grouped.items():
+            existing = self._intervals.get(employee_id)
+            if existing is None:
+                self._intervals[employee_id] = AllocationIntervals(intervals)
+            else:
+                existing.extend(intervals)
+
+    def intervals(self, employee_id):
+        return self._intervals.get(employee_id)
+
+    def peak(self, employee_id, start, end):
+        intervals = self._intervals.get(employee_id)
+        return intervals.peak(start, end) if intervals is not None else 0
+
+    def peaks(self, start, end):
+        return {employee_id: intervals.peak(start, end) for employee_id, intervals in self._intervals.items()}
+
+    def overlay(self):
+        return CapacityOverlay(self)
+
+
+class CapacityOverlay:
+    """Scratch view over a CapacityIndex for checking a batch before it is saved.
+
+    Pending allocations are added to private copies, leaving the shared index
+    untouched until the batch is committed.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self._pending = {}
+
+    def peak(self, employee_id, start, end):
+        intervals = self._pending.get(employee_id)
+        if intervals is None:
+            intervals = self.base.intervals(employee_id)
+        return intervals.peak(start, end) if intervals is not None else 0
+
+    def add(self, employee_id, start, end, value):
+        intervals = self._pending.get(employee_id)
+        if intervals is None:
+            base = self.base.intervals(employee_id)
+            intervals = self._pending[employee_id] = base.copy() if base is not None else AllocationIntervals()
+        intervals.add(start, end, value)
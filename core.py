@@ -0,0 +1,397 @@
+import json
+import os
+import re
+import tomllib
+from datetime import date, datetime
+
+from intent_parser import LOCAL_CONFIDENCE
+from response_cache import cache_key
+
+# Validation, allocation, capacity and search rules shared by the Streamlit
+# app and the HTTP API (api.py). Nothing here imports Streamlit.
+
+SECRETS_FILE = os.path.join('.streamlit', 'secrets.toml')
+
+# Skills mapping based on job roles
+ROLE_SKILLS = {
+    "Backend Developer": ["JavaScript", "Node.js", "Python", "Java", "C#", "PHP", "Go", "Ruby", "Rust", "Scala", "Kotlin", "Express.js", "Django", "Flask", "FastAPI", "Spring Boot", "ASP.NET Core", "Laravel", "Gin", "Echo", "Nest.js", "PostgreSQL", "MySQL", "MongoDB", "Redis", "Elasticsearch", "Cassandra", "DynamoDB", "Oracle Database", "SQL Server", "Neo4j", "REST API Design", "GraphQL", "gRPC", "WebSocket", "Microservices Architecture", "API Gateway", "OAuth/JWT", "Swagger/OpenAPI", "Message Queues", "Event-Driven Architecture"],
+    "Frontend Developer": ["JavaScript (ES6+)", "TypeScript", "HTML5", "CSS3", "Sass/SCSS", "Less", "JSX", "WebAssembly", "React.js", "Vue.js", "Angular", "Next.js", "Nuxt.js", "Svelte/SvelteKit", "Ember.js", "Alpine.js", "Lit", "Stencil", "Material-UI (MUI)", "Ant Design", "Chakra UI", "Bootstrap", "Tailwind CSS", "Styled Components", "Emotion", "Framer Motion", "GSAP", "Three.js", "Redux/Redux Toolkit", "Vuex/Pinia", "MobX", "Zustand", "Recoil", "Context API", "Webpack", "Vite", "Parcel", "Jest", "Cypress", "Testing Library", "Storybook", "ESLint/Prettier"],
+    "AI/ML/Data Scientist": ["Python", "R", "SQL", "Scala", "Java", "Julia", "MATLAB", "C++", "TensorFlow", "PyTorch", "Keras", "Scikit-learn", "XGBoost", "LightGBM", "CatBoost", "Statsmodels", "MLflow", "Weights & Biases", "Convolutional Neural Networks (CNN)", "Recurrent Neural Networks (RNN/LSTM)", "Transformers", "BERT/GPT Models", "GANs", "Reinforcement Learning", "Transfer Learning", "Computer Vision", "Natural Language Processing", "Speech Recognition", "Pandas", "NumPy", "Matplotlib", "Seaborn", "Plotly", "Apache Spark", "Hadoop", "Kafka", "Apache Airflow", "Dask", "AWS SageMaker", "Google Cloud AI", "Azure Machine Learning", "Kubeflow", "Docker", "Kubernetes", "MLOps", "Model Deployment", "A/B Testing", "Feature Engineering", "LangChain", "Hugging Face", "OpenAI API"],
+    "DevOps Engineer": ["Amazon Web Services (AWS)", "Microsoft Azure", "Google Cloud Platform (GCP)", "DigitalOcean", "IBM Cloud", "Oracle Cloud", "Alibaba Cloud", "Multi-cloud Strategy", "Docker", "Kubernetes", "Docker Compose", "Helm", "OpenShift", "Rancher", "Istio", "Linkerd", "Terraform", "AWS CloudFormation", "Azure Resource Manager", "Google Cloud Deployment Manager", "Pulumi", "Ansible", "Chef", "Puppet", "SaltStack", "Jenkins", "GitLab CI/CD", "GitHub Actions", "Azure DevOps", "CircleCI", "Travis CI", "Bamboo", "TeamCity", "ArgoCD", "Spinnaker", "Prometheus", "Grafana", "ELK Stack", "Datadog", "New Relic", "Splunk", "Jaeger", "Zipkin"]
+}
+
+DEPARTMENTS = ["Software Engineering", "FinOps", "AI & Gen AI Solutions"]
+LOCATIONS = ["Hyderabad", "Kolkata", "Hubli", "Gurgaon"]
+
+# Rows shown for a candidate search, best skill match first
+MAX_CANDIDATES = 50
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+
+INTENT_PROMPT = """You are an expert query-parsing assistant for an employee management system. Your task is to analyze the user's prompt and convert it into a structured JSON object.
+
+Your response MUST be only the JSON object and nothing else.
+
+Here are the possible user intents and the entities you must extract for each:
+
+1.  **Intent: `search_candidate`**
+    *   Triggered when the user is looking for an employee to hire or allocate. Examples: "Find me a developer", "I need a devops engineer with AWS for 50%"
+    *   **Entities to extract:** `designation` (string, must be one of ["Backend Developer", "Frontend Developer", "AI/ML/Data Scientist", "DevOps Engineer"]), `skills` (array of strings), `allocation_needed` (integer).
+
+2.  **Intent: `find_employee_projects`**
+    *   Triggered when the user wants to know which projects an employee is on. Examples: "what projects is X working on?", "show me X's projects"
+    *   **Entities to extract:** `employee_name` (string).
+
+3.  **Intent: `get_employee_allocation`**
+    *   Triggered when the user asks for the total allocation of an employee. Examples: "what is X's allocation?", "how much is X allocated?"
+    *   **Entities to extract:** `employee_name` (string).
+
+4.  **Intent: `get_employee_skills`**
+    *   Triggered when the user asks for an employee's skills. Examples: "what are X's skills?", "show me the skills for X"
+    *   **Entities to extract:** `employee_name` (string).
+
+5.  **Intent: `get_employee_phone`**
+    *   Triggered when the user asks for an employee's phone number. Examples: "what is X's phone number?", "find the phone for X"
+    *   **Entities to extract:** `employee_name` (string).
+
+6.  **Intent: `get_employee_department`**
+    *   Triggered when the user asks for an employee's department. Examples: "which department is X in?", "what is X's department?"
+    *   **Entities to extract:** `employee_name` (string).
+
+7.  **Intent: `get_employee_designation`**
+    *   Triggered when the user asks for an employee's designation. Examples: "what is X's designation?", "what is X's role?"
+    *   **Entities to extract:** `employee_name` (string).
+
+8.  **Intent: `get_employee_id`**
+    *   Triggered when the user asks for an employee's ID. Examples: "what is X's employee ID?", "employee id for X"
+    *   **Entities to extract:** `employee_name` (string).
+
+9.  **Intent: `get_employee_experience`**
+    *   Triggered when the user asks for an employee's experience. Examples: "how much experience does X have?", "what is X's experience?"
+    *   **Entities to extract:** `employee_name` (string).
+
+10. **Intent: `get_employee_email`**
+    *   Triggered when the user asks for an employee's email. Examples: "what is the email for X?", "email address of X", "find X's email"
+    *   **Entities to extract:** `employee_name` (string).
+
+11. **Intent: `get_employee_doj`**
+    *   Triggered when the user asks for an employee's date of joining. Examples: "when did X join?", "what is the joining date for X?"
+    *   **Entities to extract:** `employee_name` (string).
+
+12. **Intent: `get_employee_location`**
+    *   Triggered when the user asks for an employee's location. Examples: "where is X located?", "X's location", "location of X"
+    *   **Entities to extract:** `employee_name` (string).
+
+13. **Intent: `allocate_project`**
+    *   Triggered when the user wants to allocate an employee to a project. Examples: "allocate X to Project Alpha from YYYY-MM-DD to YYYY-MM-DD with Z% allocation", "assign X to project Beta, start 2025-01-01 end 2025-06-30, 50%"
+    *   **Entities to extract:** `employee_name` (string), `project_name` (string), `start_date` (string, YYYY-MM-DD format), `end_date` (string, YYYY-MM-DD format), `allocation` (integer).
+
+14. **Intent: `get_employee_details`**
+    *   Triggered when the user asks for all details of an employee. Examples: "give me the details of X", "information about X", "show me everything for X"
+    *   **Entities to extract:** `employee_name` (string).
+
+15. **Intent: `other`**
+    *   Triggered when the user's query does not match any of the other intents. Examples: "hello", "how are you", "what is the weather today?"
+    *   **Entities to extract:** None.
+
+---
+**User's Prompt:** "{query}"
+---
+
+**Your JSON Response:**"""
+
+MAX_SKILLS = 20
+
+
+def get_setting(name, default=None, secrets=None):
+    # Environment variables take precedence over .streamlit/secrets.toml, read
+    # through `secrets` (Streamlit passes st.secrets) when given
+    value = os.getenv(name)
+    if value is not None:
+        return value
+    if secrets is not None:
+        try:
+            return secrets.get(name, default)
+        except Exception:
+            # st.secrets raises when there is no secrets file
+            return default
+    try:
+        with open(SECRETS_FILE, 'rb') as f:
+            return tomllib.load(f).get(name, default)
+    except (OSError, tomllib.TOMLDecodeError):
+        return default
+
+
+def validate_employee_id(employee_id):
+    return bool(re.match(r'^TM\d{5}$', employee_id))
+
+def validate_email(email):
+    return email.endswith('@gmail.com') and '@' in email
+
+def validate_phone(phone):
+    return bool(re.match(r'^\d{10}$', phone))
+
+def validate_date(selected_date):
+    return selected_date <= date.today()
+
+
+def parse_date(value):
+    # date objects as they are, YYYY-MM-DD strings parsed, anything else None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value
+
+
+def employee_errors(employee_data, store=None):
+    """Reasons `employee_data` cannot be saved as a new employee (empty if it can).
+
+    Fields are those of an employee record; date_of_joining may be a date or
+    a YYYY-MM-DD string. With a store, the employee ID must also be unused.
+    """
+    employee_id = str(employee_data.get('employee_id') or '')
+    email = str(employee_data.get('email') or '')
+    phone = str(employee_data.get('phone') or '')
+    designation = employee_data.get('designation')
+    skills = employee_data.get('skills') or []
+    date_of_joining = parse_date(employee_data.get('date_of_joining'))
+    experience_years = _number(employee_data.get('experience_years'))
+
+    errors = []
+    if not employee_id: errors.append("Employee ID is required")
+    elif not validate_employee_id(employee_id): errors.append("Employee ID must be in format 'TM' followed by 5 digits (e.g., TM01418)")
+    elif store is not None and store.has_employee(employee_id): errors.append("Employee ID already exists")
+    if not str(employee_data.get('name') or '').strip(): errors.append("Name is required")
+    if not email: errors.append("Email is required")
+    elif not validate_email(email): errors.append("Email must end with @gmail.com")
+    if not phone: errors.append("Phone number is required")
+    elif not validate_phone(phone): errors.append("Phone number must be exactly 10 digits")
+    if not designation: errors.append("Designation is required")
+    elif designation not in ROLE_SKILLS: errors.append(f"Designation must be one of: {', '.join(ROLE_SKILLS)}")
+    if not employee_data.get('department'): errors.append("Department is required")
+    elif employee_data.get('department') not in DEPARTMENTS: errors.append(f"Department must be one of: {', '.join(DEPARTMENTS)}")
+    if not employee_data.get('location'): errors.append("Location is required")
+    elif employee_data.get('location') not in LOCATIONS: errors.append(f"Location must be one of: {', '.join(LOCATIONS)}")
+    if date_of_joining is None: errors.append("Date of joining must be a date in YYYY-MM-DD format")
+    elif not validate_date(date_of_joining): errors.append("Date of joining cannot be in the future")
+    if experience_years is None or experience_years <= 0: errors.append("Experience years must be greater than 0")
+    if not skills or len(skills) == 0: errors.append("At least one skill must be selected")
+    elif len(skills) > MAX_SKILLS: errors.append(f"Maximum {MAX_SKILLS} skills can be selected")
+    elif designation in ROLE_SKILLS:
+        unknown = [skill for skill in skills if skill not in ROLE_SKILLS[designation]]
+        if unknown: errors.append(f"Skills not listed for {designation}: {', '.join(map(str, unknown))}")
+    return errors
+
+
+def employee_record(employee_data):
+    """The record saved for a validated employee."""
+    skills = list(employee_data.get('skills') or [])
+    return {
+        "employee_id": employee_data['employee_id'],
+        "name": employee_data['name'].strip(),
+        "email": employee_data['email'].lower(),
+        "phone": employee_data['phone'],
+        "designation": employee_data['designation'],
+        "department": employee_data['department'],
+        "date_of_joining": parse_date(employee_data['date_of_joining']).isoformat(),
+        "location": employee_data['location'],
+        "experience_years": employee_data['experience_years'],
+        "skills": skills,
+        "skills_count": len(skills),
+        "created_at": datetime.now().isoformat(),
+    }
+
+
+def find_employee_by_name(store, employee_name_query):
+    # Ranked lookup by name or employee ID: (best employee or None, top matches, ambiguous)
+    best, matches, ambiguous = store.name_index().resolve(employee_name_query)
+    found_employee = store.get_employee(best.employee_id) if best else None
+    return found_employee, matches, ambiguous
+
+
+def check_allocation(capacity, employee, project_name, start_date, end_date, allocation):
+    """Validate one allocation of `employee` against a CapacityOverlay.
+
+    Returns (allocation record or None, error messages). Dates may be date
+    objects or YYYY-MM-DD strings. An accepted allocation is added to
+    `capacity` so later checks in a batch count it. With no employee only the
+    other fields are checked (the caller reports the missing employee).
+    """
+    errors = []
+    if not project_name or not str(project_name).strip(): errors.append("Project name is missing.")
+    if not start_date: errors.append("Start date is missing.")
+    if not end_date: errors.append("End date is missing.")
+    if allocation is None: errors.append("Allocation percentage is missing.")
+
+    start = parse_date(start_date)
+    if start_date and start is None:
+        errors.append("Start date format is invalid. Please use YYYY-MM-DD.")
+    end = parse_date(end_date)
+    if end_date and end is None:
+        errors.append("End date format is invalid. Please use YYYY-MM-DD.")
+    if start and end and start > end:
+        errors.append("Start date cannot be after end date.")
+
+    if allocation is not None and (_number(allocation) is None or not (1 <= allocation <= 100)):
+        errors.append("Allocation percentage must be a number between 1 and 100.")
+
+    if errors or employee is None:
+        return None, errors
+    start_day, end_day = start.toordinal(), end.toordinal()
+    current_allocation = capacity.peak(employee['employee_id'], start_day, end_day)
+    if current_allocation + allocation > 100:
+        return None, [f"Cannot allocate. {employee['name']} is already allocated {current_allocation:g}% between {start} and {end}. This allocation would exceed 100%."]
+    capacity.add(employee['employee_id'], start_day, end_day, allocation)
+    return {
+        "employee_id": employee['employee_id'],
+        "project_name": str(project_name).strip(),
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "allocation": allocation,
+        "allocated_at": datetime.now().isoformat()
+    }, []
+
+
+def check_nl_allocation(store, entities, capacity):
+    """Validate the entities of an allocate_project intent against a CapacityOverlay.
+
+    Returns (allocation record or None, employee, error messages, name matches).
+    """
+    employee_name_query = entities.get("employee_name")
+    errors = []
+    if not employee_name_query: errors.append("Employee name is missing.")
+
+    found_employee = None
+    name_matches = []
+    if employee_name_query:
+        found_employee, name_matches, ambiguous = find_employee_by_name(store, employee_name_query)
+        if not found_employee:
+            errors.append(f"Employee matching '{employee_name_query}' not found.")
+        elif ambiguous:
+            errors.append(f"Several employees match '{employee_name_query}'. Please use the full name or employee ID.")
+            found_employee = None
+
+    allocation_data, allocation_errors = check_allocation(
+        capacity, None if errors else found_employee, entities.get("project_name"),
+        entities.get("start_date"), entities.get("end_date"), entities.get("allocation"))
+    errors.extend(allocation_errors)
+    if errors:
+        return None, found_employee, errors, name_matches
+    return allocation_data, found_employee, errors, name_matches
+
+
+def check_allocations(store, requests):
+    """check_allocation for a list of {employee_id, project_name, start_date, end_date, allocation}.
+
+    Each request is checked against the saved allocations plus the accepted
+    requests before it. Returns (accepted records, [(index, errors)] for the rest).
+    """
+    capacity = store.capacity_overlay()
+    accepted, rejected = [], []
+    for i, request in enumerate(requests):
+        employee = store.get_employee(request.get('employee_id'))
+        record, errors = check_allocation(capacity, employee, request.get('project_name'), request.get('start_date'),
+                                          request.get('end_date'), request.get('allocation'))
+        if employee is None:
+            errors = [f"Employee {request.get('employee_id')} not found."] + errors
+        if errors:
+            rejected.append((i, errors))
+        else:
+            accepted.append(record)
+    return accepted, rejected
+
+
+def parse_llm_json(response_text):
+    # Clean up the response to get a valid JSON string
+    json_response_str = response_text.strip().replace('```json', '').replace('```', '')
+    return json.loads(json_response_str)
+
+
+class IntentService:
+    """Turns a question into intent JSON.
+
+    Common phrasings are parsed locally in well under a millisecond; the rest
+    are answered from the response cache or, failing that, by the model.
+    """
+
+    def __init__(self, parser, cache, client, model=GEMINI_MODEL, prompt=INTENT_PROMPT):
+        self.parser = parser
+        self.cache = cache
+        self.client = client
+        self.model = model
+        self.prompt = prompt
+
+    def key(self, query):
+        # Same question (ignoring case/spacing/punctuation) with the same
+        # prompt and model shares a cache entry
+        return cache_key(query, self.model + self.prompt)
+
+    def parse_local(self, query, name_index):
+        response_json, confidence = self.parser.parse(query, name_index)
+        local = response_json is not None and confidence >= LOCAL_CONFIDENCE
+        self.parser.record(local)
+        return response_json if local else None
+
+    def _from_reply(self, query, reply):
+        response_json = parse_llm_json(reply)
+        if isinstance(response_json, dict):
+            self.cache.put(self.key(query), response_json)
+        return response_json
+
+    def ask(self, query):
+        """(intent JSON or None, exception or None) from the cache or the model."""
+        cached = self.cache.get(self.key(query))
+        if cached is not None:
+            return cached, None
+        try:
+            return self._from_reply(query, self.client.generate_sync(self.prompt.format(query=query))), None
+        except Exception as e:
+            return None, e
+
+    async def ask_async(self, query):
+        cached = self.cache.get(self.key(query))
+        if cached is not None:
+            return cached, None
+        try:
+            return self._from_reply(query, await self.client.generate(self.prompt.format(query=query))), None
+        except Exception as e:
+            return None, e
+
+    def parse_many(self, queries, name_index):
+        """(response or None, error message or None) per query.
+
+        Local parses and cached intents are used first; the rest go to the
+        model concurrently in a single round instead of one blocking call each.
+        """
+        results = [None] * len(queries)
+        pending = []
+        for i, query in enumerate(queries):
+            response_json = self.parse_local(query, name_index)
+            if response_json is None:
+                response_json = self.cache.get(self.key(query))
+            if response_json is not None:
+                results[i] = (response_json, None)
+            else:
+                pending.append(i)
+
+        if pending:
+            replies = self.client.generate_many([self.prompt.format(query=queries[i]) for i in pending])
+            for i, reply in zip(pending, replies):
+                if isinstance(reply, Exception):
+                    results[i] = (None, f"Could not reach the AI model: {reply}")
+                    continue
+                try:
+                    results[i] = (self._from_reply(queries[i], reply), None)
+                except ValueError:
+                    results[i] = (None, "The AI model's reply could not be read.")
+        return results
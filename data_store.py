@@ -0,0 +1,757 @@
+import hashlib
+import json
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from capacity import MAX_DAY, CapacityIndex, allocation_days, iso_date, to_day
+from metrics import timed
+from name_index import NameIndex
+from skill_index import SkillIndex
+from storage import DATABASE_FILE, FileLock, lock_path, open_storages
+from summary_stats import SummaryStats
+
+EMPLOYEES_FILE = 'employees_data.json'
+ALLOCATIONS_FILE = 'project_allocations.json'
+# Least seconds between background snapshot rebuilds; readers that find the
+# snapshot stale in between build it themselves
+SNAPSHOT_REFRESH_INTERVAL = 5.0
+
+# Fields that belong to the employee record. Allocations used to carry a full
+# copy of them; they are now stored as references by employee_id and joined
+# back in by `DataStore.allocation_view`.
+EMPLOYEE_FIELDS = (
+    'name', 'email', 'phone', 'designation', 'department', 'date_of_joining',
+    'location', 'experience_years', 'skills', 'skills_count', 'created_at',
+)
+
+
+def normalize_allocation(record, keep_name=False):
+    # Strip copied employee fields, leaving employee_id, project, dates, % and
+    # timestamp, with dates in YYYY-MM-DD form
+    normalized = {key: value for key, value in record.items() if key not in EMPLOYEE_FIELDS or (keep_name and key == 'name')}
+    for field in ('start_date', 'end_date'):
+        if field in normalized:
+            normalized[field] = iso_date(normalized[field])
+    return normalized
+
+
+def _allocation_value(alloc):
+    # Bulk uploads have stored numpy numbers as strings via default=str
+    try:
+        return float(alloc.get('allocation', 0) or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _as_number(value):
+    # Show whole percentages as ints, matching how they were entered
+    return int(value) if float(value).is_integer() else value
+
+
+# Fields a table's free-text filter looks in
+EMPLOYEE_SEARCH_FIELDS = ('employee_id', 'name', 'email', 'designation', 'department', 'location', 'skills')
+ALLOCATION_SEARCH_FIELDS = ('employee_id', 'name', 'project_name', 'designation', 'department')
+
+
+def _search_text(row, fields):
+    values = []
+    for field in fields:
+        value = row.get(field)
+        values.append(' '.join(map(str, value)) if isinstance(value, list) else str(value or ''))
+    return ' '.join(values).lower()
+
+
+def _sort_key(value):
+    # Missing values last; numbers before text so mixed columns still sort
+    if value is None or value == '':
+        return (2, '')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value)
+    return (1, str(value).lower())
+
+
+class WriteConflict(ValueError):
+    """A write was rejected because the data it was checked against has changed."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__(' '.join(self.errors))
+
+
+class _PendingWrite:
+    __slots__ = ('kind', 'records', 'expected_version', 'error', 'done')
+
+    def __init__(self, kind, records, expected_version):
+        self.kind = kind
+        self.records = records
+        self.expected_version = expected_version
+        self.error = None
+        self.done = False
+
+
+def _as_json_record(record):
+    # Keep the in-memory copy identical to what a fresh json.load would return
+    return json.loads(json.dumps(record, default=str))
+
+
+class DataStore:
+    """In-memory view of the employee and allocation files.
+
+    The files are parsed once and re-read only when their mtime/size changes,
+    so every Streamlit rerun reads from memory instead of disk. ``storage_mode``
+    picks how they are persisted (see ``storage.STORAGE_MODES``) and
+    ``role_skills`` (designation -> skills) seeds the skill search vocabulary.
+    """
+
+    def __init__(self, employees_path=EMPLOYEES_FILE, allocations_path=ALLOCATIONS_FILE, storage_mode='json', database_path=DATABASE_FILE, role_skills=None,
+                 snapshot_dir=None):
+        self.employees_path = employees_path
+        self.allocations_path = allocations_path
+        self.storage_mode = storage_mode
+        self.role_skills = role_skills
+        # Where the columnar snapshot is kept (see snapshot.py); None keeps it in memory only
+        self.snapshot_dir = snapshot_dir
+        # Held by every writer, in this process or another, while it commits
+        self._write_lock = FileLock(lock_path(employees_path, allocations_path, storage_mode, database_path))
+        self._employees_storage, self._allocations_storage = open_storages(
+            employees_path, allocations_path, storage_mode, database_path, self._write_lock)
+        # Backends with their own indexes (SQLite) answer ID and project lookups
+        # directly; everything else is still computed from the in-memory view
+        self._indexed = getattr(self._employees_storage, 'supports_queries', False)
+        self._lock = threading.RLock()
+        self._employees_signature = False
+        self._allocations_signature = False
+        self._employees = []
+        self._employees_by_id = {}
+        self._allocations = []
+        self._allocations_by_employee = {}
+        self._allocations_by_project = {}
+        # Aggregates maintained alongside the allocation list:
+        # employee_id -> total %, and employee_id -> {project_name: %}
+        self._totals = {}
+        self._project_totals = {}
+        # Built on first use and kept up to date as employees are added
+        self._name_index = None
+        self._skill_index = None
+        # (day, free % per employee in skill index order); writes update the
+        # entries of the employees they touch, a new day or reload rebuilds it
+        self._available_cache = None
+        # employee_id -> positions in the employee list
+        self._employee_positions = {}
+        # employee_id -> allocation intervals by day, for date-aware capacity
+        self._capacity = CapacityIndex()
+        # Dashboard counts kept current on every write, plus (version, snapshot)
+        self._summary = SummaryStats()
+        self._summary_cache = None
+        # Monthly utilization (see analytics.py), built on first use and
+        # kept current on writes
+        self._utilization = None
+        # (version, rows) of the last joined allocation view, and
+        # (version, DataFrame, rows appended since it was built) of its frame
+        self._view_cache = None
+        self._frame_cache = None
+        # table name -> (query key, matching rows in display order) for paging
+        self._page_cache = {}
+        # Writes waiting to be committed, and whether a thread is committing
+        self._pending_writes = []
+        self._pending_changed = threading.Condition(threading.Lock())
+        self._committing = False
+        # (version, Snapshot) last opened; builds are serialized, and a write
+        # while the background refresh runs marks it for another pass, which
+        # waits until SNAPSHOT_REFRESH_INTERVAL after the previous one started
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._snapshot_state = threading.Lock()
+        self._snapshot_thread = None
+        self._snapshot_stale = False
+        self._snapshot_refreshed_at = None
+        # Bumped on every (re)load or write so derived caches can key on it
+        self.version = 0
+
+    # --- Loading ---
+
+    def _refresh(self):
+        self._employees_signature = self._reload(self._employees_storage, self._employees_signature, self._load_employees)
+        self._allocations_signature = self._reload(self._allocations_storage, self._allocations_signature, self._load_allocations)
+
+    def _reload(self, storage, known_signature, load):
+        signature = storage.signature()
+        while signature != known_signature:
+            load(storage.load())
+            # Another writer may have changed the files while we were reading
+            known_signature, signature = signature, storage.signature()
+        return known_signature
+
+    def _load_employees(self, records):
+        self._employees = records
+        self._employees_by_id = {}
+        self._employee_positions = {}
+        self._summary.clear_employees()
+        for position, emp in enumerate(records):
+            self._employees_by_id.setdefault(emp.get('employee_id'), emp)
+            self._employee_positions.setdefault(emp.get('employee_id'), []).append(position)
+            self._summary.add_employee(emp)
+        self._name_index = None
+        self._skill_index = None
+        self._utilization = None
+        self._available_cache = None
+        self.version += 1
+
+    def _load_allocations(self, records):
+        self._allocations = []
+        self._allocations_by_employee = {}
+        self._allocations_by_project = {}
+        self._totals = {}
+        self._project_totals = {}
+        self._capacity = CapacityIndex()
+        self._summary.clear_allocations()
+        self._utilization = None
+        self._available_cache = None
+        self._index_allocations(records, loading=True)
+        self.version += 1
+
+    def _index_allocations(self, records, loading=False):
+        intervals = []
+        for alloc in records:
+            self._allocations.append(alloc)
+            self._allocations_by_employee.setdefault(alloc.get('employee_id'), []).append(alloc)
+            self._allocations_by_project.setdefault(alloc.get('project_name'), []).append(alloc)
+            employee_id = alloc.get('employee_id')
+            value = _allocation_value(alloc)
+            self._totals[employee_id] = self._totals.get(employee_id, 0) + value
+            breakdown = self._project_totals.setdefault(employee_id, {})
+            breakdown[alloc.get('project_name')] = breakdown.get(alloc.get('project_name'), 0) + value
+            self._summary.add_allocation(alloc.get('project_name'), value)
+            intervals.append((employee_id, *allocation_days(alloc), value))
+        if loading:
+            self._capacity.add_many(intervals)
+        else:
+            for item in intervals:
+                self._capacity.add(*item)
+
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    # --- Employees ---
+
+    def employees(self):
+        with self._lock:
+            self._refresh()
+            return list(self._employees)
+
+    def get_employee(self, employee_id):
+        if self._indexed:
+            return self._employees_storage.get(employee_id)
+        with self._lock:
+            self._refresh()
+            return self._employees_by_id.get(employee_id)
+
+    def employee_ids(self):
+        with self._lock:
+            self._refresh()
+            return list(self._employees_by_id)
+
+    def has_employee(self, employee_id):
+        if self._indexed:
+            return self._employees_storage.exists(employee_id)
+        return self.get_employee(employee_id) is not None
+
+    def add_employee(self, employee_data):
+        """Save a new employee; raises WriteConflict if the ID was taken in the meantime."""
+        self.add_employees([employee_data])
+
+    def add_employees(self, employees_list):
+        """Save new employees in one write; all are rejected with WriteConflict if any ID is taken."""
+        self._commit('employees', [_as_json_record(employee) for employee in employees_list])
+
+    def _apply_employees(self, records):
+        self._employees_storage.append(records, self._employees)
+        for record in records:
+            self._employee_positions.setdefault(record.get('employee_id'), []).append(len(self._employees))
+            self._employees.append(record)
+            self._employees_by_id.setdefault(record.get('employee_id'), record)
+            self._summary.add_employee(record)
+            if self._name_index is not None:
+                self._name_index.add(record)
+            if self._skill_index is not None:
+                self._skill_index.add(record)
+        if self._utilization is not None:
+            self._utilization.add_employees(records)
+        if self._available_cache is not None:
+            day, available = self._available_cache
+            # Usually 100%, unless allocations were saved for the ID before the employee
+            added = np.array([100 - self._capacity.peak(record.get('employee_id'), to_day(day), MAX_DAY) for record in records], dtype='float64')
+            self._available_cache = (day, np.concatenate([available, added]))
+        self._employees_signature = self._employees_storage.signature()
+        self.version += 1
+
+    def summary(self):
+        """Employee and allocation counts for the dashboard (see SummaryStats.snapshot)."""
+        with self._lock:
+            self._refresh()
+            if self._summary_cache is None or self._summary_cache[0] != self.version:
+                self._summary_cache = (self.version, self._summary.snapshot())
+            return self._summary_cache[1]
+
+    def name_index(self):
+        with self._lock:
+            self._refresh()
+            if self._name_index is None:
+                self._name_index = NameIndex(self._employees)
+            return self._name_index
+
+    def skill_index(self):
+        with self._lock:
+            self._refresh()
+            if self._skill_index is None:
+                self._skill_index = SkillIndex(self._employees, self.role_skills)
+            return self._skill_index
+
+    def available_capacity(self, day=None):
+        """Free % from `day` (default today) onwards for each employee, in skill index order.
+
+        Shared between callers, so treat it as read-only.
+        """
+        day = day or date.today()
+        with self._lock:
+            self._refresh()
+            if self._available_cache is None or self._available_cache[0] != day:
+                peaks = self._capacity.peaks(to_day(day), MAX_DAY)
+                available = np.array([100 - peaks.get(emp.get('employee_id'), 0) for emp in self._employees], dtype='float64')
+                self._available_cache = (day, available)
+            return self._available_cache[1]
+
+    def _update_available(self, employee_ids):
+        # Recompute only the touched employees, in a copy so arrays handed out stay unchanged
+        day, available = self._available_cache
+        available = available.copy()
+        for employee_id in employee_ids:
+            positions = self._employee_positions.get(employee_id)
+            if positions:
+                available[positions] = 100 - self._capacity.peak(employee_id, to_day(day), MAX_DAY)
+        self._available_cache = (day, available)
+
+    @timed()
+    def utilization(self, dimension=None):
+        """Monthly headcount, utilization, bench and over-allocation per `dimension` group.
+
+        See analytics.Utilization.rollup; the frame is shared, so treat it as read-only.
+        """
+        with self._lock:
+            self._refresh()
+            if self._utilization is None:
+                from analytics import Utilization
+
+                self._utilization = Utilization(self._employees, self._allocations)
+            return self._utilization.rollup(dimension)
+
+    def search_candidates(self, designation, skills=(), allocation_needed=0, k=50, day=None):
+        """Top-k employees of a designation by skill match with enough free capacity from `day`.
+
+        Returns (CandidateMatch list, total number of qualifying employees).
+        """
+        index = self.skill_index()
+        available = self.available_capacity(day)
+        return index.search(designation, skills, available, allocation_needed, k)
+
+    # --- Allocations ---
+
+    def allocations(self):
+        with self._lock:
+            self._refresh()
+            return list(self._allocations)
+
+    def allocations_for_employee(self, employee_id):
+        if self._indexed:
+            return self._allocations_storage.for_employee(employee_id)
+        with self._lock:
+            self._refresh()
+            return list(self._allocations_by_employee.get(employee_id, []))
+
+    def allocations_for_project(self, project_name):
+        if self._indexed:
+            return self._allocations_storage.for_project(project_name)
+        with self._lock:
+            self._refresh()
+            return list(self._allocations_by_project.get(project_name, []))
+
+    def total_allocation(self, employee_id):
+        with self._lock:
+            self._refresh()
+            return _as_number(self._totals.get(employee_id, 0))
+
+    def project_breakdown(self, employee_id):
+        with self._lock:
+            self._refresh()
+            return {project: _as_number(value) for project, value in self._project_totals.get(employee_id, {}).items()}
+
+    def allocation_totals(self):
+        with self._lock:
+            self._refresh()
+            return {employee_id: _as_number(value) for employee_id, value in self._totals.items()}
+
+    def peak_allocation(self, employee_id, start_date, end_date=None):
+        """Highest % the employee is allocated on any day from start_date to end_date.
+
+        Dates may be date objects or stored date strings; no end_date means
+        open-ended. Allocations that ended before start_date do not count.
+        """
+        start, end = to_day(start_date), (MAX_DAY if end_date is None else to_day(end_date))
+        with self._lock:
+            self._refresh()
+            return _as_number(self._capacity.peak(employee_id, start, end))
+
+    def peak_allocations(self, start_date, end_date=None):
+        # peak_allocation for every employee that has allocations
+        start, end = to_day(start_date), (MAX_DAY if end_date is None else to_day(end_date))
+        with self._lock:
+            self._refresh()
+            return {employee_id: _as_number(peak) for employee_id, peak in self._capacity.peaks(start, end).items()}
+
+    def capacity_overlay(self):
+        # Scratch copy-on-write view for validating a batch before saving it
+        with self._lock:
+            self._refresh()
+            return self._capacity.overlay()
+
+    def _join(self, allocations):
+        rows = []
+        for alloc in allocations:
+            employee = self._employees_by_id.get(alloc.get('employee_id'))
+            rows.append({**employee, **alloc} if employee else dict(alloc))
+        return rows
+
+    def allocation_view(self):
+        """Allocation rows joined with the current employee record, for display and the agent."""
+        with self._lock:
+            self._refresh()
+            if self._view_cache is None or self._view_cache[0] != self.version:
+                self._view_cache = (self.version, self._join(self._allocations))
+            return list(self._view_cache[1])
+
+    def _page(self, table, rows, search_fields, search, filters, sort_by, descending, offset, limit):
+        filters = {field: value for field, value in (filters or {}).items() if value not in (None, '')}
+        key = (self.version, (search or '').strip().lower(), tuple(sorted(filters.items())), sort_by, descending)
+        cached = self._page_cache.get(table)
+        if cached is None or cached[0] != key:
+            needle = key[1]
+            matched = [
+                row for row in rows
+                if all(row.get(field) == value for field, value in filters.items())
+                and (not needle or needle in _search_text(row, search_fields))
+            ]
+            if sort_by:
+                if descending:
+                    # Keep missing values last either way
+                    present = [row for row in matched if _sort_key(row.get(sort_by))[0] < 2]
+                    present.sort(key=lambda row: _sort_key(row.get(sort_by)), reverse=True)
+                    matched = present + [row for row in matched if _sort_key(row.get(sort_by))[0] == 2]
+                else:
+                    matched.sort(key=lambda row: _sort_key(row.get(sort_by)))
+            cached = self._page_cache[table] = (key, matched)
+        matched = cached[1]
+        return matched[offset:offset + limit], len(matched)
+
+    def employee_page(self, search='', filters=None, sort_by=None, descending=False, offset=0, limit=50):
+        """One page of employees: (rows, total matching).
+
+        `search` is a case-insensitive substring looked up in the
+        EMPLOYEE_SEARCH_FIELDS, `filters` maps field -> exact value. The
+        filtered, sorted order is cached, so turning pages is a slice.
+        """
+        with self._lock:
+            self._refresh()
+            return self._page('employees', self._employees, EMPLOYEE_SEARCH_FIELDS, search, filters, sort_by, descending, offset, limit)
+
+    def allocation_page(self, search='', filters=None, sort_by=None, descending=False, offset=0, limit=50):
+        """One page of the joined allocation view, like employee_page."""
+        with self._lock:
+            self._refresh()
+            if self._view_cache is None or self._view_cache[0] != self.version:
+                self._view_cache = (self.version, self._join(self._allocations))
+            return self._page('allocations', self._view_cache[1], ALLOCATION_SEARCH_FIELDS, search, filters, sort_by, descending, offset, limit)
+
+    @timed()
+    def allocation_frame(self):
+        """allocation_view as a DataFrame, shared between callers, so treat it as read-only.
+
+        Built once per data version; allocations added through this store are
+        appended to the existing frame instead of rebuilding it.
+        """
+        with self._lock:
+            self._refresh()
+            if self._frame_cache is not None and self._frame_cache[0] == self.version:
+                _, frame, appended = self._frame_cache
+                if appended:
+                    frame = pd.concat([frame, pd.DataFrame(self._join(appended))], ignore_index=True)
+                    self._frame_cache = (self.version, frame, [])
+                return frame
+            frame = pd.DataFrame(self.allocation_view())
+            self._frame_cache = (self.version, frame, [])
+            return frame
+
+    def add_allocations(self, allocations_list, expected_version=None):
+        """Save allocations in one write.
+
+        `expected_version` is the store version the caller checked capacity
+        against. If anything was written since, every allocation is checked
+        again against the current data as part of the commit, and the whole
+        list is rejected with WriteConflict if any employee would go over 100%.
+        Without it the allocations are saved unchecked.
+        """
+        records = [_as_json_record(normalize_allocation(alloc)) for alloc in allocations_list]
+        self._commit('allocations', records, expected_version)
+
+    def _apply_allocations(self, records):
+        self._allocations_storage.append(records, self._allocations)
+        self._index_allocations(records)
+        if self._utilization is not None:
+            self._utilization.add_allocations(records)
+        if self._available_cache is not None:
+            self._update_available({alloc.get('employee_id') for alloc in records})
+        self._allocations_signature = self._allocations_storage.signature()
+        # Appending rows leaves the joined view and its frame valid up to
+        # here, so carry them forward rather than rebuilding them
+        view_current = self._view_cache is not None and self._view_cache[0] == self.version
+        frame_current = self._frame_cache is not None and self._frame_cache[0] == self.version
+        self.version += 1
+        if view_current:
+            self._view_cache = (self.version, self._view_cache[1] + self._join(records))
+        if frame_current:
+            self._frame_cache = (self.version, self._frame_cache[1], self._frame_cache[2] + records)
+
+    # --- Columnar snapshot ---
+
+    def _snapshot_key(self):
+        # Identifies the data across processes: the record counts and the
+        # last record of each kind, which is enough for append-only data
+        # (normalize_allocations, which rewrites records, drops the snapshot)
+        last = [self._employees[-1:], self._allocations[-1:]]
+        content = json.dumps([len(self._employees), len(self._allocations), last], sort_keys=True, default=str)
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def snapshot(self):
+        """Columnar snapshot of the current data (see snapshot.py).
+
+        Opened from snapshot_dir when it holds one for this data (written by
+        this process or another), otherwise built from memory and written
+        there first, then memory-mapped.
+        """
+        from snapshot import Snapshot, build_tables, open_snapshot, write_snapshot
+
+        with self._snapshot_lock:
+            with self._lock:
+                self._refresh()
+                if self._snapshot is not None and self._snapshot[0] == self.version:
+                    return self._snapshot[1]
+                version, key = self.version, self._snapshot_key()
+                snapshot = open_snapshot(self.snapshot_dir, key) if self.snapshot_dir else None
+                employees, allocations = list(self._employees), list(self._allocations)
+            if snapshot is None:
+                tables = build_tables(employees, allocations)
+                if self.snapshot_dir:
+                    write_snapshot(self.snapshot_dir, tables, key)
+                    snapshot = open_snapshot(self.snapshot_dir, key)
+                # Not written, or already replaced by another process's newer data
+                snapshot = snapshot or Snapshot(self.snapshot_dir, tables, key)
+            with self._lock:
+                self._snapshot = (version, snapshot)
+            return snapshot
+
+    def _refresh_snapshot_later(self):
+        with self._snapshot_state:
+            if self._snapshot_thread is not None:
+                self._snapshot_stale = True
+                return
+            self._snapshot_thread = threading.Thread(target=self._refresh_snapshot, name='snapshot-refresh', daemon=True)
+            self._snapshot_thread.start()
+
+    def _refresh_snapshot(self):
+        # One pass in flight and at most one pending: commits made while this
+        # thread waits or builds are all covered by its next pass
+        while True:
+            if self._snapshot_refreshed_at is not None:
+                delay = self._snapshot_refreshed_at + SNAPSHOT_REFRESH_INTERVAL - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            with self._snapshot_state:
+                self._snapshot_stale = False
+            self._snapshot_refreshed_at = time.monotonic()
+            try:
+                self.snapshot()
+            except Exception:
+                # Rebuilt on the next read instead
+                pass
+            with self._snapshot_state:
+                if not self._snapshot_stale:
+                    self._snapshot_thread = None
+                    return
+
+    # --- Group commit ---
+
+    def _commit(self, kind, records, expected_version=None):
+        # Writers queue up while a commit is running; the next one to find no
+        # commit running saves everything queued so far in one write per file
+        write = _PendingWrite(kind, records, expected_version)
+        batch = None
+        with self._pending_changed:
+            self._pending_writes.append(write)
+            while not write.done:
+                if not self._committing:
+                    self._committing = True
+                    batch, self._pending_writes = self._pending_writes, []
+                    break
+                self._pending_changed.wait()
+        if batch is not None:
+            try:
+                self._commit_batch(batch)
+            finally:
+                with self._pending_changed:
+                    self._committing = False
+                    self._pending_changed.notify_all()
+        if batch is not None and self.snapshot_dir:
+            self._refresh_snapshot_later()
+        if write.error is not None:
+            raise write.error
+
+    def _commit_batch(self, batch):
+        try:
+            with self._lock, self._write_lock:
+                # Pick up other processes' writes before checking against them
+                self._refresh()
+                employees, allocations = self._check_batch(batch)
+                for kind, records, apply in (('employees', employees, self._apply_employees), ('allocations', allocations, self._apply_allocations)):
+                    if not records:
+                        continue
+                    try:
+                        apply(records)
+                    except Exception as e:
+                        for write in batch:
+                            if write.kind == kind and write.error is None:
+                                write.error = e
+        except Exception as e:
+            for write in batch:
+                write.error = write.error or e
+        finally:
+            for write in batch:
+                write.done = True
+
+    def _check_batch(self, batch):
+        # Validated in arrival order, each write seeing the ones accepted before it
+        employees, allocations = [], []
+        employee_ids = set()
+        overlay = None
+        for write in batch:
+            if write.kind == 'employees':
+                taken, seen = [], set()
+                for record in write.records:
+                    employee_id = record.get('employee_id')
+                    if employee_id in seen or employee_id in employee_ids or self._has_employee_id(employee_id):
+                        taken.append(employee_id)
+                    seen.add(employee_id)
+                if taken:
+                    write.error = WriteConflict([f"Employee ID {employee_id} already exists." for employee_id in taken])
+                    continue
+                employee_ids.update(seen)
+                employees.extend(write.records)
+                continue
+            checked = write.expected_version is not None and (write.expected_version != self.version or allocations)
+            if checked:
+                if overlay is None:
+                    overlay = self._capacity.overlay()
+                    for alloc in allocations:
+                        overlay.add(alloc.get('employee_id'), *allocation_days(alloc), _allocation_value(alloc))
+                errors = self._capacity_errors(write.records, overlay)
+                if errors:
+                    write.error = WriteConflict(errors)
+                    # Rebuilt from the accepted allocations at the next check
+                    overlay = None
+                    continue
+            elif overlay is not None:
+                for alloc in write.records:
+                    overlay.add(alloc.get('employee_id'), *allocation_days(alloc), _allocation_value(alloc))
+            allocations.extend(write.records)
+        return employees, allocations
+
+    def _has_employee_id(self, employee_id):
+        if self._indexed:
+            return self._employees_storage.exists(employee_id)
+        return employee_id in self._employees_by_id
+
+    def _capacity_errors(self, records, overlay):
+        errors = []
+        for alloc in records:
+            employee_id = alloc.get('employee_id')
+            start, end = allocation_days(alloc)
+            value = _allocation_value(alloc)
+            peak = overlay.peak(employee_id, start, end)
+            if peak + value > 100:
+                errors.append(
+                    f"{employee_id} is now allocated {_as_number(peak)}% between {alloc.get('start_date')} and "
+                    f"{alloc.get('end_date')}; another {_as_number(value)}% would exceed 100%.")
+            else:
+                overlay.add(employee_id, start, end, value)
+        return errors
+
+    def normalize_allocations(self):
+        """Rewrite stored allocations as thin references to their employee, with ISO dates.
+
+        Returns (records rewritten, allocations whose employee no longer
+        exists). Those orphans keep their `name` so they stay identifiable.
+        """
+        with self._lock, self._write_lock:
+            self._refresh()
+            records = []
+            changed = 0
+            orphans = 0
+            for alloc in self._allocations:
+                orphan = alloc.get('employee_id') not in self._employees_by_id
+                orphans += orphan
+                record = normalize_allocation(alloc, keep_name=orphan)
+                changed += record != alloc
+                records.append(record)
+            if changed:
+                if self.snapshot_dir:
+                    from snapshot import remove_snapshot
+                    remove_snapshot(self.snapshot_dir)
+                self._allocations_storage.replace(records)
+                self._load_allocations(records)
+                self._allocations_signature = self._allocations_storage.signature()
+            return changed, orphans
+
+    def compact(self):
+        with self._lock, self._write_lock:
+            for storage in (self._employees_storage, self._allocations_storage):
+                if hasattr(storage, 'compact'):
+                    storage.compact()
+
+    def close(self):
+        with self._lock:
+            self._employees_storage.close()
+            self._allocations_storage.close()
+
+
+if __name__ == "__main__":
+    # De-duplicate allocations written before they were normalized:
+    #   STORAGE_MODE=json python data_store.py normalize-allocations
+    import os
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'normalize-allocations':
+        print("Usage: python data_store.py normalize-allocations")
+        sys.exit(1)
+    from snapshot import SNAPSHOT_DIR
+
+    store = DataStore(storage_mode=os.getenv('STORAGE_MODE', 'json'), database_path=os.getenv('SQLITE_PATH', DATABASE_FILE),
+                      snapshot_dir=os.getenv('SNAPSHOT_DIR', SNAPSHOT_DIR))
+    changed, orphans = store.normalize_allocations()
+    store.close()
+    print(f"Normalized {changed} allocation records")
+    if orphans:
+        print(f"{orphans} allocations reference employees that no longer exist; their name was kept")
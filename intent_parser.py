@@ -0,0 +1,247 @@
+import re
+import threading
+
+from capacity import iso_date, to_day
+
+# Parses below this confidence are handed to the LLM instead
+LOCAL_CONFIDENCE = 0.7
+
+# Phrases naming the field an employee lookup asks for. Longer phrases come
+# first so "joining date" wins over "join".
+LOOKUP_FIELDS = [
+    ('get_employee_id', r"(?:employee|emp|staff)\s*(?:id|number|no)|\bid"),
+    ('get_employee_phone', r"(?:phone|mobile|contact|cell)(?:\s*(?:number|no))?"),
+    ('get_employee_email', r"e-?mail(?:\s*(?:address|id))?|mail\s*(?:id|address)"),
+    ('get_employee_department', r"department|dept"),
+    ('get_employee_designation', r"designation|job\s+title|title|role|position"),
+    ('get_employee_experience', r"(?:years\s+of\s+)?experience|experienced"),
+    ('get_employee_doj', r"date\s+of\s+joining|joining\s+date|doj|join(?:ed|ing)?"),
+    ('get_employee_location', r"location|located|based|where"),
+    ('get_employee_skills', r"skill\s*set|skills?|tech(?:nology)?\s+stack|expertise"),
+    ('find_employee_projects', r"projects?|working\s+on|assigned\s+to"),
+    ('get_employee_allocation', r"allocation|allocated|utili[sz]ation|bandwidth|busy"),
+    ('get_employee_details', r"details?|information|info|profile|everything|all\s+about"),
+]
+
+# Common ways of naming each ROLE_SKILLS designation
+DESIGNATION_ALIASES = {
+    'Backend Developer': r"back[\s-]?end(?:\s+(?:developer|engineer|dev))?s?",
+    'Frontend Developer': r"front[\s-]?end(?:\s+(?:developer|engineer|dev))?s?|ui\s+(?:developer|engineer)s?",
+    'AI/ML/Data Scientist': r"ai\s*/\s*ml(?:\s*/\s*data\s+scientist)?|data\s+scientists?|(?:ml|ai|machine\s+learning)\s+engineers?|machine\s+learning",
+    'DevOps Engineer': r"dev\s*ops(?:\s+engineers?)?|sre|site\s+reliability(?:\s+engineers?)?",
+}
+
+# Skills that are also everyday words only match with their own capitalization
+CASE_SENSITIVE_SKILLS = {'Go', 'R', 'Less', 'Lit', 'Echo', 'Gin', 'Chef', 'Puppet', 'Emotion', 'Parcel', 'Recoil', 'Bamboo', 'Jest', 'Dask'}
+
+# Words around an employee name in a lookup question
+FILLER_WORDS = {
+    'what', 'whats', 'is', 'are', 'was', 'were', 'the', 'a', 'an', 'of', 'for', 'me', 'show', 'tell',
+    'give', 'get', 'find', 'display', 'list', 'fetch', 'please', 'can', 'could', 'would', 'you', 'i',
+    'need', 'want', 'know', 'to', 'does', 'do', 'did', 'have', 'has', 'had', 'about', 'which', 'when',
+    'how', 'much', 'many', 'in', 'on', 'at', 'his', 'her', 'their', 'its', 'employee', 'employees',
+    'current', 'currently', 'total', 'number', 'address', 'us', 'all', 'my', 'with', 'by', 'who', 'and',
+    'name', 'date', 'years', 'year', 'work', 'works', 'working', 'now', 'right', 'today',
+}
+
+SEARCH_WORDS = r"\b(?:find|need|needs|looking|search|hire|want|require|recommend|suggest|who|any|available|candidates?|someone|somebody)\b"
+
+DATE_PATTERN = r"\d{4}-\d{1,2}-\d{1,2}|\d{1,2}/\d{1,2}/\d{4}|\d{1,2}-\d{1,2}-\d{4}|\d{4}/\d{1,2}/\d{1,2}"
+
+_ALLOCATE_RE = re.compile(r"^\s*(?:please\s+)?(?:allocate|assign|staff)\s+(?P<name>.+?)\s+(?:to|on|onto)\s+(?P<rest>.+)$", re.I)
+_PROJECT_END_RE = re.compile(r"\s*(?:,|\bfrom\b|\bstart(?:s|ing)?\b|\bbeginning\b|\bbetween\b|\bwith\b|\bfor\b|\bat\b|" + DATE_PATTERN + r"|\d+\s*%)", re.I)
+_DATE_RE = re.compile(DATE_PATTERN)
+_PERCENT_RE = re.compile(r"(\d{1,3}(?:\.\d+)?)\s*(?:%|percent\b)", re.I)
+_FIELD_RE = re.compile('|'.join(f"(?P<f{i}>\\b(?:{pattern})\\b)" for i, (_, pattern) in enumerate(LOOKUP_FIELDS)), re.I)
+_SEARCH_RE = re.compile(SEARCH_WORDS, re.I)
+_GREETING_RE = re.compile(r"^\s*(?:hi|hello|hey|thanks|thank\s+you|good\s+(?:morning|afternoon|evening)|how\s+are\s+you|what(?:'s|\s+is)\s+the\s+weather(?:\s+today)?)\b[\s!?.,]*(?:there|again)?[\s!?.,]*$", re.I)
+_WORD_RE = re.compile(r"[\w.@-]+")
+
+
+def _bounded(patterns):
+    # Alternation that only matches whole words/phrases, longest first
+    alternatives = sorted(set(patterns), key=len, reverse=True)
+    return r"(?<![\w])(?:" + '|'.join(re.escape(p) for p in alternatives) + r")(?![\w+#])"
+
+
+def _skill_aliases(skill):
+    # "Amazon Web Services (AWS)" -> itself, "Amazon Web Services", "AWS";
+    # "Sass/SCSS" -> "Sass", "SCSS"; "React.js" -> "React", "ReactJS"
+    aliases = {skill}
+    outer = re.sub(r'\s*\(.*?\)', '', skill).strip()
+    inner = re.findall(r'\((.*?)\)', skill)
+    for part in [outer, *inner]:
+        aliases.add(part)
+        if '/' in part:
+            aliases.update(piece.strip() for piece in part.split('/') if piece.strip())
+    for alias in list(aliases):
+        if alias.lower().endswith('.js') and alias[:-3].lower() not in ('next', 'nest', 'three', 'nuxt'):
+            aliases.update({alias[:-3], alias[:-3] + 'js'})
+    return {alias for alias in aliases if alias}
+
+
+class IntentParser:
+    """Rule-based parser for the intents in the Gemini prompt.
+
+    Recognizes the common phrasings ("what is X's email", "allocate X to P
+    from D1 to D2 with N%", "find a DevOps engineer with AWS") with compiled
+    patterns, checks employee names against the name index and skills
+    against the ROLE_SKILLS vocabulary, and returns the same
+    ``{"intent": ..., "entities": ...}`` dict the LLM would, with a
+    confidence. Anything it is unsure about should go to the LLM.
+    """
+
+    def __init__(self, role_skills):
+        self.role_skills = role_skills
+        self._designation_re = re.compile(
+            '|'.join(
+                f"(?P<d{i}>{_bounded([designation])}|\\b(?:{DESIGNATION_ALIASES.get(designation, '(?!)')})\\b)"
+                for i, designation in enumerate(role_skills)
+            ),
+            re.I,
+        )
+        self._designations = list(role_skills)
+        # alias -> canonical skill names (some aliases are shared, e.g. "JavaScript")
+        self._skill_aliases = {}
+        sensitive, insensitive = [], []
+        for skills in role_skills.values():
+            for skill in skills:
+                for alias in _skill_aliases(skill):
+                    if alias in CASE_SENSITIVE_SKILLS or len(alias) == 1:
+                        sensitive.append(alias)
+                        key = alias
+                    else:
+                        insensitive.append(alias)
+                        key = alias.lower()
+                    self._skill_aliases.setdefault(key, [])
+                    if skill not in self._skill_aliases[key]:
+                        self._skill_aliases[key].append(skill)
+        self._skill_re = re.compile(_bounded(insensitive), re.I)
+        self._sensitive_skill_re = re.compile(_bounded(sensitive))
+        self._lock = threading.Lock()
+        self.served_locally = 0
+        self.sent_to_llm = 0
+
+    def record(self, local):
+        with self._lock:
+            if local:
+                self.served_locally += 1
+            else:
+                self.sent_to_llm += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.served_locally + self.sent_to_llm
+            return {
+                'served_locally': self.served_locally,
+                'sent_to_llm': self.sent_to_llm,
+                'local_rate': self.served_locally / total if total else 0.0,
+            }
+
+    def parse(self, query, name_index=None):
+        """(response dict or None, confidence between 0 and 1)."""
+        text = (query or '').strip()
+        if not text:
+            return None, 0.0
+        if _GREETING_RE.match(text):
+            return {'intent': 'other', 'entities': {}}, 0.9
+        if _ALLOCATE_RE.match(text):
+            return self._parse_allocation(text, name_index)
+        designation = self._designation_re.search(text)
+        # Without a designation, a field word means this is about an employee
+        # ("find Ruby's email"), not a skill search
+        if designation or _SEARCH_RE.search(text) and not _FIELD_RE.search(text) and self._find_skills(text, None):
+            return self._parse_search(text, designation)
+        return self._parse_lookup(text, name_index)
+
+    def _name_confidence(self, name, name_index):
+        if not name:
+            return 0.0
+        if name_index is None:
+            return LOCAL_CONFIDENCE
+        matches = name_index.search(name, k=1)
+        return 0.6 + 0.4 * matches[0].score if matches else 0.3
+
+    def _parse_allocation(self, text, name_index):
+        match = _ALLOCATE_RE.match(text)
+        name = match.group('name').strip(' ,')
+        rest = match.group('rest')
+        project = _PROJECT_END_RE.split(rest, maxsplit=1)[0].strip(' ,"\'')
+        project = re.sub(r"^(?:the\s+)?(?:project\s+)?", '', project)
+        project = re.sub(r"\s+project$", '', project).strip(' ,"\'')
+        dates = _DATE_RE.findall(rest)
+        percent = _PERCENT_RE.search(rest)
+        entities = {
+            'employee_name': name,
+            'project_name': project or None,
+            'start_date': iso_date(dates[0]) if len(dates) > 0 else None,
+            'end_date': iso_date(dates[1]) if len(dates) > 1 else None,
+            'allocation': None,
+        }
+        if percent:
+            value = float(percent.group(1))
+            entities['allocation'] = int(value) if value.is_integer() else value
+        complete = (
+            project and len(dates) == 2 and percent
+            and all(to_day(day) is not None for day in dates)
+        )
+        confidence = self._name_confidence(name, name_index) if complete else 0.3
+        return {'intent': 'allocate_project', 'entities': entities}, confidence
+
+    def _find_skills(self, text, designation):
+        found = {}
+        for match in [*self._skill_re.finditer(text), *self._sensitive_skill_re.finditer(text)]:
+            alias = match.group(0)
+            candidates = self._skill_aliases.get(alias.lower()) or self._skill_aliases.get(alias) or []
+            if designation:
+                in_role = [skill for skill in candidates if skill in self.role_skills.get(designation, ())]
+                candidates = in_role or candidates
+            if candidates:
+                found.setdefault(candidates[0], match.start())
+        # In the order they were mentioned
+        return sorted(found, key=found.get)
+
+    def _parse_search(self, text, designation_match):
+        designation = None
+        confidence = 0.95
+        if designation_match:
+            index = int(designation_match.lastgroup[1:])
+            designation = self._designations[index]
+            # Remove the designation so e.g. "DevOps" is not read as a skill
+            text = text[:designation_match.start()] + ' ' + text[designation_match.end():]
+        skills = self._find_skills(text, designation)
+        if designation is None:
+            # Infer the designation when the skills belong to exactly one role
+            roles = [role for role, role_skills in self.role_skills.items() if set(skills) <= set(role_skills)]
+            if len(roles) != 1:
+                return None, 0.2
+            designation = roles[0]
+            confidence = 0.8
+        percent = _PERCENT_RE.search(text)
+        allocation_needed = 0
+        if percent:
+            value = float(percent.group(1))
+            allocation_needed = int(value) if value.is_integer() else value
+        return {
+            'intent': 'search_candidate',
+            'entities': {'designation': designation, 'skills': skills, 'allocation_needed': allocation_needed},
+        }, confidence
+
+    def _parse_lookup(self, text, name_index):
+        intents = set()
+        spans = []
+        for match in _FIELD_RE.finditer(text):
+            intents.add(LOOKUP_FIELDS[int(match.lastgroup[1:])][0])
+            spans.append(match.span())
+        # "what is X's email and phone" is two questions; let the LLM decide
+        if len(intents) != 1:
+            return None, 0.0
+        remainder = text
+        for start, end in reversed(spans):
+            remainder = remainder[:start] + ' ' + remainder[end:]
+        remainder = re.sub(r"(?:'s|’s|s')(?=\W|$)", ' ', remainder)
+        words = [word.strip('.-') for word in _WORD_RE.findall(remainder)]
+        name = ' '.join(word for word in words if word and word.lower() not in FILLER_WORDS)
+        if not name:
+            return None, 0.0
+        return {'intent': intents.pop(), 'entities': {'employee_name': name}}, self._name_confidence(name, name_index)
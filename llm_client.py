@@ -0,0 +1,196 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+import httpx
+
+from metrics import count, span
+
+DEFAULT_BASE_URL = 'https://generativelanguage.googleapis.com'
+DEFAULT_MODEL = 'gemini-2.5-flash'
+# Whole-call budget, including retries
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# Worth another attempt: rate limiting and server-side failures
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    pass
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+def _token_usage(payload):
+    # (prompt tokens, output tokens) from the response's usageMetadata, when present
+    usage = (payload.get('usageMetadata') if isinstance(payload, dict) else None) or {}
+    return usage.get('promptTokenCount', 0), usage.get('candidatesTokenCount', 0)
+
+
+def _response_text(payload):
+    try:
+        parts = payload['candidates'][0]['content']['parts']
+    except (KeyError, IndexError, TypeError):
+        raise LLMError(f"Unexpected response from the model: {json.dumps(payload)[:200]}")
+    return ''.join(part.get('text', '') for part in parts)
+
+
+class GeminiClient:
+    """Process-wide client for the Gemini generateContent REST API.
+
+    One pooled HTTP connection set lives on a background event loop, so
+    Streamlit reruns and sessions share it instead of setting up a client per
+    query. ``generate`` is the async API; ``generate_sync`` runs it on the
+    client's loop and waits at most ``timeout`` seconds. At most
+    ``max_concurrency`` requests are in flight, and rate-limit/server errors
+    are retried with jittered exponential backoff within the deadline.
+    ``base_url`` can point at a local stub server, and ``transport`` replaces
+    the network altogether (e.g. an ``httpx.MockTransport`` in tests).
+    """
+
+    def __init__(self, api_key, model=DEFAULT_MODEL, base_url=DEFAULT_BASE_URL, timeout=DEFAULT_TIMEOUT,
+                 max_concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES, transport=None):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.transport = transport
+        self.calls = 0
+        self.retried = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='gemini-client', daemon=True)
+        self._thread.start()
+        self._http, self._semaphore = self._run(self._setup())
+
+    async def _setup(self):
+        # Created on the client's own loop, which they are bound to
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        return httpx.AsyncClient(base_url=self.base_url, limits=limits, transport=self.transport), asyncio.Semaphore(self.max_concurrency)
+
+    def _run(self, coroutine, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise LLMTimeout(f"The model did not answer within {timeout:g}s")
+
+    async def generate(self, prompt, timeout=None, model=None):
+        """Text of the model's reply to `prompt`, giving up after `timeout` seconds."""
+        if asyncio.get_running_loop() is not self._loop:
+            # Called from another event loop: hop over to the one that owns the pool
+            return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.generate(prompt, timeout, model), self._loop))
+        deadline = time.monotonic() + (timeout or self.timeout)
+        url = f"/v1beta/models/{model or self.model}:generateContent"
+        body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+        async with self._semaphore:
+            with span('llm_client.generate', model=model or self.model):
+                return await self._post(url, body, deadline, timeout, model or self.model)
+
+    async def _post(self, url, body, deadline, timeout, model):
+        attempt = 0
+        self.calls += 1
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.failures += 1
+                raise LLMTimeout(f"The model did not answer within {timeout or self.timeout:g}s")
+            try:
+                response = await self._http.post(url, params={'key': self.api_key}, json=body, timeout=remaining)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 400:
+                        self.failures += 1
+                        raise LLMError(f"Model request failed with HTTP {response.status_code}: {response.text[:200]}")
+                    payload = response.json()
+                    self._count_tokens(payload, model)
+                    return _response_text(payload)
+                error = LLMError(f"Model request failed with HTTP {response.status_code}")
+            except httpx.TimeoutException:
+                error = LLMTimeout(f"The model did not answer within {timeout or self.timeout:g}s")
+            except httpx.TransportError as e:
+                error = LLMError(f"Could not reach the model: {e}")
+            attempt += 1
+            if attempt > self.retries:
+                self.failures += 1
+                raise error
+            # Full jitter keeps concurrent retries from arriving together
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                self.failures += 1
+                raise error
+            self.retried += 1
+            await asyncio.sleep(delay)
+
+    def _count_tokens(self, payload, model):
+        prompt_tokens, output_tokens = _token_usage(payload)
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+        count('llm_tokens', prompt_tokens, kind='prompt', model=model)
+        count('llm_tokens', output_tokens, kind='output', model=model)
+
+    def generate_sync(self, prompt, timeout=None, model=None):
+        timeout = timeout or self.timeout
+        # A little slack so the call's own deadline fires first
+        return self._run(self.generate(prompt, timeout, model), timeout + 1)
+
+    def generate_many(self, prompts, timeout=None, model=None):
+        """Replies (or the exception raised) for each prompt, run concurrently up to max_concurrency."""
+        async def gather():
+            return await asyncio.gather(*(self.generate(prompt, timeout, model) for prompt in prompts), return_exceptions=True)
+        return self._run(gather())
+
+    def stats(self):
+        return {'calls': self.calls, 'retried': self.retried, 'failures': self.failures,
+                'prompt_tokens': self.prompt_tokens, 'output_tokens': self.output_tokens}
+
+    def close(self):
+        if self._loop.is_running():
+            self._run(self._http.aclose())
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+
+if __name__ == "__main__":
+    # Local stand-in for the Gemini API, for trying the app without a key:
+    #   python llm_client.py stub-server 8765
+    # then set GEMINI_BASE_URL=http://127.0.0.1:8765. Every prompt gets
+    # STUB_RESPONSE (default: an "other" intent) after STUB_DELAY seconds.
+    import os
+    import sys
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'stub-server':
+        print("Usage: python llm_client.py stub-server [port]")
+        sys.exit(1)
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    reply = os.getenv('STUB_RESPONSE', '{"intent": "other", "entities": {}}')
+    delay = float(os.getenv('STUB_DELAY', '0'))
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(delay)
+            # Rough token counts (about four characters each) so usage shows up in the metrics
+            usage = {'promptTokenCount': len(request) // 4, 'candidatesTokenCount': len(reply) // 4}
+            payload = json.dumps({'candidates': [{'content': {'role': 'model', 'parts': [{'text': reply}]}}], 'usageMetadata': usage}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    print(f"Stub model listening on http://127.0.0.1:{port}")
+    ThreadingHTTPServer(('127.0.0.1', port), StubHandler).serve_forever()
@@ -0,0 +1,227 @@
+import atexit
+import contextvars
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+LOG_FILE = 'metrics_spans.jsonl'
+PROMETHEUS_FILE = 'metrics.prom'
+# Recent durations kept per span for the percentiles
+SAMPLES = 1024
+# Seconds between rewrites of the Prometheus file
+EXPORT_INTERVAL = 10.0
+# The span log is rotated to <path>.1 once it grows past this
+LOG_MAX_BYTES = 20 * 1024 * 1024
+PROMETHEUS_PREFIX = 'talent_iq'
+
+_parent = contextvars.ContextVar('metrics_parent', default=None)
+
+
+def percentile(sorted_values, q):
+    # Nearest rank; sorted_values must not be empty
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels):
+    return ','.join(f'{key}="{_label_value(value)}"' for key, value in labels)
+
+
+class Metrics:
+    """Process-wide timing spans and counters.
+
+    ``span`` / ``timed`` time a block or function; each finished span keeps
+    its duration for the percentiles and, once a log path is configured, is
+    appended to a JSON lines file. ``count`` adds to a labelled counter (LLM
+    tokens, for example). With a Prometheus path configured, a text-format
+    snapshot of both is rewritten at most every ``export_interval`` seconds.
+    """
+
+    def __init__(self, log_path=None, prometheus_path=None, samples=SAMPLES, export_interval=EXPORT_INTERVAL):
+        self.samples = samples
+        self.export_interval = export_interval
+        self._lock = threading.Lock()
+        # span name -> recent durations (seconds); name -> [count, total seconds, errors, last seconds]
+        self._durations = {}
+        self._totals = {}
+        # (counter name, sorted label items) -> value
+        self._counters = {}
+        self._log = None
+        self._last_export = 0.0
+        self.log_path = None
+        self.prometheus_path = None
+        self.configure(log_path, prometheus_path)
+
+    def configure(self, log_path=None, prometheus_path=None):
+        """Set (or with None/'' turn off) the span log and Prometheus file."""
+        log_path = log_path or None
+        with self._lock:
+            self.prometheus_path = prometheus_path or None
+            # Reconfiguring with the same log keeps its handle open rather than leaking a new one
+            if log_path == self.log_path:
+                return
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            self.log_path = log_path
+            if log_path:
+                self._log = open(log_path, 'a')
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the block as `name`; the yielded dict can take more attributes for the log."""
+        parent = _parent.get()
+        token = _parent.set(name)
+        start = time.perf_counter()
+        error = False
+        try:
+            yield attrs
+        except Exception:
+            # Not BaseException: Streamlit's st.rerun/st.stop unwind with those
+            error = True
+            raise
+        finally:
+            _parent.reset(token)
+            self.record(name, time.perf_counter() - start, error=error, parent=parent, **attrs)
+
+    def timed(self, name=None):
+        """Decorator form of span, named <module>.<function> by default."""
+        def decorate(func):
+            span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name, seconds, error=False, **attrs):
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = deque(maxlen=self.samples)
+                self._totals[name] = [0, 0.0, 0, 0.0]
+            durations.append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += error
+            totals[3] = seconds
+            if self._log is not None:
+                entry = {'ts': round(time.time(), 6), 'span': name, 'ms': round(seconds * 1000, 3)}
+                if error:
+                    entry['error'] = True
+                entry.update((key, value) for key, value in attrs.items() if value is not None)
+                self._log.write(json.dumps(entry, default=str) + '\n')
+                if self._log.tell() > LOG_MAX_BYTES:
+                    self._rotate_log()
+        self._maybe_export()
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def _rotate_log(self):
+        self._log.close()
+        os.replace(self.log_path, self.log_path + '.1')
+        self._log = open(self.log_path, 'a')
+
+    def summary(self):
+        """Per-span count, p50/p95/max over recent samples and the latest duration, in ms."""
+        with self._lock:
+            items = [(name, sorted(durations), list(self._totals[name])) for name, durations in self._durations.items()]
+        rows = []
+        for name, durations, (count, total, errors, last) in sorted(items):
+            rows.append({
+                'span': name,
+                'count': count,
+                'errors': errors,
+                'p50_ms': percentile(durations, 0.5) * 1000,
+                'p95_ms': percentile(durations, 0.95) * 1000,
+                'max_ms': durations[-1] * 1000,
+                'last_ms': last * 1000,
+                'total_s': total,
+            })
+        return rows
+
+    def counters(self, name=None):
+        """{(counter name, labels dict items): value}, optionally for one counter name."""
+        with self._lock:
+            return {key: value for key, value in self._counters.items() if name is None or key[0] == name}
+
+    def prometheus_text(self):
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_span_seconds Duration of instrumented spans (quantiles over the last {self.samples} samples).",
+            f"# TYPE {PROMETHEUS_PREFIX}_span_seconds summary",
+        ]
+        rows = self.summary()
+        for row in rows:
+            label = _label_text([('span', row['span'])])
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds{{{label},quantile="0.5"}} {row["p50_ms"] / 1000:.6f}')
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds{{{label},quantile="0.95"}} {row["p95_ms"] / 1000:.6f}')
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds_sum{{{label}}} {row["total_s"]:.6f}')
+            lines.append(f'{PROMETHEUS_PREFIX}_span_seconds_count{{{label}}} {row["count"]}')
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_span_errors_total counter")
+        for row in rows:
+            lines.append(f'{PROMETHEUS_PREFIX}_span_errors_total{{{_label_text([("span", row["span"])])}}} {row["errors"]}')
+        by_name = {}
+        for (name, labels), value in sorted(self.counters().items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            by_name.setdefault(name, []).append((labels, value))
+        for name, series in by_name.items():
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name}_total counter")
+            for labels, value in series:
+                label = f"{{{_label_text(labels)}}}" if labels else ''
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}_total{label} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        path = path or self.prometheus_path
+        if not path:
+            return
+        # Written to a temporary file and renamed, so scrapers never see half a file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+    def _maybe_export(self):
+        now = time.monotonic()
+        if now - self._last_export < self.export_interval:
+            return
+        self._last_export = now
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+        try:
+            self.write_prometheus()
+        except OSError:
+            pass
+
+    def reset(self):
+        with self._lock:
+            self._durations.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+
+# Shared by every module; the app points it at its log and metrics files
+METRICS = Metrics()
+span = METRICS.span
+timed = METRICS.timed
+count = METRICS.count
+
+atexit.register(METRICS.flush)
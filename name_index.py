@@ -0,0 +1,174 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import namedtuple
+
+NameMatch = namedtuple('NameMatch', ['employee_id', 'name', 'score'])
+
+# Matches scoring below this are not returned at all
+MIN_SCORE = 0.35
+# Top two matches closer than this are reported as ambiguous
+AMBIGUITY_MARGIN = 0.08
+# Trigram postings used to find candidates when no name token matches
+CANDIDATE_TRIGRAMS = 4
+# A misspelled token counts as a match for a name token when their trigram
+# similarity reaches this, with credit scaled by FUZZY_WEIGHT
+FUZZY_MIN_SIMILARITY = 0.4
+FUZZY_WEIGHT = 0.7
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def name_tokens(text):
+    return tuple(_TOKEN_RE.findall(text.lower()))
+
+
+def _dice(grams, other):
+    return 2 * len(grams & other) / (len(grams) + len(other)) if grams and other else 0.0
+
+
+def trigrams(tokens):
+    grams = set()
+    for token in tokens:
+        padded = f' {token} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class NameIndex:
+    """Inverted index over employee names for ranked fuzzy lookups.
+
+    Names are indexed once per distinct spelling. Exact and prefix token
+    matches pick the candidates (falling back to the rarest character trigrams
+    for misspellings), and only those candidates are scored, so a lookup
+    touches a handful of names rather than every employee.
+    """
+
+    def __init__(self, employees=()):
+        self._ids = []
+        self._names = []
+        self._by_id = {}
+        # Distinct normalized names: tokens, trigrams and the employees using them
+        self._entry_of = {}
+        self._entry_tokens = []
+        self._entry_grams = []
+        self._entry_docs = []
+        self._token_postings = {}
+        self._gram_postings = {}
+        self._sorted_tokens = None
+        for emp in employees:
+            self.add(emp)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, employee):
+        doc = len(self._ids)
+        employee_id = employee.get('employee_id')
+        self._ids.append(employee_id)
+        self._names.append(employee.get('name') or '')
+        self._by_id.setdefault((employee_id or '').lower(), doc)
+        tokens = name_tokens(employee.get('name') or '')
+        entry = self._entry_of.get(tokens)
+        if entry is None:
+            entry = self._entry_of[tokens] = len(self._entry_tokens)
+            grams = trigrams(tokens)
+            self._entry_tokens.append(tokens)
+            self._entry_grams.append(grams)
+            self._entry_docs.append([])
+            for token in set(tokens):
+                if token not in self._token_postings:
+                    self._sorted_tokens = None
+                self._token_postings.setdefault(token, []).append(entry)
+            for gram in grams:
+                self._gram_postings.setdefault(gram, []).append(entry)
+        self._entry_docs[entry].append(doc)
+
+    def _prefix_tokens(self, prefix):
+        sorted_tokens = self._sorted_tokens
+        if sorted_tokens is None:
+            sorted_tokens = self._sorted_tokens = sorted(self._token_postings)
+        i = bisect_left(sorted_tokens, prefix)
+        while i < len(sorted_tokens) and sorted_tokens[i].startswith(prefix):
+            yield sorted_tokens[i]
+            i += 1
+
+    def _candidates(self, tokens, grams):
+        exact = [self._token_postings.get(token) for token in tokens]
+        # Names containing every query token outrank anything else
+        if len(tokens) > 1 and all(exact):
+            common = set(exact[0]).intersection(*exact[1:])
+            if common:
+                return common
+        entries = set()
+        for token, postings in zip(tokens, exact):
+            if postings:
+                entries.update(postings)
+            elif len(token) >= 2:
+                for match in self._prefix_tokens(token):
+                    entries.update(self._token_postings[match])
+        if not entries:
+            rarest = sorted((self._gram_postings[g] for g in grams if g in self._gram_postings), key=len)
+            for postings in rarest[:CANDIDATE_TRIGRAMS]:
+                entries.update(postings)
+        return entries
+
+    def _score(self, entry, tokens, grams):
+        entry_tokens = self._entry_tokens[entry]
+        if tokens == entry_tokens:
+            return 1.0
+        # How well each query token is covered by a name token (exact or prefix)
+        matched = 0.0
+        covered = set()
+        for token in tokens:
+            best, hit = 0.0, None
+            for position, entry_token in enumerate(entry_tokens):
+                if token == entry_token:
+                    best, hit = 1.0, position
+                    break
+                if entry_token.startswith(token) and len(token) / len(entry_token) * 0.8 > best:
+                    best, hit = len(token) / len(entry_token) * 0.8, position
+            if hit is None:
+                # Misspelled ("Vikrm"): partial credit for the closest name token
+                token_grams = trigrams((token,))
+                for position, entry_token in enumerate(entry_tokens):
+                    similarity = _dice(token_grams, trigrams((entry_token,)))
+                    if similarity >= FUZZY_MIN_SIMILARITY and similarity * FUZZY_WEIGHT > best:
+                        best, hit = similarity * FUZZY_WEIGHT, position
+            if hit is not None:
+                matched += best
+                covered.add(hit)
+        token_score = matched / len(tokens)
+        coverage = len(covered) / len(entry_tokens) if entry_tokens else 0.0
+        entry_grams = self._entry_grams[entry]
+        dice = _dice(grams, entry_grams)
+        # Same words in another order ("Neeraj Pokala") rank just below an exact match
+        return round(min(0.5 * token_score + 0.3 * dice + 0.2 * coverage, 0.99), 4)
+
+    def search(self, query, k=5):
+        """Top-k NameMatch(employee_id, name, score) for a name or employee ID, best first."""
+        query = (query or '').strip()
+        doc = self._by_id.get(query.lower())
+        if doc is not None:
+            return [NameMatch(self._ids[doc], self._names[doc], 1.0)]
+        tokens = name_tokens(query)
+        if not tokens:
+            return []
+        grams = trigrams(tokens)
+        scored = ((self._score(entry, tokens, grams), entry) for entry in self._candidates(tokens, grams))
+        best = heapq.nlargest(k, (item for item in scored if item[0] >= MIN_SCORE), key=lambda item: (item[0], -item[1]))
+        matches = []
+        for score, entry in best:
+            for doc in self._entry_docs[entry]:
+                matches.append(NameMatch(self._ids[doc], self._names[doc], score))
+                if len(matches) == k:
+                    return matches
+        return matches
+
+    def resolve(self, query, k=5):
+        """(best match or None, top-k matches, ambiguous) for a name typed by a user or the LLM."""
+        matches = self.search(query, k)
+        if not matches:
+            return None, matches, False
+        ambiguous = len(matches) > 1 and matches[0].score - matches[1].score < AMBIGUITY_MARGIN
+        return matches[0], matches, ambiguous
@@ -0,0 +1,382 @@
+"""Answer data questions with one model call and a local query engine.
+
+The model turns a question into a JSON query plan: one table, filters,
+optional grouping with aggregates, sorting and a row limit. The plan is
+checked against the snapshot schema (see snapshot.py) and run here with
+pandas, so no model-written code is executed and the same plan over the
+same data always gives the same rows. Plans are cached per question and
+results per plan and data.
+"""
+import json
+import operator
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from core import DEPARTMENTS, GEMINI_MODEL, LOCATIONS, ROLE_SKILLS, parse_date, parse_llm_json
+from metrics import span
+from response_cache import cache_key
+from snapshot import ALLOCATION_COLUMNS, EMPLOYEE_COLUMNS, JOINED_COLUMNS
+
+# table -> column -> kind ('str', 'category', 'date' or 'float'), as stored in the snapshot
+SCHEMAS = {
+    'allocations': {
+        'employee_id': 'str',
+        **{column: ('str' if column == 'skills' else EMPLOYEE_COLUMNS[column]) for column in JOINED_COLUMNS},
+        **{column: kind for column, kind in ALLOCATION_COLUMNS.items() if column != 'employee_id'},
+    },
+    'employees': dict(EMPLOYEE_COLUMNS),
+    'employee_skills': {'employee_id': 'str', 'designation': 'category', 'department': 'category', 'location': 'category', 'skill': 'category'},
+}
+OPERATORS = ('==', '!=', '<', '<=', '>', '>=', 'in', 'not_in', 'contains', 'between', 'is_null', 'not_null')
+# Operators each kind of column accepts
+KIND_OPERATORS = {
+    'str': ('==', '!=', 'in', 'not_in', 'contains', 'is_null', 'not_null'),
+    'category': ('==', '!=', 'in', 'not_in', 'contains', 'is_null', 'not_null'),
+    'date': ('==', '!=', '<', '<=', '>', '>=', 'between', 'is_null', 'not_null'),
+    'float': ('==', '!=', '<', '<=', '>', '>=', 'in', 'not_in', 'between', 'is_null', 'not_null'),
+}
+COMPARISONS = {'==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+AGGREGATES = ('count', 'nunique', 'sum', 'mean', 'min', 'max')
+PLAN_KEYS = ('table', 'filters', 'group_by', 'aggregates', 'columns', 'sort', 'limit')
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+# Query results kept per planner, keyed by plan and data
+RESULT_CACHE_ENTRIES = 128
+
+
+def _schema_text():
+    lines = []
+    for table, columns in SCHEMAS.items():
+        lines.append(f"- {table}: " + ', '.join(f"{column} ({kind})" for column, kind in columns.items()))
+    return '\n'.join(lines)
+
+
+PLAN_PROMPT = """You translate questions about an employee allocation database into a JSON query plan. Respond with the JSON object only.
+
+**Tables** (column (kind)):
+""" + _schema_text().replace('{', '{{').replace('}', '}}') + """
+
+- allocations: one row per project allocation, joined with the employee's details. `allocation` is the percentage (1-100) of the employee's time; an allocation is active on a day when start_date <= day <= end_date.
+- employees: one row per employee.
+- employee_skills: one row per (employee, skill).
+- Designations: """ + ', '.join(ROLE_SKILLS) + """. Departments: """ + ', '.join(DEPARTMENTS) + """. Locations: """ + ', '.join(LOCATIONS) + """.
+- `skills` in allocations is a comma-separated list; use "contains" on it, or the employee_skills table.
+
+**Plan format:**
+{{
+  "table": "allocations" | "employees" | "employee_skills",
+  "filters": [{{"column": "<column>", "op": "<op>", "value": <value>}}],
+  "group_by": ["<column>", ...],
+  "aggregates": [{{"func": "count" | "nunique" | "sum" | "mean" | "min" | "max", "column": "<column>", "as": "<output name>"}}],
+  "columns": ["<column>", ...],
+  "sort": [{{"column": "<column or aggregate name>", "descending": true | false}}],
+  "limit": <1-1000>
+}}
+
+- ops: ==, !=, <, <=, >, >=, in, not_in (value is a list), between (value is [low, high], inclusive), contains (case-insensitive text match), is_null, not_null (no value).
+- Dates are "YYYY-MM-DD" or "today".
+- "count" may omit "column" to count rows. Without aggregates, "columns" picks the columns to show.
+- Only "table" is required; leave out anything the question does not need.
+
+**Examples:**
+Question: "What is the total allocation for the Wellora project?"
+{{"table": "allocations", "filters": [{{"column": "project_name", "op": "contains", "value": "wellora"}}], "group_by": ["project_name"], "aggregates": [{{"func": "sum", "column": "allocation", "as": "total_allocation"}}]}}
+
+Question: "How many DevOps engineers are there in each location?"
+{{"table": "employees", "filters": [{{"column": "designation", "op": "==", "value": "DevOps Engineer"}}], "group_by": ["location"], "aggregates": [{{"func": "count", "as": "employees"}}], "sort": [{{"column": "employees", "descending": true}}]}}
+
+Question: "Who is working on a project right now?"
+{{"table": "allocations", "filters": [{{"column": "start_date", "op": "<=", "value": "today"}}, {{"column": "end_date", "op": ">=", "value": "today"}}], "columns": ["name", "employee_id", "project_name", "allocation", "end_date"], "sort": [{{"column": "name", "descending": false}}]}}
+
+Question: "{query}"
+"""
+
+
+class PlanError(ValueError):
+    """A query plan that does not fit the schema or the plan format."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
+
+
+def _date_value(value):
+    if value == 'today':
+        return date.today()
+    return parse_date(value)
+
+
+def _scalar(kind, value, errors, where):
+    # The value converted for comparison with a column of `kind`, or None (with an error added)
+    if kind == 'date':
+        day = _date_value(value) if isinstance(value, str) else None
+        if day is None:
+            errors.append(f"{where}: '{value}' is not a YYYY-MM-DD date")
+        return day
+    if kind == 'float':
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            errors.append(f"{where}: '{value}' is not a number")
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            errors.append(f"{where}: '{value}' is not a number")
+            return None
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+        errors.append(f"{where}: '{value}' is not a text value")
+        return None
+    return str(value)
+
+
+def _check_filter(schema, position, item, errors):
+    where = f"filter {position + 1}"
+    if not isinstance(item, dict) or set(item) - {'column', 'op', 'value'}:
+        errors.append(f"{where} must be an object with column, op and value")
+        return None
+    column, op = item.get('column'), item.get('op')
+    if column not in schema:
+        errors.append(f"{where}: unknown column '{column}'")
+        return None
+    kind = schema[column]
+    if op not in OPERATORS:
+        errors.append(f"{where}: unknown operator '{op}'")
+        return None
+    if op not in KIND_OPERATORS[kind]:
+        errors.append(f"{where}: '{op}' cannot be used on {column}")
+        return None
+    value = item.get('value')
+    if op in ('is_null', 'not_null'):
+        return {'column': column, 'op': op}
+    if op in ('in', 'not_in'):
+        if not isinstance(value, list) or not value:
+            errors.append(f"{where}: '{op}' needs a non-empty list")
+            return None
+        value = [_scalar(kind, element, errors, where) for element in value]
+    elif op == 'between':
+        if not isinstance(value, list) or len(value) != 2:
+            errors.append(f"{where}: 'between' needs [low, high]")
+            return None
+        value = [_scalar(kind, element, errors, where) for element in value]
+    elif op == 'contains':
+        if not isinstance(value, str) or not value:
+            errors.append(f"{where}: 'contains' needs some text")
+            return None
+    else:
+        value = _scalar(kind, value, errors, where)
+    return {'column': column, 'op': op, 'value': value}
+
+
+def validate_plan(plan):
+    """Check a plan from the model and fill in its defaults.
+
+    Returns the normalized plan; raises PlanError listing everything wrong.
+    Filter values come back converted (dates as date objects, numbers as
+    floats), so the result is for execute_plan rather than for display.
+    """
+    if not isinstance(plan, dict):
+        raise PlanError(["The plan must be a JSON object"])
+    errors = [f"unknown key '{key}'" for key in plan if key not in PLAN_KEYS]
+    table = plan.get('table')
+    if table not in SCHEMAS:
+        raise PlanError(errors + [f"table must be one of: {', '.join(SCHEMAS)}"])
+    schema = SCHEMAS[table]
+
+    filters = plan.get('filters') or []
+    if not isinstance(filters, list):
+        errors.append("filters must be a list")
+        filters = []
+    filters = [checked for position, item in enumerate(filters) if (checked := _check_filter(schema, position, item, errors))]
+
+    group_by = plan.get('group_by') or []
+    if not isinstance(group_by, list) or not all(isinstance(column, str) for column in group_by):
+        errors.append("group_by must be a list of column names")
+        group_by = []
+    errors.extend(f"group_by: unknown column '{column}'" for column in group_by if column not in schema)
+
+    aggregates = []
+    raw_aggregates = plan.get('aggregates') or []
+    if not isinstance(raw_aggregates, list):
+        errors.append("aggregates must be a list")
+        raw_aggregates = []
+    for position, item in enumerate(raw_aggregates):
+        where = f"aggregate {position + 1}"
+        if not isinstance(item, dict) or set(item) - {'func', 'column', 'as'}:
+            errors.append(f"{where} must be an object with func, column and as")
+            continue
+        func, column = item.get('func'), item.get('column')
+        if func not in AGGREGATES:
+            errors.append(f"{where}: unknown function '{func}'")
+            continue
+        if column is None and func != 'count':
+            errors.append(f"{where}: '{func}' needs a column")
+            continue
+        if column is not None and column not in schema:
+            errors.append(f"{where}: unknown column '{column}'")
+            continue
+        if func in ('sum', 'mean') and schema[column] != 'float' or func in ('min', 'max') and schema[column] not in ('float', 'date'):
+            errors.append(f"{where}: '{func}' cannot be used on {column}")
+            continue
+        name = item.get('as') or (f"{func}_{column}" if column else 'count')
+        if not isinstance(name, str) or not name.strip():
+            errors.append(f"{where}: 'as' must be a name")
+            continue
+        aggregates.append({'func': func, 'column': column, 'as': name.strip()})
+    if group_by and not aggregates:
+        aggregates = [{'func': 'count', 'column': None, 'as': 'count'}]
+    names = [aggregate['as'] for aggregate in aggregates]
+    if len(set(names)) != len(names) or set(names) & set(group_by):
+        errors.append("aggregate names must be unique and differ from the group_by columns")
+
+    columns = plan.get('columns') or []
+    if not isinstance(columns, list) or not all(isinstance(column, str) for column in columns):
+        errors.append("columns must be a list of column names")
+        columns = []
+    errors.extend(f"columns: unknown column '{column}'" for column in columns if column not in schema)
+    if aggregates:
+        output = group_by + names
+    else:
+        columns = list(dict.fromkeys(columns)) or list(schema)
+        output = columns
+
+    sort = plan.get('sort') or []
+    if isinstance(sort, dict):
+        sort = [sort]
+    if not isinstance(sort, list):
+        errors.append("sort must be a list")
+        sort = []
+    checked_sort = []
+    for item in sort:
+        if not isinstance(item, dict) or item.get('column') not in output:
+            errors.append(f"sort: '{item.get('column') if isinstance(item, dict) else item}' is not an output column")
+            continue
+        checked_sort.append({'column': item['column'], 'descending': bool(item.get('descending', False))})
+
+    limit = plan.get('limit', DEFAULT_LIMIT)
+    if isinstance(limit, bool) or not isinstance(limit, int) or not 1 <= limit <= MAX_LIMIT:
+        errors.append(f"limit must be a whole number from 1 to {MAX_LIMIT}")
+        limit = DEFAULT_LIMIT
+
+    if errors:
+        raise PlanError(errors)
+    return {
+        'table': table, 'filters': filters, 'group_by': group_by, 'aggregates': aggregates,
+        'columns': [] if aggregates else columns, 'sort': checked_sort, 'limit': limit,
+    }
+
+
+def _condition(values, kind, op, value):
+    if op == 'is_null':
+        return values.isna().to_numpy()
+    if op == 'not_null':
+        return values.notna().to_numpy()
+    if op == 'contains':
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Match the few distinct values, then select rows by category
+            categories = values.cat.categories
+            return values.isin(categories[categories.astype('str').str.contains(value, case=False, regex=False)]).to_numpy()
+        return values.astype('str').str.contains(value, case=False, regex=False, na=False).to_numpy()
+    if kind == 'date':
+        value = [pd.Timestamp(day) for day in value] if isinstance(value, list) else pd.Timestamp(value)
+    if op in ('in', 'not_in'):
+        found = values.isin(value).to_numpy()
+        return found if op == 'in' else ~found
+    if op == 'between':
+        return ((values >= value[0]) & (values <= value[1])).fillna(False).to_numpy(dtype=bool)
+    return COMPARISONS[op](values, value).fillna(False).to_numpy(dtype=bool)
+
+
+def execute_plan(plan, frames):
+    """Run a validated plan; `frames` maps table name -> DataFrame (e.g. Snapshot.frame).
+
+    Returns the result DataFrame (dates as YYYY-MM-DD text).
+    """
+    frame = frames(plan['table']) if callable(frames) else frames[plan['table']]
+    schema = SCHEMAS[plan['table']]
+    mask = np.ones(len(frame), dtype=bool)
+    for item in plan['filters']:
+        mask &= _condition(frame[item['column']], schema[item['column']], item['op'], item.get('value'))
+    rows = frame[mask]
+
+    if plan['aggregates']:
+        named = {
+            aggregate['as']: (aggregate['column'] or 'employee_id', 'size' if aggregate['column'] is None else aggregate['func'])
+            for aggregate in plan['aggregates']
+        }
+        if plan['group_by']:
+            result = rows.groupby(plan['group_by'], observed=True, sort=True).agg(**named).reset_index()
+        else:
+            result = pd.DataFrame({name: [len(rows) if func == 'size' else getattr(rows[column], func)()] for name, (column, func) in named.items()})
+    else:
+        result = rows[plan['columns']]
+
+    if plan['sort']:
+        result = result.sort_values(
+            [item['column'] for item in plan['sort']], ascending=[not item['descending'] for item in plan['sort']], kind='stable')
+    result = result.head(plan['limit']).reset_index(drop=True)
+    for column in result.columns:
+        if pd.api.types.is_datetime64_any_dtype(result[column]):
+            result[column] = result[column].dt.strftime('%Y-%m-%d')
+        elif isinstance(result[column].dtype, pd.CategoricalDtype):
+            result[column] = result[column].astype('str')
+    return result
+
+
+def plan_json(plan):
+    # Canonical text of a validated plan: the result cache key and what is shown to users
+    return json.dumps(plan, sort_keys=True, default=str)
+
+
+class QueryPlanner:
+    """Question -> validated plan (one model call, cached) -> result (cached per data key)."""
+
+    def __init__(self, cache, client, model=GEMINI_MODEL, prompt=PLAN_PROMPT, result_entries=RESULT_CACHE_ENTRIES):
+        self.cache = cache
+        self.client = client
+        self.model = model
+        self.prompt = prompt
+        self.result_entries = result_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, query):
+        return cache_key(query, self.model + self.prompt)
+
+    def plan(self, query):
+        """(validated plan, None, from cache) or (None, error, False).
+
+        Only plans that pass validation are cached.
+        """
+        cached = self.cache.get(self.key(query))
+        if cached is not None:
+            try:
+                return validate_plan(cached), None, True
+            except PlanError:
+                pass
+        try:
+            with span('query_plan.plan'):
+                raw = parse_llm_json(self.client.generate_sync(self.prompt.format(query=query)))
+            plan = validate_plan(raw)
+        except Exception as e:
+            return None, e, False
+        self.cache.put(self.key(query), raw)
+        return plan, None, False
+
+    def run(self, plan, snapshot):
+        """Result DataFrame of a validated plan over a Snapshot; shared between callers, so treat it as read-only."""
+        key = (snapshot.key, plan_json(plan))
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                return result
+        with span('query_plan.execute', table=plan['table']):
+            result = execute_plan(plan, snapshot.frame)
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.result_entries:
+                self._results.popitem(last=False)
+        return result
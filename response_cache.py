@@ -0,0 +1,143 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_FILE = 'intent_cache.db'
+# One week; intents do not change unless the prompt template does
+DEFAULT_TTL = 7 * 24 * 3600
+MEMORY_ENTRIES = 512
+DISK_ENTRIES = 20000
+
+_SPACE_RE = re.compile(r'\s+')
+
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+"""
+
+
+def normalize_query(query):
+    # Case, surrounding quotes, repeated whitespace and trailing punctuation
+    # do not change what a question means
+    text = _SPACE_RE.sub(' ', (query or '').strip().lower())
+    return text.strip('"\'').rstrip('?.! ')
+
+
+def template_hash(template):
+    return hashlib.sha256(template.encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(query, template):
+    return f"{template_hash(template)}:{normalize_query(query)}"
+
+
+class ResponseCache:
+    """Two-tier LRU cache for parsed LLM responses.
+
+    A small in-memory LRU sits in front of a SQLite table that survives
+    restarts. Entries expire after ``ttl`` seconds; each tier evicts its least
+    recently used entries once it holds more than its size limit. Values are
+    anything json can serialize.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=DEFAULT_TTL, memory_entries=MEMORY_ENTRIES, disk_entries=DISK_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self._lock = threading.Lock()
+        # key -> (created_at, value), most recently used last
+        self._memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(CACHE_SCHEMA)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+            if self._conn is not None:
+                row = self._conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    if now - row[1] <= self.ttl:
+                        self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        value = json.loads(row[0])
+                        self._remember(key, row[1], value)
+                        self.disk_hits += 1
+                        return value
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._evict_disk(now)
+
+    def _remember(self, key, created_at, value):
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.disk_entries:
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                (count - self.disk_entries,),
+            )
+            self.evictions += count - self.disk_entries
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
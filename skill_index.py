@@ -0,0 +1,135 @@
+from collections import namedtuple
+
+import numpy as np
+
+CandidateMatch = namedtuple('CandidateMatch', ['employee', 'score', 'available'])
+
+
+def _bit_positions(bits):
+    # Set bit positions of a Python int bitmap, lowest first
+    if not bits:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder='little'))
+
+
+def _bitmap(docs, size):
+    bits = np.zeros(size, dtype=np.uint8)
+    bits[docs] = 1
+    return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+
+class SkillIndex:
+    """Inverted index from designation and skill to a bitmap of employees.
+
+    Each employee record gets a document number (its bit). A candidate search
+    ANDs the designation bitmap with one bitmap per requested skill and counts
+    matches per employee with a bit-sliced adder, so the work is a few big-int
+    operations per skill instead of a set intersection per employee.
+    """
+
+    def __init__(self, employees=(), role_skills=None):
+        self._employees = []
+        self._designations = {}
+        self._skills = {}
+        # Case-insensitive spelling -> canonical name, seeded from ROLE_SKILLS
+        self._skill_names = {}
+        self._designation_names = {}
+        for designation, skills in (role_skills or {}).items():
+            self._designation_names.setdefault(designation.lower(), designation)
+            for skill in skills:
+                self._skill_names.setdefault(skill.lower(), skill)
+        # Bulk build from doc lists; OR-ing bits in one by one copies each
+        # bitmap per employee
+        designation_docs = {}
+        skill_docs = {}
+        for doc, emp in enumerate(employees):
+            self._employees.append(emp)
+            designation_docs.setdefault(emp.get('designation'), []).append(doc)
+            for skill in set(emp.get('skills') or []):
+                skill_docs.setdefault(skill, []).append(doc)
+        size = len(self._employees)
+        for designation, docs in designation_docs.items():
+            self._designations[designation] = _bitmap(docs, size)
+            self._designation_names.setdefault(str(designation).lower(), designation)
+        for skill, docs in skill_docs.items():
+            self._skills[skill] = _bitmap(docs, size)
+            self._skill_names.setdefault(skill.lower(), skill)
+
+    def __len__(self):
+        return len(self._employees)
+
+    def add(self, employee):
+        doc = len(self._employees)
+        self._employees.append(employee)
+        bit = 1 << doc
+        designation = employee.get('designation')
+        self._designations[designation] = self._designations.get(designation, 0) | bit
+        self._designation_names.setdefault(str(designation).lower(), designation)
+        for skill in set(employee.get('skills') or []):
+            self._skills[skill] = self._skills.get(skill, 0) | bit
+            self._skill_names.setdefault(skill.lower(), skill)
+
+    def canonical_skill(self, skill):
+        return skill if skill in self._skills else self._skill_names.get(str(skill).lower(), skill)
+
+    def canonical_designation(self, designation):
+        if designation in self._designations:
+            return designation
+        return self._designation_names.get(str(designation).lower(), designation)
+
+    def designation_count(self, designation):
+        return self._designations.get(self.canonical_designation(designation), 0).bit_count()
+
+    def search(self, designation, skills=(), available=None, allocation_needed=0, k=50):
+        """Top-k candidates for a designation ranked by how many of `skills` they have.
+
+        `available` is an array of free % per document (see
+        ``DataStore.available_capacity``); documents past its end count as
+        fully free. With skills given, candidates need at least one of them.
+        Ties keep employee file order. Returns (CandidateMatch list, total
+        number of candidates that qualified).
+        """
+        base = self._designations.get(self.canonical_designation(designation), 0)
+        skills = list(dict.fromkeys(self.canonical_skill(skill) for skill in skills))
+
+        # Bit-sliced counter: planes[j] holds bit j of each employee's match count
+        planes = []
+        for skill in skills:
+            carry = self._skills.get(skill, 0) & base
+            for j, plane in enumerate(planes):
+                if not carry:
+                    break
+                planes[j], carry = plane ^ carry, plane & carry
+            if carry:
+                planes.append(carry)
+
+        if skills:
+            levels = range(len(skills), 0, -1)
+        else:
+            levels = [0]
+        matches = []
+        total = 0
+        for score in levels:
+            # Employees whose count is exactly `score`
+            mask = base
+            for j, plane in enumerate(planes):
+                mask &= plane if score >> j & 1 else ~plane
+            if score >> len(planes):
+                mask = 0
+            docs = _bit_positions(mask)
+            if docs.size == 0:
+                continue
+            if available is not None:
+                free = np.full(docs.size, 100.0)
+                known = docs < len(available)
+                free[known] = available[docs[known]]
+                fits = free >= allocation_needed
+                docs, free = docs[fits], free[fits]
+            else:
+                free = np.full(docs.size, 100.0)
+            total += docs.size
+            room = max(k - len(matches), 0)
+            for doc, value in zip(docs[:room].tolist(), free[:room].tolist()):
+                matches.append(CandidateMatch(self._employees[doc], score, value))
+        return matches, total
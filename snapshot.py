@@ -0,0 +1,168 @@
+"""Columnar snapshot of the employee and allocation data, for analytics and the agent.
+
+Three Arrow IPC files are written to the snapshot directory:
+
+* employees.arrow: one row per employee
+* employee_skills.arrow: one row per (employee, skill)
+* allocations.arrow: allocations joined with their employee's details
+
+Designation, department, location, project and skill columns are
+dictionary-encoded and dates are date32. The files are uncompressed, so
+opening them memory-maps the data instead of reading it: every session and
+process shares the same pages, and only the columns used are paged in.
+Each file records the key of the data it was built from (see
+``DataStore.snapshot``); a snapshot whose files disagree is rebuilt.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from bulk_import import parse_dates
+
+SNAPSHOT_DIR = '.talent_iq_snapshot'
+TABLES = ('employees', 'employee_skills', 'allocations')
+KEY_METADATA = b'talent_iq_key'
+
+# Column -> type; 'category' columns are dictionary-encoded
+EMPLOYEE_COLUMNS = {
+    'employee_id': 'str',
+    'name': 'str',
+    'email': 'str',
+    'phone': 'str',
+    'designation': 'category',
+    'department': 'category',
+    'date_of_joining': 'date',
+    'location': 'category',
+    'experience_years': 'float',
+    'skills_count': 'float',
+    'created_at': 'str',
+}
+ALLOCATION_COLUMNS = {
+    'employee_id': 'str',
+    'project_name': 'category',
+    'start_date': 'date',
+    'end_date': 'date',
+    'allocation': 'float',
+    'allocated_at': 'str',
+}
+# Employee columns joined onto each allocation
+JOINED_COLUMNS = ['name', 'email', 'phone', 'designation', 'department', 'location', 'date_of_joining', 'experience_years', 'skills']
+
+
+def table_path(directory, name):
+    return os.path.join(directory, f"{name}.arrow")
+
+
+def _frame(records, columns):
+    frame = pd.DataFrame.from_records(records, columns=list(columns)) if records else pd.DataFrame(columns=list(columns))
+    for name, kind in columns.items():
+        values = frame[name]
+        if kind == 'date':
+            # Stored dates may still be in any of the accepted formats
+            frame[name] = parse_dates(values.astype('str')).dt.as_unit('s')
+        elif kind == 'float':
+            frame[name] = pd.to_numeric(values, errors='coerce').astype('float64')
+        else:
+            frame[name] = values.astype('str')
+            if kind == 'category':
+                frame[name] = frame[name].astype('category')
+    return frame
+
+
+def _table(frame):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    # Dates as date32 rather than timestamps
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.date32()))
+    return table.replace_schema_metadata(None)
+
+
+def build_tables(employees, allocations):
+    """Arrow tables from employee records and stored allocation records."""
+    employee_frame = _frame(employees, EMPLOYEE_COLUMNS)
+    skills = pd.Series([list(dict.fromkeys(employee.get('skills') or [])) for employee in employees], dtype=object)
+    skill_rows = skills.explode().dropna()
+    skill_frame = employee_frame.loc[skill_rows.index, ['employee_id', 'designation', 'department', 'location']].reset_index(drop=True)
+    skill_frame['skill'] = skill_rows.astype('str').astype('category').to_numpy()
+
+    # Joined like DataStore.allocation_view: the first record of an ID wins,
+    # and allocations whose employee is gone keep the name stored on them
+    employee_frame['skills'] = pd.Series([', '.join(map(str, names)) for names in skills], index=employee_frame.index, dtype='str')
+    details = employee_frame.drop_duplicates('employee_id').set_index('employee_id')[JOINED_COLUMNS]
+    allocation_frame = _frame(allocations, ALLOCATION_COLUMNS)
+    allocation_frame = allocation_frame.join(details, on='employee_id')
+    stored_names = pd.Series([alloc.get('name') for alloc in allocations], index=allocation_frame.index, dtype='str')
+    allocation_frame['name'] = allocation_frame['name'].fillna(stored_names)
+    employee_frame = employee_frame.drop(columns='skills')
+    employee_frame['skills_count'] = employee_frame['skills_count'].astype('Int32')
+
+    return {
+        'employees': _table(employee_frame),
+        'employee_skills': _table(skill_frame),
+        'allocations': _table(allocation_frame[list(ALLOCATION_COLUMNS)[:1] + JOINED_COLUMNS + list(ALLOCATION_COLUMNS)[1:]]),
+    }
+
+
+def write_snapshot(directory, tables, key):
+    """Write the tables as Arrow IPC files stamped with `key`; each file is replaced atomically."""
+    os.makedirs(directory, exist_ok=True)
+    for name, table in tables.items():
+        table = table.replace_schema_metadata({KEY_METADATA: key.encode()})
+        path = table_path(directory, name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with pa.OSFile(temp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_path, path)
+
+
+def remove_snapshot(directory):
+    for name in TABLES:
+        try:
+            os.remove(table_path(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+class Snapshot:
+    """Memory-mapped snapshot tables.
+
+    ``table`` returns the Arrow table itself; ``frame`` a pandas DataFrame
+    over it (categoricals for the dictionary columns, datetime64 dates),
+    built once and shared, so treat it as read-only.
+    """
+
+    def __init__(self, directory, tables, key):
+        self.directory = directory
+        self.key = key
+        self._tables = tables
+        self._frames = {}
+
+    def table(self, name):
+        return self._tables[name]
+
+    def frame(self, name):
+        frame = self._frames.get(name)
+        if frame is None:
+            frame = self._frames[name] = self._tables[name].to_pandas(date_as_object=False, split_blocks=True)
+        return frame
+
+
+def open_snapshot(directory, key=None):
+    """The snapshot in `directory`, or None if it is missing, incomplete or not built from `key`."""
+    tables = {}
+    for name in TABLES:
+        try:
+            source = pa.memory_map(table_path(directory, name), 'r')
+            table = pa.ipc.open_file(source).read_all()
+        except (OSError, pa.ArrowInvalid):
+            return None
+        table_key = (table.schema.metadata or {}).get(KEY_METADATA, b'').decode()
+        if key is None:
+            key = table_key
+        if table_key != key:
+            return None
+        tables[name] = table
+    return Snapshot(directory, tables, key)
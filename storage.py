@@ -0,0 +1,603 @@
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks on Windows; writers are then only serialized within a process
+    fcntl = None
+
+from metrics import timed
+
+log = logging.getLogger(__name__)
+
+DATABASE_FILE = 'talent_iq.db'
+# Lock file in the data directory that every writer holds while committing
+LOCK_FILE = '.talent_iq.lock'
+
+
+def file_signature(path):
+    # (mtime, size) changes whenever another process rewrites the file
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+@timed()
+def read_json_list(path):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except:
+            return []
+    return []
+
+
+@timed()
+def write_json_list(path, records):
+    # Written to a temporary file and renamed over the original, so readers
+    # see either the old list or the new one, never a partial file
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(records, f, indent=4, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@timed()
+def read_json_lines(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r') as f:
+        lines = f.read().split('\n')
+    last = max((i for i, line in enumerate(lines) if line.strip()), default=-1)
+    for number, line in enumerate(lines[:last + 1], 1):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            if number <= last:
+                raise ValueError(f"{path} line {number} is corrupt: {line[:80]!r}")
+            # A torn last line from a crash (or a write still in progress);
+            # everything before it was fully written
+            log.warning("Skipping incomplete last line of %s", path)
+    return records
+
+
+def repair_tail(path):
+    """Cut a torn last line (left by a crash mid-append) back to the last newline.
+
+    Returns the number of bytes removed.
+    """
+    try:
+        f = open(path, 'rb+')
+    except FileNotFoundError:
+        return 0
+    with f:
+        size = end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+            log.warning("Removed %d bytes of an incomplete last line from %s", size - end, path)
+        return size - end
+
+
+class FileLock:
+    """Exclusive advisory lock (flock) on `path`, for serializing writers across processes.
+
+    Re-entrant within a thread; other threads of the same process wait on an
+    ordinary lock first, so only one open file per process ever holds it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self):
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, 'a+')
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class JsonFileStorage:
+    """A JSON list rewritten in full on every append (the original format)."""
+
+    mode = 'json'
+
+    def __init__(self, path):
+        self.path = path
+
+    def signature(self):
+        return file_signature(self.path)
+
+    def load(self):
+        return read_json_list(self.path)
+
+    def append(self, records, current):
+        write_json_list(self.path, current + records)
+
+    def replace(self, records):
+        write_json_list(self.path, records)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JournalStorage:
+    """Snapshot JSON list plus an append-only JSON Lines journal.
+
+    Appends write one line per record and fsync in batches, so a write costs
+    O(records written) no matter how much history exists. Once the journal
+    grows past ``compact_threshold`` records it is folded into the snapshot on
+    a background thread. Readers replay snapshot + journal.
+    """
+
+    mode = 'journal'
+
+    def __init__(self, path, fsync_batch=32, fsync_interval=1.0, compact_threshold=5000, write_lock=None):
+        self.path = path
+        # Held around the journal swap and snapshot replace of a compaction,
+        # so other processes never append to a journal being folded in
+        self.write_lock = write_lock or nullcontext()
+        base = os.path.splitext(path)[0]
+        self.journal_path = base + '.journal.jsonl'
+        # Journal being folded into the snapshot by a running compaction
+        self.compacting_path = base + '.compacting.jsonl'
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._journal = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._sync_timer = None
+        self._compaction = None
+        self._recover()
+        self._journal_records = len(read_json_lines(self.journal_path))
+
+    def _recover(self):
+        # A crash between replacing the snapshot and removing the compacting
+        # journal leaves records that are already folded in; drop them.
+        compacting = read_json_lines(self.compacting_path)
+        if compacting:
+            snapshot = read_json_list(self.path)
+            if snapshot[-len(compacting):] == compacting:
+                os.remove(self.compacting_path)
+
+    def signature(self):
+        with self._lock:
+            return (
+                file_signature(self.path),
+                file_signature(self.compacting_path),
+                file_signature(self.journal_path),
+            )
+
+    def load(self):
+        with self._lock:
+            records = read_json_list(self.path)
+            records.extend(read_json_lines(self.compacting_path))
+            records.extend(read_json_lines(self.journal_path))
+            return records
+
+    # --- Appends and fsync batching ---
+
+    def _journal_file(self):
+        if self._journal is not None:
+            signature = file_signature(self.journal_path)
+            if signature is None or signature[2] != os.fstat(self._journal.fileno()).st_ino:
+                # Another process moved the journal away to compact it; continue in a new one
+                self._sync()
+                self._journal.close()
+                self._journal = None
+        if self._journal is None:
+            # Appending after a torn line would glue the next record onto it
+            repair_tail(self.journal_path)
+            self._journal = open(self.journal_path, 'a')
+        return self._journal
+
+    def append(self, records, current=None):
+        with self._lock:
+            journal = self._journal_file()
+            try:
+                journal.write(''.join(json.dumps(record, default=str) + '\n' for record in records))
+                journal.flush()
+            except BaseException:
+                # Part of the batch may be on disk; reopen (and repair) before the next append
+                self._journal = None
+                journal.close()
+                raise
+            self._unsynced += len(records)
+            self._journal_records += len(records)
+            if self._unsynced >= self.fsync_batch or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+            elif self._sync_timer is None:
+                self._sync_timer = threading.Timer(self.fsync_interval, self.flush)
+                self._sync_timer.daemon = True
+                self._sync_timer.start()
+            if self._journal_records >= self.compact_threshold:
+                self.compact(background=True)
+
+    def _sync(self):
+        if self._journal is not None and self._unsynced:
+            os.fsync(self._journal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        if self._sync_timer is not None:
+            self._sync_timer.cancel()
+            self._sync_timer = None
+
+    def flush(self):
+        with self._lock:
+            self._sync()
+
+    def replace(self, records):
+        # Rewrite the snapshot with exactly `records` and drop any journal
+        with self._lock:
+            self._sync()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            write_json_list(self.path, records)
+            for path in (self.compacting_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._journal_records = 0
+
+    # --- Compaction ---
+
+    def compact(self, background=False):
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return self._compaction
+            if background:
+                self._compaction = threading.Thread(target=self._compact, name='journal-compaction', daemon=True)
+                self._compaction.start()
+                return self._compaction
+        self._compact()
+
+    def _compact(self):
+        with self.write_lock, self._lock:
+            self._sync()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            # New appends go to a fresh journal while the old one is folded in
+            if os.path.exists(self.journal_path) and not os.path.exists(self.compacting_path):
+                os.replace(self.journal_path, self.compacting_path)
+            self._journal_records = 0
+            folded = self._fold_signature()
+        # Folded outside the lock, into a file of our own
+        tmp_path = self._write_fold()
+        try:
+            with self.write_lock, self._lock:
+                if self._fold_signature() != folded:
+                    # Another process compacted or replaced the data meanwhile;
+                    # fold what is there now, still holding the lock
+                    os.remove(tmp_path)
+                    tmp_path = self._write_fold()
+                os.replace(tmp_path, self.path)
+                if os.path.exists(self.compacting_path):
+                    os.remove(self.compacting_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _fold_signature(self):
+        return file_signature(self.path), file_signature(self.compacting_path)
+
+    def _write_fold(self):
+        # Snapshot plus compacting journal, written to a new temporary file next to the snapshot
+        snapshot = read_json_list(self.path)
+        snapshot.extend(read_json_lines(self.compacting_path))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)), prefix=os.path.basename(self.path) + '.', suffix='.compact.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(snapshot, f, indent=4, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates it private; keep the snapshot's permissions
+        if os.path.exists(self.path):
+            os.chmod(tmp_path, os.stat(self.path).st_mode & 0o777)
+        return tmp_path
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS employees (
+    employee_id TEXT PRIMARY KEY,
+    name TEXT,
+    email TEXT,
+    phone TEXT,
+    designation TEXT,
+    department TEXT,
+    location TEXT,
+    date_of_joining TEXT,
+    experience_years REAL,
+    created_at TEXT,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS allocations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id TEXT NOT NULL,
+    project_name TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    allocation REAL,
+    allocated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_allocations_employee_id ON allocations (employee_id);
+CREATE INDEX IF NOT EXISTS idx_allocations_project_name ON allocations (project_name);
+
+-- Written by earlier versions but never queried: name, skill and date
+-- lookups run on the data store's in-memory indexes
+DROP INDEX IF EXISTS idx_employees_name;
+DROP INDEX IF EXISTS idx_employees_designation;
+DROP INDEX IF EXISTS idx_allocations_dates;
+DROP TABLE IF EXISTS employee_skills;
+"""
+
+
+class SqliteDatabase:
+    """Employees, skills and allocations in one SQLite file.
+
+    ``employees`` and ``allocations`` are storage objects with the same
+    interface as the file backends, plus indexed point queries for lookups by
+    employee ID or project. The data store still loads every record into
+    memory: totals, date-aware capacity checks and searches run there.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SQLITE_SCHEMA)
+        self.employees = SqliteEmployeeStorage(self)
+        self.allocations = SqliteAllocationStorage(self)
+
+    def signature(self):
+        # data_version changes when another connection commits; our own
+        # writes are applied to the in-memory view directly.
+        with self._lock:
+            return self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def insert_employees(self, records):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO employees (employee_id, name, email, phone, designation, department, location, '
+                'date_of_joining, experience_years, created_at, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(
+                    emp.get('employee_id'), emp.get('name'), emp.get('email'), emp.get('phone'),
+                    emp.get('designation'), emp.get('department'), emp.get('location'),
+                    emp.get('date_of_joining'), emp.get('experience_years'), emp.get('created_at'),
+                    json.dumps(emp, default=str),
+                ) for emp in records],
+            )
+
+    def insert_allocations(self, records):
+        with self._lock, self._conn:
+            self._insert_allocations(records)
+
+    def replace_allocations(self, records):
+        # One transaction, so readers never see an empty allocations table
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM allocations')
+            self._insert_allocations(records)
+
+    def _insert_allocations(self, records):
+        self._conn.executemany(
+            'INSERT INTO allocations (employee_id, project_name, start_date, end_date, allocation, allocated_at, data) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(
+                alloc.get('employee_id'), alloc.get('project_name'), alloc.get('start_date'),
+                alloc.get('end_date'), alloc.get('allocation'), alloc.get('allocated_at'),
+                json.dumps(alloc, default=str),
+            ) for alloc in records],
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class SqliteEmployeeStorage:
+    mode = 'sqlite'
+    supports_queries = True
+
+    def __init__(self, database):
+        self.database = database
+
+    def signature(self):
+        return self.database.signature()
+
+    def load(self):
+        return [json.loads(row[0]) for row in self.database.query('SELECT data FROM employees ORDER BY rowid')]
+
+    def append(self, records, current=None):
+        self.database.insert_employees(records)
+
+    def get(self, employee_id):
+        rows = self.database.query('SELECT data FROM employees WHERE employee_id = ?', (employee_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def exists(self, employee_id):
+        return bool(self.database.query('SELECT 1 FROM employees WHERE employee_id = ?', (employee_id,)))
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.database.close()
+
+
+class SqliteAllocationStorage:
+    mode = 'sqlite'
+    supports_queries = True
+
+    def __init__(self, database):
+        self.database = database
+
+    def signature(self):
+        return self.database.signature()
+
+    def load(self):
+        return [json.loads(row[0]) for row in self.database.query('SELECT data FROM allocations ORDER BY id')]
+
+    def append(self, records, current=None):
+        self.database.insert_allocations(records)
+
+    def replace(self, records):
+        self.database.replace_allocations(records)
+
+    def for_employee(self, employee_id):
+        rows = self.database.query('SELECT data FROM allocations WHERE employee_id = ? ORDER BY id', (employee_id,))
+        return [json.loads(row[0]) for row in rows]
+
+    def for_project(self, project_name):
+        rows = self.database.query('SELECT data FROM allocations WHERE project_name = ? ORDER BY id', (project_name,))
+        return [json.loads(row[0]) for row in rows]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.database.close()
+
+
+def import_json_to_sqlite(employees_path, allocations_path, database_path):
+    """One-shot import of the JSON files into an empty SQLite database."""
+    database = SqliteDatabase(database_path)
+    try:
+        if database.query('SELECT 1 FROM employees LIMIT 1') or database.query('SELECT 1 FROM allocations LIMIT 1'):
+            raise ValueError(f"{database_path} already contains data; import into a new database file.")
+        employees = []
+        seen = set()
+        skipped = 0
+        for emp in read_json_list(employees_path):
+            if emp.get('employee_id') in seen:
+                skipped += 1
+                continue
+            seen.add(emp.get('employee_id'))
+            employees.append(emp)
+        allocations = read_json_list(allocations_path)
+        database.insert_employees(employees)
+        database.insert_allocations(allocations)
+        return len(employees), len(allocations), skipped
+    finally:
+        database.close()
+
+
+STORAGE_MODES = {
+    'json': JsonFileStorage,
+    'journal': JournalStorage,
+    'sqlite': SqliteDatabase,
+}
+
+
+def open_storages(employees_path, allocations_path, mode='json', database_path=DATABASE_FILE, write_lock=None):
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unknown storage mode '{mode}'. Expected one of: {', '.join(STORAGE_MODES)}")
+    if mode == 'sqlite':
+        database = SqliteDatabase(database_path)
+        return database.employees, database.allocations
+    if mode == 'journal':
+        return JournalStorage(employees_path, write_lock=write_lock), JournalStorage(allocations_path, write_lock=write_lock)
+    return STORAGE_MODES[mode](employees_path), STORAGE_MODES[mode](allocations_path)
+
+
+def lock_path(employees_path, allocations_path, mode='json', database_path=DATABASE_FILE):
+    # One lock per data directory (or per database), whichever file is written
+    directory = os.path.dirname(os.path.abspath(database_path if mode == 'sqlite' else allocations_path))
+    return os.path.join(directory, LOCK_FILE)
+
+
+if __name__ == "__main__":
+    # Fold the journals into the JSON snapshots, e.g. before a backup:
+    #   python storage.py compact [employees_data.json project_allocations.json]
+    # Copy the JSON files into a new SQLite database for STORAGE_MODE=sqlite:
+    #   python storage.py import-json [talent_iq.db]
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'compact':
+        for snapshot_path in sys.argv[2:] or ['employees_data.json', 'project_allocations.json']:
+            lock = FileLock(os.path.join(os.path.dirname(os.path.abspath(snapshot_path)), LOCK_FILE))
+            storage = JournalStorage(snapshot_path, write_lock=lock)
+            storage.compact()
+            print(f"Compacted {snapshot_path}: {len(storage.load())} records")
+    elif command == 'import-json':
+        database_path = sys.argv[2] if len(sys.argv) > 2 else DATABASE_FILE
+        try:
+            employee_count, allocation_count, skipped = import_json_to_sqlite('employees_data.json', 'project_allocations.json', database_path)
+        except ValueError as e:
+            print(f"Import failed: {e}")
+            sys.exit(1)
+        print(f"Imported {employee_count} employees and {allocation_count} allocations into {database_path}")
+        if skipped:
+            print(f"Skipped {skipped} employees with duplicate IDs")
+    else:
+        print("Usage: python storage.py compact [snapshot.json ...] | import-json [database.db]")
+        sys.exit(1)
@@ -0,0 +1,51 @@
+from collections import Counter
+
+
+class SummaryStats:
+    """Running dashboard counts, updated as employees and allocations are added.
+
+    Reads never touch the underlying records, so the sidebar and dashboard
+    cost the same however many employees there are.
+    """
+
+    def __init__(self):
+        self.clear_employees()
+        self.clear_allocations()
+
+    def clear_employees(self):
+        self.employees = 0
+        self.departments = Counter()
+        self.designations = Counter()
+        self.locations = Counter()
+        self.skills = Counter()
+
+    def clear_allocations(self):
+        self.allocations = 0
+        self.total_allocation = 0
+        self.projects = Counter()
+
+    def add_employee(self, employee):
+        self.employees += 1
+        self.departments[employee.get('department')] += 1
+        self.designations[employee.get('designation')] += 1
+        self.locations[employee.get('location')] += 1
+        self.skills.update(set(employee.get('skills') or []))
+
+    def add_allocation(self, project_name, value):
+        self.allocations += 1
+        self.total_allocation += value
+        self.projects[project_name] += 1
+
+    def snapshot(self):
+        """Plain-dict copy of the current counts, safe to hand to page code."""
+        return {
+            'employees': self.employees,
+            'departments': dict(self.departments),
+            'designations': dict(self.designations),
+            'locations': dict(self.locations),
+            'skills': dict(self.skills),
+            'allocations': self.allocations,
+            'total_allocation': self.total_allocation,
+            'projects': len(self.projects),
+            'project_allocations': dict(self.projects),
+        }
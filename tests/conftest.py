@@ -0,0 +1,63 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import ROLE_SKILLS  # noqa: E402
+from data_store import DataStore  # noqa: E402
+
+
+def employee(employee_id, name, designation='Backend Developer', department='Software Engineering', location='Hyderabad',
+             skills=('Python', 'Django'), date_of_joining='2021-04-01'):
+    return {
+        'employee_id': employee_id, 'name': name, 'email': f"{name.split()[0].lower()}@gmail.com", 'phone': '9876543210',
+        'designation': designation, 'department': department, 'location': location, 'date_of_joining': date_of_joining,
+        'experience_years': 3, 'skills': list(skills), 'skills_count': len(skills), 'created_at': '2024-01-01T00:00:00',
+    }
+
+
+def allocation(employee_id, project_name, start_date, end_date, value):
+    return {'employee_id': employee_id, 'project_name': project_name, 'start_date': start_date, 'end_date': end_date,
+            'allocation': value, 'allocated_at': '2024-01-01T00:00:00'}
+
+
+EMPLOYEES = [
+    employee('TM00001', 'Asha Rao'),
+    employee('TM00002', 'Vikram Shah', 'DevOps Engineer', location='Kolkata', skills=('Docker', 'Kubernetes')),
+    employee('TM00003', 'Meera Iyer', 'Frontend Developer', department='FinOps', skills=('React.js', 'TypeScript')),
+]
+ALLOCATIONS = [
+    allocation('TM00001', 'Wellora', '2025-01-01', '2025-03-31', 60),
+    allocation('TM00001', 'Billing', '2025-03-01', '2025-06-30', 30),
+    allocation('TM00002', 'Wellora', '2025-02-15', None, 100),
+]
+
+
+@pytest.fixture
+def data_files(tmp_path):
+    employees_path, allocations_path = tmp_path / 'employees_data.json', tmp_path / 'project_allocations.json'
+    employees_path.write_text(json.dumps(EMPLOYEES))
+    allocations_path.write_text(json.dumps(ALLOCATIONS))
+    return str(employees_path), str(allocations_path)
+
+
+@pytest.fixture
+def make_store(data_files):
+    # Several stores over the same files stand in for several app processes
+    stores = []
+
+    def make(**options):
+        store = DataStore(*data_files, role_skills=ROLE_SKILLS, **options)
+        stores.append(store)
+        return store
+    yield make
+    for store in stores:
+        store.close()
+
+
+@pytest.fixture
+def store(make_store):
+    return make_store()
@@ -0,0 +1,71 @@
+import random
+
+import pandas as pd
+import pytest
+
+from analytics import DIMENSIONS, Utilization
+from conftest import ALLOCATIONS, EMPLOYEES, allocation, employee
+
+
+def assert_same(incremental, fresh):
+    assert incremental.months == fresh.months
+    for dimension in (None, *DIMENSIONS):
+        pd.testing.assert_frame_equal(incremental.rollup(dimension), fresh.rollup(dimension), check_exact=False)
+
+
+def test_rollup_by_hand():
+    frame = Utilization(EMPLOYEES, ALLOCATIONS).rollup()
+    assert list(frame['month']) == ['2025-01', '2025-02', '2025-03', '2025-04', '2025-05', '2025-06']
+    assert list(frame['headcount']) == [3] * 6
+    # January: 60% for one of three people; February adds 100% from the 15th
+    assert frame['utilization'][0] == pytest.approx(20)
+    assert frame['utilization'][1] == pytest.approx((60 * 28 + 100 * 14) / (3 * 28))
+    assert list(frame['bench']) == [2, 1, 1, 1, 1, 1]
+    assert list(frame['over_allocated']) == [0] * 6
+
+
+def test_rollup_by_dimension():
+    frame = Utilization(EMPLOYEES, ALLOCATIONS).rollup('department')
+    finops = frame[frame['department'] == 'FinOps']
+    assert list(finops['bench']) == [1] * 6
+    assert finops['utilization'].eq(0).all()
+
+
+def test_over_allocation_and_joining():
+    employees = [employee('TM00010', 'Late Joiner', date_of_joining='2025-03-10')]
+    allocations = [
+        allocation('TM00010', 'A', '2025-01-01', '2025-01-31', 70),
+        allocation('TM00010', 'B', '2025-01-20', '2025-02-10', 50),
+    ]
+    frame = Utilization(employees, allocations).rollup()
+    # Counted before joining because they are allocated; over 100% in January only
+    assert list(frame['headcount']) == [1, 1]
+    assert list(frame['over_allocated']) == [1, 0]
+
+
+def test_incremental_matches_rebuild():
+    rng = random.Random(7)
+    employees = [employee(f"TM{i:05d}", f"Person {i}", department=rng.choice(['FinOps', 'Software Engineering'])) for i in range(40)]
+    allocations = []
+    for _ in range(300):
+        year = rng.choice([2024, 2025, 2026])
+        start = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        end = rng.choice([f"{year + 1}-{rng.randint(1, 12):02d}-15", None])
+        allocations.append(allocation(f"TM{rng.randrange(45):05d}", 'P', rng.choice([start, start, None]), end, rng.choice([10, 25, 33.3, 50])))
+    # Some dated far outside the initial range, to widen it
+    allocations += [allocation('TM00001', 'Early', '2019-05-01', '2019-08-31', 40), allocation('TM00002', 'Late', '2031-01-01', None, 20)]
+
+    utilization = Utilization(employees[:30], allocations[:100])
+    for batch in range(100, len(allocations), 37):
+        utilization.add_allocations(allocations[batch:batch + 37])
+    # Allocations for TM00040..44 arrived before their employees
+    utilization.add_employees(employees[30:] + [employee(f"TM{i:05d}", f"Person {i}") for i in range(40, 45)])
+    fresh = Utilization(employees + [employee(f"TM{i:05d}", f"Person {i}") for i in range(40, 45)], allocations)
+    assert_same(utilization, fresh)
+
+
+def test_first_dated_allocation_sets_the_range():
+    utilization = Utilization(EMPLOYEES, [allocation('TM00001', 'Open', None, None, 20)])
+    added = [allocation('TM00002', 'Dated', '2024-02-01', '2024-04-30', 50)]
+    utilization.add_allocations(added)
+    assert_same(utilization, Utilization(EMPLOYEES, [allocation('TM00001', 'Open', None, None, 20)] + added))
@@ -0,0 +1,175 @@
+import json
+
+import httpx
+import pytest
+from starlette.testclient import TestClient
+
+from api import create_app
+from core import ROLE_SKILLS, IntentService
+from intent_parser import IntentParser
+from llm_client import GeminiClient
+from query_plan import QueryPlanner
+from response_cache import ResponseCache
+
+TOKEN = 'test-token'
+AUTH = {'Authorization': f"Bearer {TOKEN}"}
+NEW_EMPLOYEE = {
+    'employee_id': 'TM00020', 'name': 'Nisha Verma', 'email': 'nisha@gmail.com', 'phone': '9123456789',
+    'designation': 'DevOps Engineer', 'department': 'Software Engineering', 'location': 'Hubli',
+    'date_of_joining': '2023-07-01', 'experience_years': 2, 'skills': ['Docker', 'Terraform'],
+}
+
+
+@pytest.fixture
+def model_replies():
+    # Text the stub model answers with, in order
+    return []
+
+
+@pytest.fixture
+def intents(model_replies):
+    def handler(request):
+        text = model_replies.pop(0) if model_replies else '{"intent": "other", "entities": {}}'
+        return httpx.Response(200, json={'candidates': [{'content': {'parts': [{'text': text}]}}]})
+    client = GeminiClient('test-key', base_url='http://model.test', transport=httpx.MockTransport(handler))
+    yield IntentService(IntentParser(ROLE_SKILLS), ResponseCache(path=''), client)
+    client.close()
+
+
+@pytest.fixture
+def make_client(store, intents):
+    clients = []
+
+    def make(api_token=TOKEN, **options):
+        app = create_app(store, intents, QueryPlanner(intents.cache, intents.client), api_token=api_token)
+        client = TestClient(app, **options)
+        client.__enter__()
+        clients.append(client)
+        return client
+    yield make
+    for client in clients:
+        client.__exit__(None, None, None)
+
+
+@pytest.fixture
+def client(make_client):
+    return make_client()
+
+
+def test_health(client):
+    response = client.get('/health')
+    assert response.status_code == 200 and response.json()['status'] == 'ok'
+
+
+def test_list_employees(client):
+    body = client.get('/employees', params={'department': 'Software Engineering', 'sort': 'name', 'limit': 1}, headers=AUTH).json()
+    assert body['total'] == 2
+    assert [item['employee_id'] for item in body['items']] == ['TM00001']
+    assert client.get('/employees', params={'limit': 0}, headers=AUTH).status_code == 400
+
+
+def test_get_employee(client):
+    body = client.get('/employees/TM00001', headers=AUTH).json()
+    assert body['employee']['name'] == 'Asha Rao'
+    assert len(body['allocations']) == 2
+    assert client.get('/employees/TM09999', headers=AUTH).status_code == 404
+
+
+def test_capacity(client):
+    body = client.get('/capacity/TM00001', params={'start': '2025-03-01', 'end': '2025-03-31'}, headers=AUTH).json()
+    assert body['peak_allocation'] == 90 and body['available'] == 10
+    assert client.get('/capacity/TM00001', params={'start': '2025-07-01'}, headers=AUTH).json()['peak_allocation'] == 0
+    assert client.get('/capacity/TM00001', params={'start': '2025-03-01', 'end': '2025-01-01'}, headers=AUTH).status_code == 400
+    assert client.get('/capacity/TM00001', params={'start': 'March'}, headers=AUTH).status_code == 400
+    assert client.get('/capacity/TM09999', headers=AUTH).status_code == 404
+
+
+def test_candidates(client):
+    body = client.get('/candidates', params={'designation': 'DevOps Engineer', 'skills': 'Docker'}, headers=AUTH).json()
+    assert body['total'] >= 1
+    assert client.get('/candidates', headers=AUTH).status_code == 400
+
+
+def test_utilization(client):
+    body = client.get('/utilization', params={'by': 'location', 'start': '2025-02', 'end': '2025-03'}, headers=AUTH).json()
+    assert {(item['location'], item['month']) for item in body['items']} == {
+        (location, month) for location in ('Hyderabad', 'Kolkata') for month in ('2025-02', '2025-03')}
+    assert client.get('/utilization', params={'by': 'salary'}, headers=AUTH).status_code == 400
+    assert client.get('/utilization', params={'start': '2025'}, headers=AUTH).status_code == 400
+
+
+def test_everything_but_health_needs_the_token(client):
+    for path in ('/employees', '/employees/TM00001', '/allocations', '/capacity/TM00001', '/candidates?designation=DevOps+Engineer', '/utilization'):
+        response = client.get(path)
+        assert response.status_code == 401 and response.headers['WWW-Authenticate'] == 'Bearer'
+    assert client.get('/health').status_code == 200
+    assert client.post('/employees', json=NEW_EMPLOYEE).status_code == 401
+    response = client.post('/employees', json=NEW_EMPLOYEE, headers={'Authorization': 'Bearer wrong'})
+    assert response.status_code == 401 and response.headers['WWW-Authenticate'] == 'Bearer'
+
+
+def test_without_a_token_only_loopback_is_served(make_client):
+    remote = make_client(api_token='')
+    assert remote.get('/employees').status_code == 401
+    assert remote.post('/intent', json={'query': 'hello'}).status_code == 401
+    local = make_client(api_token='', client=('127.0.0.1', 50000))
+    assert local.get('/employees').status_code == 200
+    assert local.post('/intent', json={'query': 'hello'}).status_code == 200
+
+
+def test_create_employee(client, store):
+    response = client.post('/employees', json=NEW_EMPLOYEE, headers=AUTH)
+    assert response.status_code == 201
+    assert store.get_employee('TM00020')['skills'] == ['Docker', 'Terraform']
+    again = client.post('/employees', json=NEW_EMPLOYEE, headers=AUTH)
+    assert again.status_code == 400 and again.json()['errors'] == ["Employee ID already exists"]
+    assert client.post('/employees', content='not json', headers=AUTH).status_code == 400
+
+
+def test_create_allocations_all_or_nothing(client, store):
+    batch = {'allocations': [
+        {'employee_id': 'TM00003', 'project_name': 'Atlas', 'start_date': '2025-01-01', 'end_date': '2025-06-30', 'allocation': 70},
+        {'employee_id': 'TM00003', 'project_name': 'Zephyr', 'start_date': '2025-03-01', 'end_date': '2025-03-31', 'allocation': 40},
+    ]}
+    response = client.post('/allocations', json=batch, headers=AUTH)
+    assert response.status_code == 400
+    assert [error['index'] for error in response.json()['errors']] == [1]
+    assert store.allocations_for_employee('TM00003') == []
+
+    batch['allocations'][1]['allocation'] = 30
+    response = client.post('/allocations', json=batch, headers=AUTH)
+    assert response.status_code == 201 and response.json()['saved'] == 2
+    assert store.peak_allocation('TM00003', '2025-03-01', '2025-03-31') == 100
+
+
+def test_create_allocations_rejects_bad_bodies(client):
+    assert client.post('/allocations', json={'allocations': []}, headers=AUTH).status_code == 400
+    body = {'allocations': [{'employee_id': 'TM00003'}], 'expected_version': 'latest'}
+    assert client.post('/allocations', json=body, headers=AUTH).status_code == 400
+
+
+def test_intent_local_then_model(client, model_replies):
+    local = client.post('/intent', json={'query': "what is Asha Rao's email"}, headers=AUTH).json()
+    assert local == {'source': 'local', 'result': {'intent': 'get_employee_email', 'entities': {'employee_name': 'Asha Rao'}}}
+
+    model_replies.append('```json\n{"intent": "get_employee_email", "entities": {"employee_name": "Asha"}}\n```')
+    remote = client.post('/intent', json={'query': "Asha's mail and number pls"}, headers=AUTH).json()
+    assert remote['source'] == 'model' and remote['result']['entities'] == {'employee_name': 'Asha'}
+    assert client.post('/intent', json={}, headers=AUTH).status_code == 400
+
+
+def test_query(client, model_replies):
+    plan = {'table': 'allocations', 'group_by': ['project_name'], 'aggregates': [{'func': 'sum', 'column': 'allocation', 'as': 'total'}],
+            'sort': [{'column': 'project_name'}]}
+    model_replies.append(json.dumps(plan))
+    body = client.post('/query', json={'question': 'total allocation per project'}, headers=AUTH).json()
+    assert body['rows'] == [{'project_name': 'Billing', 'total': 30.0}, {'project_name': 'Wellora', 'total': 160.0}]
+    assert body['cached_plan'] is False
+    again = client.post('/query', json={'question': 'Total allocation per project?'}, headers=AUTH).json()
+    assert again['cached_plan'] is True and again['rows'] == body['rows']
+
+
+def test_query_with_an_invalid_plan(client, model_replies):
+    model_replies.append('{"table": "salaries"}')
+    response = client.post('/query', json={'question': 'what does everyone earn'}, headers=AUTH)
+    assert response.status_code == 502 and response.json()['errors']
@@ -0,0 +1,130 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from bulk_import import EMPLOYEE_COLUMNS, read_allocation_csv, read_employee_file, validate_allocation_chunks, validate_employees
+from capacity import CapacityIndex, to_day
+
+
+def validate_csv(text, employee_ids=('TM00001', 'TM00002'), saved=(), chunksize=2):
+    capacity = CapacityIndex()
+    totals = {}
+    for employee_id, start, end, value in saved:
+        capacity.add(employee_id, to_day(start), to_day(end), value)
+        totals[employee_id] = totals.get(employee_id, 0) + value
+    return validate_allocation_chunks(read_allocation_csv(io.StringIO(text), chunksize), list(employee_ids), totals, capacity.overlay())
+
+
+HEADER = 'project_name,start_date,end_date,allocation,employee_id\n'
+
+
+def test_valid_rows_are_normalized():
+    records, errors = validate_csv(HEADER + 'Wellora,1/6/2025,2025-03-31,50,TM00001\nBilling,2025-01-01,2025-01-31,25.5,TM00002\n')
+    assert errors.empty
+    assert [(r['employee_id'], r['start_date'], r['end_date'], r['allocation']) for r in records] == [
+        ('TM00001', '2025-01-06', '2025-03-31', 50), ('TM00002', '2025-01-01', '2025-01-31', 25.5)]
+    assert all('allocated_at' in r for r in records)
+
+
+def test_row_errors():
+    records, errors = validate_csv(HEADER + (
+        'A,2025-01-01,2025-01-31,150,TM00001\n'
+        'B,2025-02-01,2025-01-01,10,TM00001\n'
+        'C,someday,2025-01-01,10,TM00001\n'
+        'D,2025-01-01,2025-01-31,10,TM09999\n'
+        'E,2025-01-01,2025-01-31,10,TM00002\n'
+    ))
+    assert [r['project_name'] for r in records] == ['E']
+    assert list(errors['Row']) == [2, 3, 4, 5]
+    assert 'between 1 and 100' in errors['Error'][0]
+    assert 'start on or before the end' in errors['Error'][1]
+    assert "'TM09999' not found" in errors['Error'][3]
+
+
+def test_capacity_counts_earlier_rows_across_chunks():
+    records, errors = validate_csv(HEADER + (
+        'A,2025-01-01,2025-01-31,60,TM00001\n'
+        'B,2025-02-01,2025-02-28,60,TM00001\n'
+        'C,2025-01-15,2025-02-15,50,TM00001\n'
+        'D,2025-03-01,2025-03-31,40,TM00001\n'
+    ), chunksize=1)
+    # C overlaps A and B; back-to-back A and B do not overlap each other
+    assert [r['project_name'] for r in records] == ['A', 'B', 'D']
+    assert list(errors['Row']) == [4]
+    assert 'would exceed 100%' in errors['Error'][0]
+
+
+def test_capacity_includes_saved_allocations():
+    records, errors = validate_csv(
+        HEADER + 'A,2025-01-10,2025-01-20,50,TM00001\nB,2025-02-01,2025-02-28,50,TM00001\n',
+        saved=[('TM00001', '2025-01-01', '2025-01-31', 60)])
+    assert [r['project_name'] for r in records] == ['B']
+    assert list(errors['Row']) == [2]
+
+
+def test_missing_columns():
+    with pytest.raises(ValueError, match='must contain'):
+        validate_csv('project_name,allocation\nA,10\n')
+
+
+def test_dates_past_2262_are_checked_like_any_other():
+    # Beyond what nanosecond timestamps can hold
+    records, errors = validate_csv(HEADER + 'A,2025-01-01,2999-12-31,50,TM00001\nB,2999-12-31,2025-01-01,10,TM00002\n')
+    assert [(r['project_name'], r['end_date']) for r in records] == [('A', '2999-12-31')]
+    assert list(errors['Row']) == [3]
+
+
+def employee_row(**fields):
+    row = {
+        'employee_id': 'TM00010', 'name': 'Ravi Kumar', 'email': 'Ravi@gmail.com', 'phone': '9876543210',
+        'designation': 'Backend Developer', 'department': 'Software Engineering', 'date_of_joining': '3/15/2022',
+        'location': 'Hyderabad', 'experience_years': '4', 'skills': 'Python; Django; Python',
+    }
+    row.update(fields)
+    return row
+
+
+def test_valid_employee():
+    records, errors = validate_employees(pd.DataFrame([employee_row()]), existing_ids=[])
+    assert errors.empty
+    record = records[0]
+    assert record['email'] == 'ravi@gmail.com'
+    assert record['date_of_joining'] == '2022-03-15'
+    assert record['skills'] == ['Python', 'Django'] and record['skills_count'] == 2
+    assert record['experience_years'] == 4.0
+
+
+def test_employee_errors():
+    frame = pd.DataFrame([
+        employee_row(),
+        employee_row(),
+        employee_row(employee_id='TM00001'),
+        employee_row(employee_id='X1', email='x@yahoo.com', phone='123'),
+        employee_row(employee_id='TM00011', skills='Python; React.js'),
+        employee_row(employee_id='TM00012', designation='Wizard', date_of_joining='2999-01-01'),
+    ])
+    records, errors = validate_employees(frame, existing_ids=['TM00001'])
+    assert [r['employee_id'] for r in records] == ['TM00010']
+    by_row = errors.groupby('Row')['Error'].apply(list)
+    assert by_row[3] == ["Row 3: Employee ID appears more than once in the file"]
+    assert by_row[4] == ["Row 4: Employee ID already exists"]
+    assert len(by_row[5]) == 3
+    assert by_row[6] == ["Row 6: Skills not listed for Backend Developer: React.js"]
+    assert any('Designation must be one of' in message for message in by_row[7])
+    assert any('cannot be in the future' in message for message in by_row[7])
+
+
+def test_employee_json_upload():
+    source = io.StringIO(json.dumps([employee_row(skills=['Python'])]))
+    frame = read_employee_file(source, 'employees.json')
+    records, errors = validate_employees(frame, existing_ids=[], first_row=1)
+    assert errors.empty and records[0]['skills'] == ['Python']
+
+
+def test_employee_file_must_be_a_list():
+    with pytest.raises(ValueError, match='list of employee objects'):
+        read_employee_file(io.StringIO('{"employee_id": "TM00010"}'), 'one.json')
+    with pytest.raises(ValueError, match='must contain'):
+        validate_employees(pd.DataFrame(columns=EMPLOYEE_COLUMNS[:3]), existing_ids=[])
@@ -0,0 +1,118 @@
+import random
+from datetime import date
+
+from capacity import MAX_DAY, MIN_DAY, AllocationIntervals, CapacityIndex, allocation_days, iso_date, to_day
+
+
+def day(text):
+    return date.fromisoformat(text).toordinal()
+
+
+def brute_peak(intervals, start, end):
+    return max((sum(value for s, e, value in intervals if s <= d <= e) for d in range(start, end + 1)), default=0)
+
+
+def test_to_day_formats():
+    assert to_day('2025-03-01') == to_day('3/1/2025') == to_day('01-03-2025') == to_day('2025/03/01') == day('2025-03-01')
+    assert to_day('2025-03-01T10:30:00') == day('2025-03-01')
+    assert to_day(date(2025, 3, 1)) == day('2025-03-01')
+    assert to_day('') is None and to_day(None) is None and to_day('soon') is None
+    assert iso_date('3/1/2025') == '2025-03-01'
+    assert iso_date('soon') == 'soon'
+
+
+def test_missing_dates_are_open_ended():
+    assert allocation_days({'start_date': None, 'end_date': '2025-01-31'}) == (MIN_DAY, day('2025-01-31'))
+    assert allocation_days({'start_date': '2025-01-01', 'end_date': ''}) == (day('2025-01-01'), MAX_DAY)
+
+
+def test_peak_counts_only_overlapping_days():
+    intervals = AllocationIntervals()
+    intervals.add(day('2025-01-01'), day('2025-01-31'), 60)
+    intervals.add(day('2025-02-01'), day('2025-02-28'), 50)
+    intervals.add(day('2025-01-20'), day('2025-02-10'), 30)
+    # Back to back is not overlapping
+    assert intervals.peak(day('2025-01-01'), day('2025-01-19')) == 60
+    assert intervals.peak(day('2025-01-01'), day('2025-03-31')) == 90
+    assert intervals.peak(day('2025-02-11'), day('2025-02-28')) == 50
+    assert intervals.peak(day('2025-03-01'), MAX_DAY) == 0
+
+
+def random_intervals(rng, count):
+    for _ in range(count):
+        start = rng.randint(0, 300)
+        yield start, start + rng.randint(0, 60), rng.randint(1, 40)
+
+
+def check_against_brute_force(rng, intervals, plain):
+    for _ in range(50):
+        start = rng.randint(-10, 360)
+        end = start + rng.randint(0, 30)
+        assert intervals.peak(start, end) == brute_peak(plain, start, end)
+        assert sorted(intervals.overlapping(start, end)) == sorted(item for item in plain if item[0] <= end and item[1] >= start)
+
+
+def test_tree_matches_brute_force():
+    rng = random.Random(4)
+    plain = list(random_intervals(rng, 200))
+    # Enough intervals to use the max-end tree instead of a linear scan
+    check_against_brute_force(rng, AllocationIntervals(plain), plain)
+
+
+def test_single_adds_match_brute_force():
+    rng = random.Random(5)
+    intervals, plain = AllocationIntervals(), []
+    # Crosses several merges of the recent tail into the tree
+    for item in random_intervals(rng, 400):
+        intervals.add(*item)
+        plain.append(item)
+        if len(plain) % 97 == 0:
+            check_against_brute_force(rng, intervals, plain)
+    more = list(random_intervals(rng, 50))
+    intervals.extend(more)
+    check_against_brute_force(rng, intervals, plain + more)
+    assert len(intervals) == 450
+
+
+def test_copies_are_independent():
+    intervals = AllocationIntervals([(0, 10, 50)])
+    copy = intervals.copy()
+    copy.add(0, 10, 30)
+    intervals.add(5, 10, 10)
+    assert intervals.peak(0, 10) == 60
+    assert copy.peak(0, 10) == 80
+
+
+def test_index_peaks():
+    index = CapacityIndex()
+    index.add_many([('A', 0, 10, 50), ('A', 5, 20, 30), ('B', 0, 100, 100)])
+    assert index.peak('A', 0, 4) == 50
+    assert index.peak('C', 0, 4) == 0
+    assert index.peaks(11, 20) == {'A': 30, 'B': 100}
+
+
+def test_overlay_leaves_the_index_alone():
+    index = CapacityIndex()
+    index.add('A', 0, 10, 50)
+    overlay = index.overlay()
+    overlay.add('A', 5, 15, 40)
+    overlay.add('B', 0, 10, 20)
+
+    assert overlay.peak('A', 0, 20) == 90
+    assert overlay.peak('B', 0, 20) == 20
+    assert index.peak('A', 0, 20) == 50
+    assert index.peak('B', 0, 20) == 0
+    assert len(index.intervals('A')) == 1
+
+
+def test_index_add_does_not_reach_existing_overlays():
+    index = CapacityIndex()
+    index.add_many([('A', 0, 10, 50)])
+    overlay = index.overlay()
+    overlay.add('A', 20, 30, 10)
+    index.add('A', 0, 10, 20)
+    index.add_many([('A', 5, 5, 5), ('B', 0, 1, 1)])
+    assert index.peak('A', 0, 10) == 75
+    assert overlay.peak('A', 0, 10) == 50
+    # Employees the overlay has not touched read the live index
+    assert overlay.peak('B', 0, 10) == 1
@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import data_store
+import snapshot
+from conftest import ALLOCATIONS, EMPLOYEES, allocation, employee
+from data_store import WriteConflict
+
+
+def count_loads(store):
+    loads = []
+    for storage in (store._employees_storage, store._allocations_storage):
+        load = storage.load
+
+        def counted(load=load, storage=storage):
+            loads.append(storage)
+            return load()
+        storage.load = counted
+    return loads
+
+
+def test_reads_are_served_from_memory(store):
+    loads = count_loads(store)
+    assert len(store.employees()) == len(EMPLOYEES)
+    version = store.refresh()
+    assert len(loads) == 2
+    for _ in range(3):
+        store.employees()
+        store.allocations()
+        store.get_employee('TM00001')
+    assert len(loads) == 2
+    assert store.refresh() == version
+
+
+def test_returned_lists_are_copies(store):
+    store.employees().clear()
+    store.allocations_for_employee('TM00001').clear()
+    assert len(store.employees()) == len(EMPLOYEES)
+    assert len(store.allocations_for_employee('TM00001')) == 2
+
+
+def test_sees_another_writers_saves(make_store):
+    first, second = make_store(), make_store()
+    version = first.refresh()
+    second.add_employee(employee('TM00004', 'Kiran Das'))
+    assert first.get_employee('TM00004')['name'] == 'Kiran Das'
+    assert first.refresh() > version
+
+
+def test_reloads_when_the_file_is_replaced(store, data_files):
+    store.refresh()
+    employees_path = data_files[0]
+    stat = os.stat(employees_path)
+    # Same size and timestamp, new file: the inode still gives it away
+    replacement = EMPLOYEES[:2] + [dict(EMPLOYEES[2], name='Meera Iyee')]
+    with open(employees_path + '.new', 'w') as f:
+        json.dump(replacement, f)
+    os.replace(employees_path + '.new', employees_path)
+    os.utime(employees_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert store.get_employee('TM00003')['name'] == 'Meera Iyee'
+
+
+def test_allocation_indexes(store):
+    assert [alloc['project_name'] for alloc in store.allocations_for_project('Wellora')] == ['Wellora', 'Wellora']
+    assert store.allocations_for_employee('TM00003') == []
+    assert len(store.allocations()) == len(ALLOCATIONS)
+
+
+def test_queued_writers_share_one_write(store):
+    appends, release = [], threading.Event()
+    append = store._allocations_storage.append
+
+    def slow_append(records, *args):
+        appends.append(len(records))
+        release.wait(5)
+        return append(records, *args)
+    store._allocations_storage.append = slow_append
+
+    threads = [threading.Thread(target=store.add_allocations, args=([allocation('TM00003', f"P{i}", '2025-01-01', '2025-01-31', 5)],)) for i in range(5)]
+    threads[0].start()
+    while not appends:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    while len(store._pending_writes) < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert appends == [1, 4]
+    assert store.total_allocation('TM00003') == 25
+
+
+def test_duplicate_employee_ids_are_a_conflict(store):
+    with pytest.raises(WriteConflict, match='TM00001 already exists'):
+        store.add_employee(employee('TM00001', 'Asha Again'))
+    with pytest.raises(WriteConflict, match='TM00004 already exists'):
+        store.add_employees([employee('TM00004', 'Kiran Das'), employee('TM00004', 'Kiran Again')])
+    assert not store.has_employee('TM00004')
+
+
+def test_stale_capacity_checks_are_redone_at_commit(make_store):
+    first, second = make_store(), make_store()
+    version = first.refresh()
+    second.add_allocations([allocation('TM00003', 'Atlas', '2025-01-01', '2025-01-31', 70)])
+    # Checked against data from before the other writer's save
+    with pytest.raises(WriteConflict, match='TM00003 is now allocated 70%'):
+        first.add_allocations([allocation('TM00003', 'Zephyr', '2025-01-15', '2025-02-15', 40)], expected_version=version)
+    first.add_allocations([allocation('TM00003', 'Zephyr', '2025-02-01', '2025-02-15', 40)], expected_version=version)
+    assert [alloc['project_name'] for alloc in first.allocations_for_employee('TM00003')] == ['Atlas', 'Zephyr']
+
+
+def test_concurrent_checked_writers_cannot_overbook(store):
+    version = store.refresh()
+    errors = []
+
+    def book(project):
+        try:
+            store.add_allocations([allocation('TM00003', project, '2025-01-01', '2025-01-31', 60)], expected_version=version)
+        except WriteConflict as e:
+            errors.append(e)
+    threads = [threading.Thread(target=book, args=(f"P{i}",)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 3
+    assert store.total_allocation('TM00003') == 60
+
+
+def test_snapshot_rebuilds_are_coalesced(make_store, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_store, 'SNAPSHOT_REFRESH_INTERVAL', 0.5)
+    builds = []
+    build_tables = snapshot.build_tables
+
+    def counted(employees, allocations):
+        builds.append(len(allocations))
+        return build_tables(employees, allocations)
+    monkeypatch.setattr(snapshot, 'build_tables', counted)
+    store = make_store(snapshot_dir=str(tmp_path / 'snapshot'))
+
+    for i in range(20):
+        store.add_allocations([allocation('TM00003', f"P{i}", '2025-01-01', '2025-01-31', 1)])
+        time.sleep(0.01)
+    # A reader never waits for the background pass to see the latest data
+    assert len(store.snapshot().frame('allocations')) == len(ALLOCATIONS) + 20
+    deadline = time.monotonic() + 5
+    while store._snapshot_thread is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store._snapshot_thread is None
+    # The first pass, the reader's, and at most one more for everything committed during the interval
+    assert len(builds) <= 3
+    assert builds[-1] == len(ALLOCATIONS) + 20
@@ -0,0 +1,88 @@
+import pytest
+
+from conftest import EMPLOYEES
+from core import ROLE_SKILLS
+from intent_parser import LOCAL_CONFIDENCE, IntentParser
+from name_index import NameIndex
+
+
+@pytest.fixture(scope='module')
+def parser():
+    return IntentParser(ROLE_SKILLS)
+
+
+@pytest.mark.parametrize('query, intent', [
+    ("what is Asha Rao's email", 'get_employee_email'),
+    ("Asha Rao phone number", 'get_employee_phone'),
+    ("where is Vikram Shah based", 'get_employee_location'),
+    ("what's the joining date of Meera Iyer", 'get_employee_doj'),
+    ("which projects is Asha Rao working on", 'find_employee_projects'),
+])
+def test_lookups(parser, query, intent):
+    response, confidence = parser.parse(query)
+    assert response['intent'] == intent
+    assert response['entities']['employee_name'] in ('Asha Rao', 'Vikram Shah', 'Meera Iyer')
+    assert confidence >= LOCAL_CONFIDENCE
+
+
+def test_two_fields_go_to_the_model(parser):
+    assert parser.parse("what is Asha's email and phone") == (None, 0.0)
+
+
+def test_blank_and_greeting(parser):
+    assert parser.parse('   ') == (None, 0.0)
+    assert parser.parse('Hello there!') == ({'intent': 'other', 'entities': {}}, 0.9)
+
+
+def test_complete_allocation(parser):
+    response, confidence = parser.parse("Allocate Asha Rao to the Wellora project from 1/6/2025 to 2025-03-31 with 50%")
+    assert response == {'intent': 'allocate_project', 'entities': {
+        'employee_name': 'Asha Rao', 'project_name': 'Wellora', 'start_date': '2025-01-06', 'end_date': '2025-03-31', 'allocation': 50}}
+    assert confidence >= LOCAL_CONFIDENCE
+
+
+def test_incomplete_allocation_is_not_trusted(parser):
+    response, confidence = parser.parse("allocate Asha to Wellora")
+    assert response['intent'] == 'allocate_project'
+    assert response['entities']['allocation'] is None
+    assert confidence < LOCAL_CONFIDENCE
+
+
+def test_search_with_designation_and_skills(parser):
+    response, confidence = parser.parse("find a DevOps engineer with AWS and Docker 50% available")
+    assert response == {'intent': 'search_candidate', 'entities': {
+        'designation': 'DevOps Engineer', 'skills': ['Amazon Web Services (AWS)', 'Docker'], 'allocation_needed': 50}}
+    assert confidence == 0.95
+
+
+def test_search_infers_designation_from_skills(parser):
+    response, confidence = parser.parse("who knows React.js and TypeScript")
+    assert response['entities']['designation'] == 'Frontend Developer'
+    assert response['entities']['skills'] == ['React.js', 'TypeScript']
+    assert LOCAL_CONFIDENCE <= confidence < 0.95
+
+
+def test_ambiguous_skills_go_to_the_model(parser):
+    # Python is listed for more than one role
+    response, confidence = parser.parse("find someone who knows Python")
+    assert response is None and confidence < LOCAL_CONFIDENCE
+
+
+def test_everyday_words_are_not_skills(parser):
+    response, _ = parser.parse("find someone to go with")
+    assert response is None or 'Go' not in response['entities'].get('skills', [])
+
+
+def test_name_index_sets_confidence(parser):
+    names = NameIndex(EMPLOYEES)
+    _, known = parser.parse("what is Asha Rao's email", names)
+    _, unknown = parser.parse("what is Zyx Qwv's email", names)
+    assert known >= LOCAL_CONFIDENCE > unknown
+
+
+def test_stats(parser):
+    parser = IntentParser(ROLE_SKILLS)
+    parser.record(True)
+    parser.record(True)
+    parser.record(False)
+    assert parser.stats() == {'served_locally': 2, 'sent_to_llm': 1, 'local_rate': 2 / 3}
@@ -0,0 +1,166 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import llm_client
+from llm_client import GeminiClient, LLMError, LLMTimeout
+
+
+def reply(text, prompt_tokens=7, output_tokens=3):
+    return httpx.Response(200, json={
+        'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}],
+        'usageMetadata': {'promptTokenCount': prompt_tokens, 'candidatesTokenCount': output_tokens},
+    })
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    # Backoff in milliseconds so retry tests stay fast
+    monkeypatch.setattr(llm_client, 'BACKOFF_BASE', 0.001)
+    clients = []
+
+    def make(handler, **options):
+        client = GeminiClient('test-key', base_url='http://model.test', transport=httpx.MockTransport(handler), **options)
+        clients.append(client)
+        return client
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_success_sends_prompt_and_counts_tokens(make_client):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return reply('{"intent": "other"}')
+    client = make_client(handler, model='test-model')
+
+    assert client.generate_sync('hello') == '{"intent": "other"}'
+    request = seen[0]
+    assert request.url.path == '/v1beta/models/test-model:generateContent'
+    assert request.url.params['key'] == 'test-key'
+    assert json.loads(request.content)['contents'][0]['parts'][0]['text'] == 'hello'
+    assert client.stats() == {'calls': 1, 'retried': 0, 'failures': 0, 'prompt_tokens': 7, 'output_tokens': 3}
+
+
+def test_generate_from_another_event_loop(make_client):
+    client = make_client(lambda request: reply('ok'))
+    assert asyncio.run(client.generate('hello')) == 'ok'
+
+
+def test_retries_server_errors_then_succeeds(make_client):
+    statuses = iter([503, 429])
+
+    def handler(request):
+        status = next(statuses, 200)
+        return reply('ok') if status == 200 else httpx.Response(status)
+    client = make_client(handler)
+
+    assert client.generate_sync('hello') == 'ok'
+    assert client.stats()['retried'] == 2
+    assert client.stats()['failures'] == 0
+
+
+def test_gives_up_after_retries(make_client):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(500)
+    client = make_client(handler, retries=2)
+
+    with pytest.raises(LLMError, match='HTTP 500'):
+        client.generate_sync('hello')
+    assert len(attempts) == 3
+    assert client.stats()['failures'] == 1
+
+
+def test_client_errors_are_not_retried(make_client):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(400, text='bad key')
+    client = make_client(handler)
+
+    with pytest.raises(LLMError, match='HTTP 400: bad key'):
+        client.generate_sync('hello')
+    assert len(attempts) == 1
+
+
+def test_transport_timeouts_raise_llm_timeout(make_client):
+    def handler(request):
+        raise httpx.ReadTimeout('slow', request=request)
+    client = make_client(handler, retries=1)
+
+    with pytest.raises(LLMTimeout):
+        client.generate_sync('hello')
+    assert client.stats()['retried'] == 1
+
+
+def test_retries_stop_at_the_deadline(make_client):
+    attempts = []
+
+    async def handler(request):
+        attempts.append(request)
+        await asyncio.sleep(0.05)
+        return httpx.Response(503)
+    client = make_client(handler, retries=100)
+
+    started = time.monotonic()
+    with pytest.raises(LLMError):
+        client.generate_sync('hello', timeout=0.12)
+    assert time.monotonic() - started < 0.5
+    assert 2 <= len(attempts) <= 4
+    assert client.stats()['failures'] == 1
+
+
+def test_stuck_request_is_cut_off(make_client):
+    # The mock transport ignores httpx timeouts, so this checks the caller-side guard
+    async def handler(request):
+        await asyncio.sleep(10)
+        return reply('late')
+    client = make_client(handler)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        client.generate_sync('hello', timeout=0.1)
+    assert time.monotonic() - started < 2
+
+
+def test_unexpected_payload_is_an_error(make_client):
+    client = make_client(lambda request: httpx.Response(200, json={'candidates': []}))
+    with pytest.raises(LLMError, match='Unexpected response'):
+        client.generate_sync('hello')
+
+
+def test_concurrency_is_limited(make_client):
+    in_flight, most = 0, 0
+
+    async def handler(request):
+        nonlocal in_flight, most
+        in_flight += 1
+        most = max(most, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return reply(json.loads(request.content)['contents'][0]['parts'][0]['text'])
+    client = make_client(handler, max_concurrency=2)
+
+    prompts = [f"prompt {i}" for i in range(6)]
+    assert client.generate_many(prompts) == prompts
+    assert most == 2
+
+
+def test_generate_many_returns_errors_in_place(make_client):
+    def handler(request):
+        text = json.loads(request.content)['contents'][0]['parts'][0]['text']
+        return httpx.Response(400) if text == 'bad' else reply(text)
+    client = make_client(handler)
+
+    good, bad = client.generate_many(['good', 'bad'])
+    assert good == 'good'
+    assert isinstance(bad, LLMError)
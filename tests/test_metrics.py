@@ -0,0 +1,29 @@
+import json
+
+from metrics import Metrics
+
+
+def test_reconfiguring_the_same_log_keeps_one_handle(tmp_path):
+    log_path = str(tmp_path / 'spans.jsonl')
+    metrics = Metrics(log_path)
+    handle = metrics._log
+    for _ in range(3):
+        metrics.configure(log_path)
+    assert metrics._log is handle and not handle.closed
+
+    other_path = str(tmp_path / 'other.jsonl')
+    metrics.configure(other_path)
+    assert handle.closed
+    metrics.record('work', 0.25)
+    metrics.configure(None)
+    assert metrics._log is None
+    with open(other_path) as f:
+        assert json.loads(f.read())['span'] == 'work'
+
+
+def test_spans_are_summarised():
+    metrics = Metrics()
+    with metrics.span('outer'):
+        with metrics.span('inner'):
+            pass
+    assert {row['span'] for row in metrics.summary()} == {'outer', 'inner'}
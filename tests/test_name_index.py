@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import EMPLOYEES, employee
+from name_index import NameIndex
+
+
+@pytest.fixture
+def index():
+    return NameIndex(EMPLOYEES + [
+        employee('TM00004', 'Asha Rao'),
+        employee('TM00005', 'Ashok Kumar'),
+        employee('TM00006', 'Neeraj Pokala'),
+    ])
+
+
+def ids(matches):
+    return [match.employee_id for match in matches]
+
+
+def test_exact_name(index):
+    best, matches, ambiguous = index.resolve('Vikram Shah')
+    assert best.employee_id == 'TM00002' and best.score == 1.0
+    assert not ambiguous
+
+
+def test_employee_id_is_case_insensitive(index):
+    assert index.search('tm00003') == [('TM00003', 'Meera Iyer', 1.0)]
+
+
+def test_namesakes_are_ambiguous(index):
+    best, matches, ambiguous = index.resolve('asha rao')
+    assert ambiguous
+    assert set(ids(matches[:2])) == {'TM00001', 'TM00004'}
+
+
+def test_prefix_and_reordered_words(index):
+    assert ids(index.search('Ash'))[:3] == ['TM00001', 'TM00004', 'TM00005']
+    reordered = index.search('Pokala Neeraj')
+    assert reordered[0].employee_id == 'TM00006' and 0.9 < reordered[0].score < 1.0
+
+
+def test_misspellings_are_found(index):
+    # No token matches exactly or as a prefix, so candidates come from trigrams
+    assert ids(index.search('Vikrm Shaah')) == ['TM00002']
+    assert ids(index.search('Meeraa')) == ['TM00003']
+    assert index.search('Vikrm Shaah')[0].score < index.search('Vikram')[0].score
+
+
+def test_no_match(index):
+    assert index.search('Zyx') == []
+    assert index.search('   ') == []
+    assert index.resolve('Zyx') == (None, [], False)
+
+
+def test_added_employees_are_found(index):
+    index.add(employee('TM00007', 'Farah Khan'))
+    assert ids(index.search('farah')) == ['TM00007']
+    assert len(index) == len(EMPLOYEES) + 4
+
+
+def test_store_keeps_the_index_current(store):
+    names = store.name_index()
+    store.add_employee(employee('TM00008', 'Gopal Menon'))
+    assert ids(store.name_index().search('Gopal Menon')) == ['TM00008']
+    assert store.name_index() is names
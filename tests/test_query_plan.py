@@ -0,0 +1,96 @@
+from datetime import date
+
+import pytest
+
+from query_plan import DEFAULT_LIMIT, PlanError, execute_plan, plan_json, validate_plan
+
+
+def errors_of(plan):
+    with pytest.raises(PlanError) as caught:
+        validate_plan(plan)
+    return caught.value.errors
+
+
+def test_defaults_are_filled_in():
+    plan = validate_plan({'table': 'employees'})
+    assert plan['filters'] == [] and plan['aggregates'] == [] and plan['sort'] == []
+    assert plan['limit'] == DEFAULT_LIMIT
+    assert 'employee_id' in plan['columns']
+
+
+def test_filter_values_are_converted():
+    plan = validate_plan({'table': 'allocations', 'filters': [
+        {'column': 'start_date', 'op': 'between', 'value': ['2025-01-01', '2025-06-30']},
+        {'column': 'allocation', 'op': '>=', 'value': '50'},
+    ]})
+    assert plan['filters'][0]['value'] == [date(2025, 1, 1), date(2025, 6, 30)]
+    assert plan['filters'][1]['value'] == 50.0
+
+
+def test_group_by_counts_by_default():
+    plan = validate_plan({'table': 'employees', 'group_by': ['department']})
+    assert plan['aggregates'] == [{'func': 'count', 'column': None, 'as': 'count'}]
+    assert plan['columns'] == []
+
+
+@pytest.mark.parametrize('plan, message', [
+    ({'table': 'salaries'}, "table must be one of"),
+    ({'table': 'employees', 'select': ['name']}, "unknown key 'select'"),
+    ({'table': 'employees', 'filters': [{'column': 'salary', 'op': '==', 'value': 1}]}, "unknown column 'salary'"),
+    ({'table': 'employees', 'filters': [{'column': 'name', 'op': '>', 'value': 'A'}]}, "'>' cannot be used on name"),
+    ({'table': 'employees', 'filters': [{'column': 'date_of_joining', 'op': '>', 'value': 'last year'}]}, "not a YYYY-MM-DD date"),
+    ({'table': 'employees', 'filters': [{'column': 'name', 'op': 'in', 'value': []}]}, "needs a non-empty list"),
+    ({'table': 'employees', 'aggregates': [{'func': 'sum', 'column': 'name'}]}, "'sum' cannot be used on name"),
+    ({'table': 'employees', 'aggregates': [{'func': 'median', 'column': 'experience_years'}]}, "unknown function 'median'"),
+    ({'table': 'employees', 'sort': [{'column': 'salary'}]}, "is not an output column"),
+    ({'table': 'employees', 'limit': 0}, "limit must be a whole number"),
+    ({'table': 'employees', 'limit': True}, "limit must be a whole number"),
+])
+def test_invalid_plans(plan, message):
+    assert any(message in error for error in errors_of(plan))
+
+
+def test_every_problem_is_reported():
+    errors = errors_of({'table': 'employees', 'group_by': ['salary'], 'limit': 5000, 'columns': 'name'})
+    assert len(errors) == 3
+
+
+def test_execute_filter_sort_limit(store):
+    plan = validate_plan({
+        'table': 'allocations',
+        'filters': [{'column': 'project_name', 'op': 'contains', 'value': 'well'}],
+        'columns': ['employee_id', 'name', 'start_date', 'allocation'],
+        'sort': [{'column': 'allocation', 'descending': True}],
+        'limit': 1,
+    })
+    result = execute_plan(plan, store.snapshot().frame)
+    assert result.to_dict('records') == [{'employee_id': 'TM00002', 'name': 'Vikram Shah', 'start_date': '2025-02-15', 'allocation': 100.0}]
+
+
+def test_execute_group_by(store):
+    plan = validate_plan({
+        'table': 'allocations',
+        'group_by': ['project_name'],
+        'aggregates': [{'func': 'sum', 'column': 'allocation', 'as': 'total'}, {'func': 'count', 'column': None, 'as': 'rows'}],
+        'sort': [{'column': 'project_name'}],
+    })
+    result = execute_plan(plan, store.snapshot().frame)
+    assert result.to_dict('records') == [
+        {'project_name': 'Billing', 'total': 30.0, 'rows': 1},
+        {'project_name': 'Wellora', 'total': 160.0, 'rows': 2},
+    ]
+
+
+def test_execute_null_filter_and_overall_aggregate(store):
+    plan = validate_plan({
+        'table': 'allocations',
+        'filters': [{'column': 'end_date', 'op': 'is_null'}],
+        'aggregates': [{'func': 'nunique', 'column': 'employee_id', 'as': 'people'}],
+    })
+    assert execute_plan(plan, store.snapshot().frame).to_dict('records') == [{'people': 1}]
+
+
+def test_plan_json_is_canonical():
+    first = validate_plan({'limit': 5, 'table': 'employees', 'columns': ['name']})
+    second = validate_plan({'table': 'employees', 'columns': ['name'], 'limit': 5})
+    assert plan_json(first) == plan_json(second)
@@ -0,0 +1,68 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cache_key, normalize_query
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def make(**options):
+        options.setdefault('path', str(tmp_path / 'cache.db'))
+        cache = ResponseCache(**options)
+        caches.append(cache)
+        return cache
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def test_queries_that_mean_the_same_share_a_key():
+    assert normalize_query('  "Find   Python developers?" ') == 'find python developers'
+    assert cache_key('Find Python developers', 'template') == cache_key('find python developers!', 'template')
+    assert cache_key('find python developers', 'template') != cache_key('find python developers', 'template v2')
+
+
+def test_entries_survive_a_restart(make_cache):
+    cache = make_cache()
+    cache.put('key', {'intent': 'search'})
+    assert cache.get('key') == {'intent': 'search'}
+    cache.close()
+
+    reopened = make_cache()
+    assert reopened.get('key') == {'intent': 'search'}
+    assert reopened.get('key') == {'intent': 'search'}
+    assert reopened.get('other') is None
+    stats = reopened.stats()
+    assert (stats['disk_hits'], stats['memory_hits'], stats['misses']) == (1, 1, 1)
+
+
+def test_memory_tier_evicts_least_recently_used(make_cache):
+    cache = make_cache(path='', memory_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_disk_tier_is_bounded(make_cache):
+    cache = make_cache(memory_entries=1, disk_entries=3)
+    for i in range(5):
+        cache.put(f"k{i}", i)
+    cache.close()
+    reopened = make_cache()
+    assert [reopened.get(f"k{i}") for i in range(5)] == [None, None, 2, 3, 4]
+
+
+def test_entries_expire(make_cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, 'time', lambda: now[0])
+    cache = make_cache(ttl=60)
+    cache.put('key', 'value')
+    now[0] += 61
+    assert cache.get('key') is None
+    cache.close()
+    assert make_cache(ttl=60).get('key') is None
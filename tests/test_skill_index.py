@@ -0,0 +1,65 @@
+import random
+from datetime import date
+
+import numpy as np
+
+from conftest import allocation, employee
+from core import ROLE_SKILLS
+from skill_index import SkillIndex
+
+BACKEND = ROLE_SKILLS['Backend Developer']
+
+
+def brute_force(employees, designation, skills, available, allocation_needed):
+    ranked = []
+    for doc, emp in enumerate(employees):
+        score = len(set(skills) & set(emp['skills']))
+        free = available[doc] if doc < len(available) else 100.0
+        if emp['designation'] == designation and (score or not skills) and free >= allocation_needed:
+            ranked.append((-score, doc))
+    return [doc for _, doc in sorted(ranked)]
+
+
+def test_ranking_matches_brute_force():
+    rng = random.Random(3)
+    employees = [
+        employee(f"TM{i:05d}", f"Person {i}", rng.choice(['Backend Developer', 'DevOps Engineer']), skills=rng.sample(BACKEND, 4))
+        for i in range(300)
+    ]
+    index = SkillIndex(employees[:200], ROLE_SKILLS)
+    for emp in employees[200:]:
+        index.add(emp)
+    # Employees added after the array was built count as fully free
+    available = np.array([rng.choice([0, 30, 60, 100]) for _ in range(250)], dtype='float64')
+    for _ in range(30):
+        skills = rng.sample(BACKEND, rng.randint(0, 5))
+        needed = rng.choice([0, 50])
+        matches, total = index.search('Backend Developer', skills, available, needed, k=20)
+        expected = brute_force(employees, 'Backend Developer', skills, available, needed)
+        assert total == len(expected)
+        assert [match.employee['employee_id'] for match in matches] == [employees[doc]['employee_id'] for doc in expected[:20]]
+        assert all(match.score == len(set(skills) & set(match.employee['skills'])) for match in matches)
+
+
+def test_names_are_matched_case_insensitively():
+    index = SkillIndex([employee('TM00001', 'Asha Rao', skills=['Python', 'Django'])], ROLE_SKILLS)
+    matches, total = index.search('backend developer', ['python', 'DJANGO'])
+    assert total == 1 and matches[0].score == 2 and matches[0].available == 100.0
+    assert index.designation_count('BACKEND DEVELOPER') == 1
+    assert index.search('Wizard', ['Python']) == ([], 0)
+
+
+def test_store_search_uses_current_capacity(store):
+    today = date.today().isoformat()
+    # TM00002 is fully booked from 2025-02-15 with no end date
+    assert store.search_candidates('DevOps Engineer', ['Docker'], 50) == ([], 0)
+    assert [(match.employee['employee_id'], match.available) for match in store.search_candidates('DevOps Engineer', ['Docker'])[0]] == [('TM00002', 0.0)]
+    # Capacity counts from `day` onwards, so TM00001's bookings ending 2025-06-30 are gone by July
+    assert store.search_candidates('Backend Developer', ['Python'], 20, day=date(2025, 3, 15)) == ([], 0)
+    assert store.search_candidates('Backend Developer', ['Python'], 20, day=date(2025, 7, 1))[1] == 1
+    store.add_employee(employee('TM00004', 'Kiran Das', 'DevOps Engineer', skills=['Docker', 'Helm']))
+    store.add_allocations([allocation('TM00004', 'Atlas', today, None, 60)])
+    matches, total = store.search_candidates('DevOps Engineer', ['Docker', 'Helm'], 50)
+    assert total == 0
+    matches, total = store.search_candidates('DevOps Engineer', ['Docker', 'Helm'], 40)
+    assert [(match.employee['employee_id'], match.score, match.available) for match in matches] == [('TM00004', 2, 40.0)]
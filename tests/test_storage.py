@@ -0,0 +1,161 @@
+import json
+import sqlite3
+
+import pytest
+
+from conftest import ALLOCATIONS, EMPLOYEES, allocation
+from storage import JournalStorage, SqliteDatabase, import_json_to_sqlite, read_json_lines, repair_tail
+
+
+@pytest.fixture
+def journal(tmp_path):
+    storages = []
+
+    def make(**options):
+        storage = JournalStorage(str(tmp_path / 'records.json'), **options)
+        storages.append(storage)
+        return storage
+    yield make
+    for storage in storages:
+        storage.close()
+
+
+def test_appends_replay_after_reopening(journal):
+    storage = journal()
+    storage.append([{'a': 1}, {'a': 2}])
+    storage.append([{'a': 3}])
+    storage.close()
+    assert journal().load() == [{'a': 1}, {'a': 2}, {'a': 3}]
+
+
+def test_torn_tail_is_skipped_then_cut_before_the_next_append(journal):
+    storage = journal()
+    storage.append([{'a': 1}])
+    storage.close()
+    # A crash part way through writing a record
+    with open(storage.journal_path, 'a') as f:
+        f.write('{"a": 2, "tor')
+
+    reopened = journal()
+    assert reopened.load() == [{'a': 1}]
+    reopened.append([{'a': 3}])
+    reopened.append([{'a': 4}])
+    reopened.close()
+    assert journal().load() == [{'a': 1}, {'a': 3}, {'a': 4}]
+    with open(storage.journal_path) as f:
+        assert f.read().endswith('{"a": 4}\n')
+
+
+def test_torn_tail_survives_compaction(journal):
+    storage = journal()
+    storage.append([{'a': 1}])
+    storage.close()
+    with open(storage.journal_path, 'a') as f:
+        f.write('{"a"')
+    reopened = journal()
+    reopened.append([{'a': 2}])
+    reopened.compact()
+    assert journal().load() == [{'a': 1}, {'a': 2}]
+
+
+def test_corruption_before_the_last_line_is_an_error(tmp_path):
+    path = tmp_path / 'records.journal.jsonl'
+    path.write_text('{"a": 1}\n{"a": 2, "tor{"a": 3}\n{"a": 4}\n')
+    with pytest.raises(ValueError, match='line 2 is corrupt'):
+        read_json_lines(str(path))
+
+
+def test_repair_tail(tmp_path):
+    path = tmp_path / 'lines.jsonl'
+    path.write_text('{"a": 1}\n' + 'x' * 10000)
+    assert repair_tail(str(path)) == 10000
+    assert path.read_text() == '{"a": 1}\n'
+    assert repair_tail(str(path)) == 0
+    path.write_text('no newline at all')
+    repair_tail(str(path))
+    assert path.read_text() == ''
+    assert repair_tail(str(tmp_path / 'missing.jsonl')) == 0
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(journal):
+    storage = journal(compact_threshold=10 ** 6)
+    storage.append([{'a': 1}, {'a': 2}])
+    storage.compact()
+    storage.append([{'a': 3}])
+    with open(storage.path) as f:
+        assert json.load(f) == [{'a': 1}, {'a': 2}]
+    assert read_json_lines(storage.journal_path) == [{'a': 3}]
+    assert storage.load() == [{'a': 1}, {'a': 2}, {'a': 3}]
+
+
+def test_recovery_drops_a_journal_that_was_already_folded_in(journal):
+    storage = journal()
+    storage.append([{'a': 1}])
+    storage.compact()
+    # Crash after the snapshot was replaced but before the old journal was removed
+    with open(storage.compacting_path, 'w') as f:
+        f.write('{"a": 1}\n')
+    assert journal().load() == [{'a': 1}]
+
+
+def test_journal_mode_store_recovers_from_a_torn_tail(make_store):
+    store = make_store(storage_mode='journal')
+    store.add_allocations([allocation('TM00003', 'Atlas', '2025-01-01', '2025-01-31', 20)])
+    store.close()
+    with open(store._allocations_storage.journal_path, 'a') as f:
+        f.write('{"employee_id": "TM0')
+
+    reopened = make_store(storage_mode='journal')
+    reopened.add_allocations([allocation('TM00003', 'Zephyr', '2025-02-01', '2025-02-28', 30)])
+    reopened.close()
+    projects = [alloc['project_name'] for alloc in make_store(storage_mode='journal').allocations_for_employee('TM00003')]
+    assert projects == ['Atlas', 'Zephyr']
+
+
+@pytest.fixture
+def database_path(tmp_path, data_files):
+    path = str(tmp_path / 'talent_iq.db')
+    assert import_json_to_sqlite(*data_files, path) == (len(EMPLOYEES), len(ALLOCATIONS), 0)
+    return path
+
+
+def test_sqlite_import_and_point_lookups(database_path):
+    database = SqliteDatabase(database_path)
+    try:
+        assert database.employees.load() == EMPLOYEES
+        assert database.employees.get('TM00002') == EMPLOYEES[1]
+        assert database.employees.get('TM09999') is None
+        assert database.employees.exists('TM00001') and not database.employees.exists('TM09999')
+        assert database.allocations.for_employee('TM00001') == ALLOCATIONS[:2]
+        assert [alloc['employee_id'] for alloc in database.allocations.for_project('Wellora')] == ['TM00001', 'TM00002']
+    finally:
+        database.close()
+
+
+def test_sqlite_import_refuses_a_database_with_data(database_path, data_files):
+    with pytest.raises(ValueError, match='already contains data'):
+        import_json_to_sqlite(*data_files, database_path)
+
+
+def test_sqlite_drops_tables_it_no_longer_uses(tmp_path):
+    path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE employee_skills (employee_id TEXT, skill TEXT)')
+    conn.commit()
+    conn.close()
+    SqliteDatabase(path).close()
+    conn = sqlite3.connect(path)
+    assert not conn.execute("SELECT name FROM sqlite_master WHERE name = 'employee_skills'").fetchall()
+    conn.close()
+
+
+def test_sqlite_store_sees_other_connections_writes(make_store, database_path):
+    first = make_store(storage_mode='sqlite', database_path=database_path)
+    second = make_store(storage_mode='sqlite', database_path=database_path)
+    version = first.refresh()
+    second.add_allocations([allocation('TM00003', 'Atlas', '2025-01-01', '2025-01-31', 40)])
+    assert first.refresh() > version
+    assert first.total_allocation('TM00003') == 40
+    assert first.peak_allocation('TM00003', '2025-01-10', '2025-01-10') == 40
+    assert [alloc['project_name'] for alloc in first.allocations_for_employee('TM00003')] == ['Atlas']
+    assert first.has_employee('TM00003')